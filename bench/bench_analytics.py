@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Analytics benchmark: /analytics summaries over a day of history polled at the poller's uneven cadence
+Online miners are sampled every 2-15s and offline ones back off to 5 minutes, so availability
+has to come from time covered rather than sample counts - checked against each miner's true uptime
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database
+
+
+def make_samples(miners, hours):
+    """Samples per miner with random outages; returns them and each miner's true availability %"""
+    now = int(time.time())
+    start = now - int(hours * 3600)
+    samples = []
+    uptime = {}
+    for i in range(miners):
+        ip = f'10.0.{i // 250}.{i % 250 + 1}'
+        ts, online_seconds, failures = start, 0, 0
+        online = True
+        # Roughly one outage every few hours, 5 minutes to 2 hours long
+        change = ts + random.randint(600, 4 * 3600)
+        while ts < now:
+            if ts >= change:
+                online = not online
+                change = ts + (random.randint(600, 4 * 3600) if online else random.randint(300, 7200))
+                failures = 0
+            if online:
+                interval = random.uniform(2, 15)
+                data = {'status': 'online', 'hashrate': round(random.uniform(30000, 80000), 2),
+                        'shares': ts, 'acceptedShares': ts, 'bestDiff': 1.5, 'temp': 48, 'uptime': ts}
+            else:
+                failures += 1
+                interval = min(300, 5 * 2 ** failures)
+                data = {'status': 'offline'}
+            interval = min(interval, change - ts) if change > ts else interval
+            interval = max(1, int(interval))
+            if online:
+                online_seconds += min(interval, now - ts)
+            samples.append((ip, f'NerdMiner {i}', time.strftime(database.TIMESTAMP_FORMAT, time.gmtime(ts)), data))
+            ts += interval
+        uptime[ip] = online_seconds * 100 / (now - start)
+    return samples, uptime
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /analytics and check availability under uneven polling')
+    parser.add_argument('--miners', type=int, default=20)
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--storage', choices=('rows', 'compact'), default='rows')
+    parser.add_argument('--tolerance', type=float, default=2.0, help='allowed availability error, percentage points')
+    args = parser.parse_args()
+
+    database.DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_analytics.db')
+    database.init_database(args.storage)
+    random.seed(1)
+    samples, uptime = make_samples(args.miners, args.hours)
+    database.save_samples(samples)
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        result = database.get_miner_analytics(args.hours)
+    elapsed = (time.perf_counter() - started) / args.repeat * 1000
+
+    by_samples = {}
+    for ip, name, timestamp, data in samples:
+        total, online = by_samples.get(ip, (0, 0))
+        by_samples[ip] = (total + 1, online + (data['status'] == 'online'))
+
+    print(f"{args.miners} miners, {args.hours:g}h, {len(samples)} samples, {args.storage} storage - "
+          f"{result['resolution']} buckets, {elapsed:.1f}ms per summary\n")
+    print(f"{'miner':<14}{'true %':>9}{'reported %':>12}{'by samples %':>14}")
+    worst = 0
+    for miner in result['miners']:
+        total, online = by_samples[miner['ip']]
+        error = abs(miner['availability'] - uptime[miner['ip']])
+        worst = max(worst, error)
+        print(f"{miner['ip']:<14}{uptime[miner['ip']]:>9.2f}{miner['availability']:>12.2f}{online * 100 / total:>14.2f}")
+    print(f"\nworst availability error: {worst:.2f} points")
+    assert worst <= args.tolerance, f'availability off by {worst:.2f} points'
+
+
+if __name__ == '__main__':
+    main()
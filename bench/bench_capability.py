@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+JSON API vs HTML scraping benchmark
+Polls fake miners with and without a JSON status endpoint through server.fetch_miner,
+checks capability detection and reports bytes and time per poll for each mode
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import server
+from fake_miner import FakeMiner
+
+
+def poll_fleet(miners, polls):
+    started = time.perf_counter()
+    for _ in range(polls):
+        for miner in miners:
+            data = server.fetch_miner(miner.url, timeout=5)
+            assert 'hashrate' in data and 'acceptedShares' in data, data
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON API and HTML scrape polling')
+    parser.add_argument('--miners', type=int, default=5, help='fake miners per mode')
+    parser.add_argument('--polls', type=int, default=200, help='polls per miner')
+    args = parser.parse_args()
+
+    print(f"{args.miners} miners per mode, {args.polls} polls each\n")
+    print(f"{'mode':<8}{'detected':>10}{'bytes/poll':>12}{'ms/poll':>10}")
+
+    for json_api in (False, True):
+        miners = [FakeMiner(json_api=json_api).start() for _ in range(args.miners)]
+
+        # First poll probes; measure steady-state polling afterwards
+        poll_fleet(miners, 1)
+        expected = 'json' if json_api else 'html'
+        detected = {server._capability_source(miner.url) for miner in miners}
+        assert detected == {expected}, f"expected {expected}, detected {detected}"
+
+        for miner in miners:
+            miner.bytes_sent = 0
+        elapsed = poll_fleet(miners, args.polls)
+        total_polls = args.miners * args.polls
+        sent = sum(miner.bytes_sent for miner in miners)
+
+        print(f"{expected:<8}{expected:>10}{sent / total_polls:>12.0f}{elapsed / total_polls * 1000:>10.2f}")
+        for miner in miners:
+            miner.stop()
+
+
+if __name__ == '__main__':
+    main()
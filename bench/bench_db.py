@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+SQLite write benchmark: one connection + commit per sample (the old /save path)
+vs pooled WAL connections with the write-behind queue
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database
+
+
+def legacy_save(db_file, miner_ip, miner_name, data):
+    """save_miner_data as it was before the write-behind queue"""
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO miners (ip, name, last_seen)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(ip) DO UPDATE SET
+            name = excluded.name,
+            last_seen = CURRENT_TIMESTAMP
+    ''', (miner_ip, miner_name))
+    cursor.execute('''
+        INSERT INTO miner_history
+        (miner_ip, miner_name, status, hashrate, shares, accepted_shares,
+         best_difficulty, temperature, uptime)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (miner_ip, miner_name, data.get('status', 'offline'), data.get('hashrate', 0),
+          data.get('shares', 0), data.get('acceptedShares', 0), data.get('bestDiff', 0),
+          data.get('temp', 0), data.get('uptime', 0)))
+    conn.commit()
+    conn.close()
+
+
+def fresh_database(journal_mode):
+    database.DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    database.init_database()
+    database.close_connection()
+    conn = sqlite3.connect(database.DB_FILE)
+    conn.execute(f'PRAGMA journal_mode={journal_mode}')
+    conn.close()
+    return database.DB_FILE
+
+
+def run_writers(save, samples, threads):
+    """Spread samples over writer threads, return elapsed seconds"""
+    per_thread = samples // threads
+
+    def writer(index):
+        for i in range(per_thread):
+            ip = f'10.0.{index}.{i % 100}'
+            save(ip, f'miner-{ip}', {'status': 'online', 'hashrate': 50000 + i, 'shares': i,
+                                     'acceptedShares': i, 'bestDiff': 0.5, 'temp': 45})
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return started, per_thread * threads
+
+
+def count_rows(db_file):
+    conn = sqlite3.connect(db_file)
+    count = conn.execute('SELECT COUNT(*) FROM miner_history').fetchone()[0]
+    conn.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark history inserts/sec')
+    parser.add_argument('--samples', type=int, default=2000, help='samples to insert')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent writers')
+    args = parser.parse_args()
+
+    print(f"{args.samples} samples from {args.threads} threads\n")
+
+    db_file = fresh_database('DELETE')
+    started, written = run_writers(lambda *a: legacy_save(db_file, *a), args.samples, args.threads)
+    elapsed = time.perf_counter() - started
+    assert count_rows(db_file) == written
+    print(f"per-sample commit   {written / elapsed:>10.0f} inserts/sec  ({elapsed:.2f}s)")
+
+    db_file = fresh_database('WAL')
+    started, written = run_writers(database.save_miner_data, args.samples, args.threads)
+    database.flush()
+    elapsed = time.perf_counter() - started
+    assert count_rows(db_file) == written
+    print(f"write-behind queue  {written / elapsed:>10.0f} inserts/sec  ({elapsed:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
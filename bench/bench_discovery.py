@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+LAN discovery benchmark: sweeps 127.0.0.0/24 with fake miners bound to loopback addresses
+Mixes NerdMiners (every page variant), a non-miner web server and hung hosts, and checks exactly the miners are found
+Linux answers on all of 127.0.0.0/8; on macOS add aliases first (sudo ifconfig lo0 alias 127.0.0.N)
+"""
+
+import argparse
+import http.server
+import os
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import discovery
+import server
+from fake_miner import FakeMiner, PAGE_VARIANTS
+
+
+class NotAMiner(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'<html><body><h1>Router admin</h1><span class="val">42</span></body></html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LAN discovery against loopback fake miners')
+    parser.add_argument('--miners', type=int, default=40, help='fake miners in the /24')
+    parser.add_argument('--hung', type=int, default=10, help='hosts that accept connections but never answer')
+    parser.add_argument('--latency', type=float, default=0.1, help='miner page delay (s)')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--concurrency', default='16,64,256', help='comma separated levels to compare')
+    args = parser.parse_args()
+
+    random.seed(1)
+    addresses = random.sample(range(2, 255), args.miners + args.hung + 1)
+    variants = list(PAGE_VARIANTS)
+    miners = [FakeMiner(f'127.0.0.{octet}', args.port, args.latency, variant=variants[i % len(variants)]).start()
+              for i, octet in enumerate(addresses[:args.miners])]
+    hung = [FakeMiner(f'127.0.0.{octet}', args.port, hang=True).start()
+            for octet in addresses[args.miners:args.miners + args.hung]]
+    other = http.server.ThreadingHTTPServer((f'127.0.0.{addresses[-1]}', args.port), NotAMiner)
+    threading.Thread(target=other.serve_forever, daemon=True).start()
+    expected = {miner.ip for miner in miners}
+
+    print(f"127.0.0.0/24:{args.port} - {args.miners} miners ({args.latency * 1000:.0f}ms), {args.hung} hung hosts, "
+          f"1 other web server, read timeout {discovery.DISCOVERY_READ_TIMEOUT}s\n")
+    print(f"{'concurrency':>12}{'seconds':>9}{'hosts/s':>9}{'found':>7}{'missed':>8}{'false +':>9}")
+    for concurrency in (int(level) for level in args.concurrency.split(',')):
+        started = time.perf_counter()
+        found = {miner_ip for miner_ip, _ in discovery.discover('127.0.0.0/24', server.fingerprint_miner,
+                                                                 (args.port,), concurrency)}
+        elapsed = time.perf_counter() - started
+        print(f"{concurrency:>12}{elapsed:>9.2f}{254 / elapsed:>9.0f}{len(found):>7}"
+              f"{len(expected - found):>8}{len(found - expected):>9}")
+
+    for miner in miners + hung:
+        miner.stop()
+    other.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+NerdMiner page parser microbenchmark
+Checks every parser agrees on the saved firmware pages in bench/corpus, then reports parses/sec
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from html.parser import HTMLParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import server
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+
+class LegacyParser(HTMLParser):
+    """NerdMinerHTMLParser as it was before the dispatch table and early exit"""
+    def __init__(self):
+        super().__init__()
+        self.data = {}
+        self.current_tag = None
+        self.current_attrs = {}
+        self.in_val_span = False
+        self.last_text = ""
+
+    def handle_starttag(self, tag, attrs):
+        self.current_tag = tag
+        self.current_attrs = dict(attrs)
+        if tag == 'span' and self.current_attrs.get('class') == 'val':
+            self.in_val_span = True
+
+    def handle_endtag(self, tag):
+        if tag == 'span':
+            self.in_val_span = False
+
+    def handle_data(self, data):
+        text = data.strip()
+        if not text:
+            return
+        if self.in_val_span:
+            if 'hash rate' in self.last_text.lower():
+                match = re.search(r'([\d.]+)\s*(h/s|kh/s|mh/s)', text, re.IGNORECASE)
+                if match:
+                    hashrate = float(match.group(1))
+                    unit = match.group(2).lower()
+                    if unit == 'kh/s':
+                        hashrate = hashrate * 1000
+                    elif unit == 'mh/s':
+                        hashrate = hashrate * 1000000
+                    self.data['hashrate'] = hashrate
+            elif 'accepted' in self.last_text.lower() and 'share' in self.last_text.lower():
+                match = re.search(r'(\d+)', text)
+                if match:
+                    self.data['acceptedShares'] = int(match.group(1))
+                    self.data['shares'] = int(match.group(1))
+            elif 'best' in self.last_text.lower() and 'diff' in self.last_text.lower():
+                match = re.search(r'([\d.]+)', text)
+                if match:
+                    self.data['bestDiff'] = float(match.group(1))
+            elif 'temp' in self.last_text.lower():
+                match = re.search(r'([\d.]+)\s*[°]?\s*([cf])?', text, re.IGNORECASE)
+                if match:
+                    temp = float(match.group(1))
+                    unit = match.group(2).lower() if match.group(2) else 'c'
+                    if unit == 'f':
+                        temp = (temp - 32) * 5.0 / 9.0
+                    self.data['temp'] = round(temp, 1)
+        self.last_text = text
+
+
+def legacy_parse(content):
+    parser = LegacyParser()
+    parser.feed(content.decode('utf-8', errors='ignore'))
+    return parser.data
+
+
+def html_parser(content):
+    server.BYTE_SCAN = False
+    return server.parse_miner_page(content)
+
+
+PARSERS = (
+    ('legacy', legacy_parse),
+    ('html-parser', html_parser),
+    ('byte-scan', server.scan_miner_page),
+)
+
+
+def load_corpus():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS, '*.html'))):
+        with open(path, 'rb') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark NerdMiner page parsers')
+    parser.add_argument('--seconds', type=float, default=1.0, help='time per parser per page')
+    parser.add_argument('--offsets', type=int, default=200, help='padding offsets each page is also checked at')
+    args = parser.parse_args()
+
+    pages = load_corpus()
+
+    # Every parser must extract the same stats as the original one
+    mismatches = 0
+    for name, content in pages.items():
+        expected = legacy_parse(content)
+        for parser_name, parse in PARSERS[1:]:
+            got = parse(content)
+            if got != expected:
+                mismatches += 1
+                print(f"✖ {parser_name} differs on {name}: {got} != {expected}")
+    # Shift each page across the parser's chunk boundaries - a value split between feeds must still parse
+    for name, content in pages.items():
+        head = content.index(b'<title>')
+        for offset in range(args.offsets):
+            shifted = content[:head] + b'<!--' + b' ' * offset + b'-->' + content[head:]
+            expected = legacy_parse(shifted)
+            for parser_name, parse in PARSERS[1:]:
+                got = parse(shifted)
+                if got != expected:
+                    mismatches += 1
+                    print(f"✖ {parser_name} differs on {name} shifted by {offset} bytes: {got} != {expected}")
+    if mismatches:
+        sys.exit(1)
+    print(f"✔ All parsers agree on {len(pages)} corpus pages, each shifted by 0-{args.offsets - 1} bytes\n")
+
+    print(f"{'page':<32}{'bytes':>8}" + ''.join(f"{name:>14}" for name, _ in PARSERS) + "   (parses/sec)")
+    for name, content in pages.items():
+        row = f"{name:<32}{len(content):>8}"
+        for _, parse in PARSERS:
+            count = 0
+            started = time.perf_counter()
+            while time.perf_counter() - started < args.seconds:
+                parse(content)
+                count += 1
+            row += f"{count / (time.perf_counter() - started):>14.0f}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Pool API benchmark: a fresh urlopen per request (the old /pool-api path)
+vs PoolClient with keep-alive connections, with and without the response cache.
+Also checks stale responses are served while the pool is down.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import server
+from fake_pool import FakePool
+
+
+def legacy_fetch(pool_url):
+    """/pool-api as it was before PoolClient"""
+    req = urllib.request.Request(pool_url)
+    req.add_header('User-Agent', 'NerdMinerStatus/1.0')
+    with urllib.request.urlopen(req, timeout=18) as response:
+        return response.read()
+
+
+def run(fetch, urls, requests):
+    started = time.perf_counter()
+    for i in range(requests):
+        body = fetch(urls[i % len(urls)])
+        assert body.startswith(b'{'), body
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /pool-api fetching')
+    parser.add_argument('--requests', type=int, default=500, help='requests per mode')
+    parser.add_argument('--wallets', type=int, default=5, help='distinct wallets')
+    parser.add_argument('--latency', type=float, default=0.002, help='pool response delay (s)')
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests over {args.wallets} wallets, pool latency {args.latency * 1000:.0f}ms\n")
+    print(f"{'mode':<14}{'req/s':>10}{'upstream':>10}{'connections':>13}")
+
+    modes = (
+        ('urlopen', None),
+        ('keep-alive', 0),
+        ('cached', server.POOL_CACHE_TTL),
+    )
+    for name, ttl in modes:
+        pool = FakePool(latency=args.latency).start()
+        urls = [server.pool_api_url(pool.url, f'bc1qbench{i:04d}') for i in range(args.wallets)]
+        if ttl is None:
+            fetch = legacy_fetch
+        else:
+            client = server.PoolClient(ttl=ttl, stale_ttl=0)
+            fetch = lambda url: client.fetch(url)[0]
+        elapsed = run(fetch, urls, args.requests)
+        print(f"{name:<14}{args.requests / elapsed:>10.0f}{pool.requests:>10}{pool.connections:>13}")
+        pool.stop()
+
+    # Outage: expired responses are still served from the cache
+    pool = FakePool().start()
+    client = server.PoolClient(ttl=0, stale_ttl=0)
+    url = server.pool_api_url(pool.url, 'bc1qbench0000')
+    client.fetch(url)
+    pool.down = True
+    with contextlib.redirect_stdout(io.StringIO()):
+        body, from_cache = client.fetch(url)
+    assert from_cache and body.startswith(b'{')
+    print("\n✔ Stale response served while the pool was down")
+    pool.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Recent-history benchmark: last-hour reads from SQLite vs the in-memory rings (server.RecentHistory)
+Also times the startup rebuild and the /history/recent read the live charts make on page load
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database
+import server
+
+
+def make_samples(miners, interval):
+    """An hour and a bit of samples per miner, one every interval seconds"""
+    now = int(time.time())
+    samples = []
+    for ts in range(now - 4000, now, interval):
+        for i in range(miners):
+            samples.append((f'10.0.{i // 250}.{i % 250 + 1}', f'NerdMiner {i}',
+                            time.strftime(database.TIMESTAMP_FORMAT, time.gmtime(ts)),
+                            {'status': 'online', 'hashrate': round(random.uniform(30000, 80000), 2),
+                             'shares': ts, 'acceptedShares': ts, 'bestDiff': 1.5, 'temp': 48, 'uptime': ts}))
+    return samples
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark last-hour history reads: SQLite vs memory')
+    parser.add_argument('--miners', type=int, default=50)
+    parser.add_argument('--interval', type=int, default=5, help='seconds between samples')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--storage', choices=('rows', 'compact'), default='rows')
+    args = parser.parse_args()
+
+    database.DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_recent.db')
+    database.init_database(args.storage)
+    random.seed(1)
+    database.save_samples(make_samples(args.miners, args.interval))
+    rebuild, _ = timed(server.recent_history.load, 1)
+
+    ip = '10.0.0.1'
+    limit = database.DEFAULT_MAX_POINTS
+    recent = server.recent_history
+    cases = [
+        ('one miner, 1h', lambda: database.get_miner_history(ip, 1, 'raw', limit),
+         lambda: database.downsample(recent.miner_history(ip, 1), limit)),
+        # Compact storage lists miners in id order, so compare by miner
+        ('all miners, 1h', lambda: {miner_ip: (name, points) for miner_ip, name, points in
+                                    database.iter_all_miners_history(1, 'raw', limit)},
+         lambda: {miner_ip: (name, database.downsample(points, limit)) for miner_ip, name, points in
+                  recent.all_history(1)}),
+    ]
+
+    print(f"{args.miners} miners, a sample every {args.interval}s, {args.storage} storage - "
+          f"{recent.sample_count()} samples in memory, rebuilt in {rebuild:.0f}ms\n")
+    print(f"{'query':<18}{'sqlite ms':>11}{'memory ms':>11}{'speedup':>9}")
+    for name, from_db, from_memory in cases:
+        db_ms, db_result = timed(from_db, args.repeat)
+        memory_ms, memory_result = timed(from_memory, args.repeat)
+        assert db_result == memory_result, name
+        print(f"{name:<18}{db_ms:>11.2f}{memory_ms:>11.2f}{db_ms / memory_ms:>8.1f}x")
+
+    latest_ms, _ = timed(lambda: recent.latest(20), args.repeat)
+    print(f"{'/history/recent':<18}{'-':>11}{latest_ms:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+History write benchmark: one POST /save per sample vs POST /save/batch (JSON array and NDJSON)
+Counts a sample as saved once it is in SQLite, so /save includes the write-behind flush
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database
+import server
+
+
+class QuietHandler(server.CORSRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def make_samples(miners, sweeps):
+    """One sweep = one sample per miner, like a dashboard refresh"""
+    samples = []
+    for sweep in range(sweeps):
+        for i in range(miners):
+            samples.append({
+                'ip': f'10.0.{i // 250}.{i % 250 + 1}',
+                'name': f'NerdMiner {i}',
+                'data': {'status': 'online', 'hashrate': round(random.uniform(30000, 80000), 2),
+                         'shares': sweep, 'acceptedShares': sweep, 'bestDiff': 1.5, 'temp': 48.0, 'uptime': sweep}
+            })
+    return samples
+
+
+def post(url, body, content_type='application/json'):
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': content_type})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.read()
+
+
+def history_rows():
+    conn = database.get_connection()
+    return conn.execute(f'SELECT COUNT(*) FROM {database._history_table()}').fetchone()[0]
+
+
+def run(mode, base_url, samples, miners, concurrency):
+    """Send every sample and return seconds until all of them are stored"""
+    before = history_rows()
+    started = time.perf_counter()
+
+    if mode == 'single':
+        bodies = [json.dumps(sample).encode() for sample in samples]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda body: post(base_url + '/save', body), bodies))
+        database.flush()
+    else:
+        # One request per sweep
+        sweeps = [samples[i:i + miners] for i in range(0, len(samples), miners)]
+        if mode == 'batch':
+            bodies = [json.dumps(sweep).encode() for sweep in sweeps]
+            content_type = 'application/json'
+        else:
+            bodies = ['\n'.join(json.dumps(sample) for sample in sweep).encode() for sweep in sweeps]
+            content_type = 'application/x-ndjson'
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda body: post(base_url + '/save/batch', body, content_type), bodies))
+
+    elapsed = time.perf_counter() - started
+    stored = history_rows() - before
+    assert stored == len(samples), (mode, stored, len(samples))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /save vs /save/batch')
+    parser.add_argument('--miners', type=int, default=50, help='samples per sweep')
+    parser.add_argument('--sweeps', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--storage', choices=('rows', 'compact'), default='rows')
+    args = parser.parse_args()
+
+    database.DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_save.db')
+    database.init_database(args.storage)
+    httpd = server.PooledHTTPServer(('127.0.0.1', 0), QuietHandler, workers=server.HTTP_WORKERS)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{httpd.server_address[1]}'
+
+    random.seed(1)
+    samples = make_samples(args.miners, args.sweeps)
+    print(f"{len(samples)} samples ({args.miners} miners x {args.sweeps} sweeps), "
+          f"{args.concurrency} concurrent clients, {args.storage} storage\n")
+    print(f"{'mode':<10}{'requests':>10}{'seconds':>10}{'samples/s':>12}")
+
+    baseline = None
+    for mode in ('single', 'batch', 'ndjson'):
+        elapsed = run(mode, base_url, samples, args.miners, args.concurrency)
+        requests = len(samples) if mode == 'single' else args.sweeps
+        rate = len(samples) / elapsed
+        baseline = baseline or rate
+        print(f"{mode:<10}{requests:>10}{elapsed:>10.2f}{rate:>12.0f}  ({rate / baseline:.1f}x)")
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+HTTP server benchmark: single-threaded TCPServer vs PooledHTTPServer
+Drives /proxy, static files and /history/miner with a mix of live and dead fake miners
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database
+import server
+from fake_miner import FakeMiner
+
+
+class QuietHandler(server.CORSRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class SingleThreadedServer(socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def start_server(mode, workers):
+    if mode == 'pooled':
+        httpd = server.PooledHTTPServer(('127.0.0.1', 0), QuietHandler, workers=workers)
+    else:
+        httpd = SingleThreadedServer(('127.0.0.1', 0), QuietHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd
+
+
+def build_request_mix(live, dead):
+    """Weighted list of (path, is_dead) a dashboard fleet would hit"""
+    mix = []
+    for miner in live:
+        mix += [(f'/proxy?url={miner.url}', False)] * 6
+        mix += [(f'/history/miner?ip={miner.ip}&hours=1', False)]
+    for miner in dead:
+        mix += [(f'/proxy?url={miner.url}', True)]
+    mix += [('/favicon.svg', False), ('/styles.css', False)] * max(1, len(live))
+    return mix
+
+
+def run_load(base_url, mix, concurrency, duration):
+    latencies = {False: [], True: []}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client():
+        while time.time() < deadline:
+            path, is_dead = random.choice(mix)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + path, timeout=60) as response:
+                    response.read()
+            except Exception:
+                with lock:
+                    errors[0] += 1
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[is_dead].append(elapsed)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+    return latencies, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dashboard HTTP serving modes')
+    parser.add_argument('--live', type=int, default=10, help='live fake miners')
+    parser.add_argument('--dead', type=int, default=2, help='unreachable fake miners')
+    parser.add_argument('--latency', type=float, default=0.05, help='live miner response delay (s)')
+    parser.add_argument('--dead-timeout', type=float, default=2.0, help='proxy timeout for dead miners (s)')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per mode')
+    parser.add_argument('--workers', type=int, default=server.HTTP_WORKERS, help='pooled server workers')
+    parser.add_argument('--modes', default='single,pooled', help='comma separated: single,pooled')
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    database.DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    database.init_database()
+    server.PROXY_TIMEOUT = args.dead_timeout
+
+    live = [FakeMiner(latency=args.latency).start() for _ in range(args.live)]
+    dead = [FakeMiner(hang=True).start() for _ in range(args.dead)]
+    for miner in live:
+        database.save_miner_data(miner.ip, 'bench', {'status': 'online', 'hashrate': 42})
+    mix = build_request_mix(live, dead)
+
+    print(f"Fleet: {args.live} live miners ({args.latency * 1000:.0f}ms), {args.dead} dead "
+          f"({args.dead_timeout}s timeout); {args.concurrency} clients, {args.duration}s per mode\n")
+    print(f"{'mode':<10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'p99 live ms':>13}")
+
+    for mode in args.modes.split(','):
+        server.miner_cache.clear()
+        httpd = start_server(mode, args.workers)
+        base_url = f'http://127.0.0.1:{httpd.server_address[1]}'
+        # Keep the server's per-request error prints out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, errors = run_load(base_url, mix, args.concurrency, args.duration)
+        httpd.shutdown()
+        httpd.server_close()
+
+        everything = latencies[False] + latencies[True]
+        rps = len(everything) / args.duration
+        print(f"{mode:<10}{len(everything):>10}{errors:>8}{rps:>10.1f}"
+              f"{percentile(everything, 50) * 1000:>10.1f}{percentile(everything, 99) * 1000:>10.1f}"
+              f"{percentile(latencies[False], 99) * 1000:>13.1f}")
+
+    for miner in live + dead:
+        miner.stop()
+
+
+if __name__ == '__main__':
+    main()
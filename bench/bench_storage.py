@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+History storage benchmark: miner_history rows vs the compact layout (with and without packed blocks)
+Fills 30 days x 100 miners of samples and reports bytes/row, insert rate and raw scan speed
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database
+
+
+def generate(miners, days, interval):
+    """Yield one batch of (ip, name, timestamp, data) samples per time step"""
+    now = int(time.time()) // interval * interval
+    state = {f'10.0.{i // 250}.{i % 250 + 1}': [random.uniform(30000, 80000), random.randint(0, 1000)]
+             for i in range(miners)}
+    for ts in range(now - days * 86400, now, interval):
+        timestamp = time.strftime(database.TIMESTAMP_FORMAT, time.gmtime(ts))
+        batch = []
+        for ip, miner in state.items():
+            online = random.random() > 0.02
+            miner[0] = max(1000.0, miner[0] + random.uniform(-500, 500))
+            miner[1] += random.randint(0, 2) if online else 0
+            data = {'status': 'online' if online else 'offline'}
+            if online:
+                data.update(hashrate=round(miner[0], 2), shares=miner[1], acceptedShares=miner[1],
+                            bestDiff=round(random.uniform(0, 2), 3), temp=round(random.uniform(40, 60), 1))
+            batch.append((ip, f'NerdMiner {ip}', timestamp, data))
+        yield batch
+
+
+def insert_rows(conn, samples):
+    """The miner_history insert from write_samples, without rollups"""
+    conn.executemany('''
+        INSERT INTO miner_history
+        (miner_ip, miner_name, timestamp, status, hashrate, shares, accepted_shares,
+         best_difficulty, temperature, uptime)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(ip, name, timestamp, data.get('status', 'offline'), data.get('hashrate', 0), data.get('shares', 0),
+           data.get('acceptedShares', 0), data.get('bestDiff', 0), data.get('temp', 0), data.get('uptime', 0))
+          for ip, name, timestamp, data in samples])
+
+
+def build(storage, args):
+    database.DB_FILE = os.path.join(tempfile.mkdtemp(), f'{storage}.db')
+    database.init_database('rows' if storage == 'rows' else 'compact')
+    conn = database.get_connection()
+    insert = insert_rows if storage == 'rows' else database._insert_compact
+
+    random.seed(1)
+    rows = 0
+    started = time.perf_counter()
+    for batch in generate(args.miners, args.days, args.interval):
+        with conn:
+            insert(conn, batch)
+        rows += len(batch)
+    elapsed = time.perf_counter() - started
+
+    if storage == 'packed':
+        database.pack_history_blocks(days=1)
+    conn.execute('VACUUM')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return rows, elapsed
+
+
+def timed(function):
+    started = time.perf_counter()
+    points = function()
+    return points, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark history storage layouts')
+    parser.add_argument('--miners', type=int, default=100)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--interval', type=int, default=60,
+                        help='seconds between samples (the poller uses 2-15s; 60 keeps the run short)')
+    args = parser.parse_args()
+
+    unlimited = 10 ** 9  # no downsampling - measure the raw scan
+    ip = '10.0.0.1'
+
+    print(f"{args.miners} miners x {args.days} days, one sample every {args.interval}s\n")
+    print(f"{'storage':<10}{'rows':>11}{'MB':>9}{'bytes/row':>11}{'inserts/s':>12}"
+          f"{'1 miner 24h ms':>16}{'fleet scan rows/s':>19}")
+
+    for storage in ('rows', 'compact', 'packed'):
+        rows, insert_time = build(storage, args)
+        size = database._database_size()
+
+        day, day_time = timed(lambda: database.get_miner_history(ip, 24, 'raw', unlimited))
+        scanned, scan_time = timed(lambda: sum(len(history) for _, _, history in
+                                               database.iter_all_miners_history((args.days + 1) * 24, 'raw', unlimited)))
+        assert scanned == rows, (scanned, rows)
+        assert day, 'no samples in the last 24h'
+
+        print(f"{storage:<10}{rows:>11}{size / 1048576:>9.1f}{size / rows:>11.1f}{rows / insert_time:>12.0f}"
+              f"{day_time * 1000:>16.1f}{scanned / scan_time:>19.0f}")
+        database.close_connection()
+
+
+if __name__ == '__main__':
+    main()
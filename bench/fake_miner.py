@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Fake NerdMiner devices for benchmarks and load tests
+Serves a NerdMiner-style status page with configurable latency and failures
+"""
+
+import http.server
+import json
+import random
+import socket
+import threading
+import time
+
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html>
+<head><title>NerdMiner</title></head>
+<body>
+<div class="card"><span class="lbl">Hash Rate</span><span class="val">{hashrate:.2f} KH/s</span></div>
+<div class="card"><span class="lbl">Accepted Shares</span><span class="val">{shares}</span></div>
+<div class="card"><span class="lbl">Best Diff</span><span class="val">{best_diff:.3f}</span></div>
+<div class="card"><span class="lbl">Temperature</span><span class="val">{temp:.1f} C</span></div>
+</body>
+</html>
+'''
+
+# Older firmware: a stats table, kH/s units, integer temperature
+TABLE_TEMPLATE = '''<!DOCTYPE html>
+<html>
+<head><title>NerdMiner Status</title></head>
+<body>
+<table class="stats">
+  <tr><th>Stat</th><th>Value</th></tr>
+  <tr><td>Total Hash Rate</td><td><span class='val'>{hashrate:.1f} kH/s</span></td></tr>
+  <tr><td>Accepted&nbsp;Shares</td><td><span class="val">{shares}</span></td></tr>
+  <tr><td>Best diff ever</td><td><span class="val">{best_diff:.4f}</span></td></tr>
+  <tr><td>Temp</td><td><span class="val">{temp:.0f} °C</span></td></tr>
+</table>
+</body>
+</html>
+'''
+
+# Boards without a temperature sensor
+NO_TEMPERATURE_TEMPLATE = '''<!DOCTYPE html>
+<html>
+<head><title>NerdMiner (no sensor)</title></head>
+<body>
+<div class="card"><span class="lbl">Hash Rate</span><span class="val">{hashrate:.2f} KH/s</span></div>
+<div class="card"><span class="lbl">Accepted Shares</span><span class="val">{shares}</span></div>
+<div class="card"><span class="lbl">Best Diff</span><span class="val">{best_diff:.3f}</span></div>
+</body>
+</html>
+'''
+
+# Status page variants by name ('json' serves the cards page plus /api/status)
+PAGE_VARIANTS = {
+    'cards': PAGE_TEMPLATE,
+    'table': TABLE_TEMPLATE,
+    'no-temp': NO_TEMPERATURE_TEMPLATE,
+    'json': PAGE_TEMPLATE
+}
+
+
+class FakeMiner:
+    """A local HTTP server that pretends to be a NerdMiner ESP32.
+
+    latency      - seconds to wait before answering each request
+    failure_rate - fraction of requests answered with HTTP 500
+    hang         - accept connections but never answer (unreachable miner)
+    json_api     - also serve stats as JSON at /api/status (newer firmware)
+    variant      - status page layout, one of PAGE_VARIANTS ('json' implies json_api)
+    """
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, hang=False,
+                 json_api=False, variant='cards'):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.hang = hang
+        self.json_api = json_api or variant == 'json'
+        self.template = PAGE_VARIANTS[variant]
+        self.variant = variant
+        self.requests = 0
+        self.bytes_sent = 0
+        self.shares = random.randint(0, 500)
+        self.hashrate = random.uniform(30, 80)
+        self.thread = None
+
+        if hang:
+            # A listening socket that never accepts: connects succeed, reads time out
+            self.server = None
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.bind((host, port))
+            self.sock.listen(128)
+            self.address = self.sock.getsockname()
+        else:
+            self.server = http.server.ThreadingHTTPServer((host, port), self._make_handler())
+            self.server.daemon_threads = True
+            self.address = self.server.server_address
+
+    @property
+    def ip(self):
+        """Miner "IP" as the dashboard stores it (host:port)"""
+        return f'{self.address[0]}:{self.address[1]}'
+
+    @property
+    def url(self):
+        return f'http://{self.ip}/'
+
+    def _tick(self):
+        self.shares += random.randint(0, 2)
+        self.hashrate = max(1.0, self.hashrate + random.uniform(-1, 1))
+
+    def status(self):
+        """Stats as the JSON API reports them"""
+        self._tick()
+        return json.dumps({
+            'hashRate': round(self.hashrate * 1000, 2),
+            'acceptedShares': self.shares,
+            'bestDiff': round(random.uniform(0, 2), 3),
+            'temp': round(random.uniform(40, 60), 1)
+        }).encode()
+
+    def page(self):
+        self._tick()
+        return self.template.format(
+            hashrate=self.hashrate,
+            shares=self.shares,
+            best_diff=random.uniform(0, 2),
+            temp=random.uniform(40, 60)
+        ).encode()
+
+    def _make_handler(self):
+        miner = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                miner.requests += 1
+                if miner.latency:
+                    time.sleep(miner.latency)
+                if random.random() < miner.failure_rate:
+                    self.send_error(500)
+                    return
+                if self.path == '/':
+                    body, content_type = miner.page(), 'text/html'
+                elif self.path == '/api/status' and miner.json_api:
+                    body, content_type = miner.status(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                miner.bytes_sent += len(body)
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        if self.server:
+            self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        else:
+            self.sock.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run fake NerdMiner devices')
+    parser.add_argument('--count', type=int, default=1, help='number of fake miners')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help='first port (0 = random)')
+    parser.add_argument('--latency', type=float, default=0.0, help='response delay in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--json-api', action='store_true', help='serve /api/status JSON too')
+    parser.add_argument('--variant', choices=sorted(PAGE_VARIANTS), default='cards', help='status page layout')
+    args = parser.parse_args()
+
+    miners = []
+    for i in range(args.count):
+        port = args.port + i if args.port else 0
+        miners.append(FakeMiner(args.host, port, args.latency, args.failure_rate,
+                                json_api=args.json_api, variant=args.variant).start())
+        print(f"⛏️  Fake miner at {miners[-1].url}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for miner in miners:
+            miner.stop()
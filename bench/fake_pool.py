@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Fake mining pool API for benchmarks and manual testing
+Answers public-pool style /api/client/<wallet> requests over keep-alive HTTP/1.1
+"""
+
+import http.server
+import json
+import random
+import threading
+import time
+
+
+class FakePool:
+    """A local HTTP server that pretends to be public-pool.io's client API.
+
+    latency      - seconds to wait before answering each request
+    failure_rate - fraction of requests answered with HTTP 503
+    down         - answer every request with HTTP 503 (pool outage)
+    """
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.down = False
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = http.server.ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+        self.thread = None
+
+    @property
+    def url(self):
+        """Value for the dashboard's ?pool= parameter"""
+        return f'http://{self.address[0]}:{self.address[1]}'
+
+    def client(self, wallet):
+        workers = [{
+            'sessionId': f'{wallet[-4:]}{i}',
+            'name': f'nerdminer-{i}',
+            'bestDifficulty': round(random.uniform(0, 5000), 2),
+            'hashRate': round(random.uniform(30000, 80000), 2),
+            'startTime': '2024-01-01T00:00:00.000Z',
+            'lastSeen': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+        } for i in range(3)]
+        return json.dumps({
+            'bestDifficulty': max(worker['bestDifficulty'] for worker in workers),
+            'workersCount': len(workers),
+            'workers': workers
+        }).encode()
+
+    def _make_handler(self):
+        pool = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep connections open between requests
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def setup(self):
+                super().setup()
+                with pool.lock:
+                    pool.connections += 1
+
+            def do_GET(self):
+                with pool.lock:
+                    pool.requests += 1
+                if pool.latency:
+                    time.sleep(pool.latency)
+                if pool.down or random.random() < pool.failure_rate:
+                    self.send_error(503)
+                    return
+                if not self.path.startswith('/api/client/'):
+                    self.send_error(404)
+                    return
+                body = pool.client(self.path.rsplit('/', 1)[-1])
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a fake mining pool API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help='port (0 = random)')
+    parser.add_argument('--latency', type=float, default=0.0, help='response delay in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    pool = FakePool(args.host, args.port, args.latency, args.failure_rate).start()
+    print(f"🏊 Fake pool at {pool.url} - use /pool-api?wallet=<wallet>&pool={pool.url}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pool.stop()
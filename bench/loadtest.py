@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Headless load test: server.py against a simulated ESP32 fleet
+Grows the fleet in stages, drives /proxy, /fleet, /save and /history/* at a fixed request rate and
+reports throughput, latency percentiles, database growth and memory over time
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database
+import server
+from fake_miner import FakeMiner, PAGE_VARIANTS
+
+# Share of requests per endpoint - roughly a few dashboards open plus a collector posting samples
+REQUEST_MIX = {
+    'proxy': 40,
+    'fleet': 15,
+    'save': 10,
+    'save-batch': 5,
+    'history-miner': 15,
+    'history-total': 10,
+    'history-all': 5
+}
+
+
+class QuietHandler(server.CORSRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def rss_mb():
+    """Resident memory of this process (server, poller and load generator together)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1048576
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # peak, not current
+    except ImportError:
+        return None
+
+
+class Fleet:
+    """Fake miners registered with the dashboard; grows between stages"""
+    def __init__(self, args):
+        self.args = args
+        self.miners = []
+
+    def grow(self, count):
+        variants = self.args.variants.split(',')
+        while len(self.miners) < count:
+            index = len(self.miners)
+            if random.random() < self.args.dead:
+                miner = FakeMiner(hang=True)
+            else:
+                latency = random.uniform(0.5, 1.5) * self.args.latency
+                miner = FakeMiner(latency=latency, failure_rate=self.args.failure_rate,
+                                  variant=variants[index % len(variants)])
+            self.miners.append(miner.start())
+            database.register_miner(miner.ip, f'NerdMiner {index}')
+        server.poller.poll_now()
+
+    def sample(self):
+        miner = random.choice(self.miners)
+        return {'ip': miner.ip, 'name': 'loadtest', 'data': {
+            'status': 'online', 'hashrate': round(random.uniform(30000, 80000), 2),
+            'shares': random.randint(0, 1000), 'acceptedShares': random.randint(0, 1000),
+            'bestDiff': round(random.uniform(0, 2), 3), 'temp': round(random.uniform(40, 60), 1)}}
+
+    def stop(self):
+        for miner in self.miners:
+            miner.stop()
+
+
+class LoadGenerator:
+    """Open-loop request generator: Poisson arrivals at a fixed rate, whatever the latency"""
+    def __init__(self, base_url, fleet, rate, concurrency):
+        self.base_url = base_url
+        self.fleet = fleet
+        self.rate = rate
+        self.backlog = concurrency * 4
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load')
+        self.results = []  # (finished_at, kind, seconds, ok)
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.kinds = list(REQUEST_MIX)
+        self.weights = [REQUEST_MIX[kind] for kind in self.kinds]
+        self.pending = 0
+
+    def request(self, kind):
+        miner = random.choice(self.fleet.miners)
+        if kind == 'proxy':
+            return urllib.request.Request(f'{self.base_url}/proxy?url={miner.url}')
+        if kind == 'fleet':
+            return urllib.request.Request(f'{self.base_url}/fleet')
+        if kind == 'save':
+            return urllib.request.Request(f'{self.base_url}/save', json.dumps(self.fleet.sample()).encode(),
+                                          {'Content-Type': 'application/json'})
+        if kind == 'save-batch':
+            body = json.dumps([self.fleet.sample() for _ in range(50)]).encode()
+            return urllib.request.Request(f'{self.base_url}/save/batch', body, {'Content-Type': 'application/json'})
+        hours = random.choice((1, 24, 24 * 7, 24 * 30))
+        if kind == 'history-miner':
+            return urllib.request.Request(f'{self.base_url}/history/miner?ip={miner.ip}&hours={hours}&max_points=500')
+        if kind == 'history-total':
+            return urllib.request.Request(f'{self.base_url}/history/total?hours={hours}&max_points=500')
+        return urllib.request.Request(f'{self.base_url}/history/all?hours={hours}&max_points=200',
+                                      headers={'Accept-Encoding': 'gzip'})
+
+    def _send(self, kind):
+        started = time.perf_counter()
+        ok = True
+        try:
+            with urllib.request.urlopen(self.request(kind), timeout=60) as response:
+                response.read()
+        except (urllib.error.URLError, OSError):
+            ok = False
+        finished = time.perf_counter()
+        with self.lock:
+            self.results.append((finished, kind, finished - started, ok))
+            self.pending -= 1
+
+    def run(self, duration, on_tick, tick):
+        """Generate load for duration seconds, calling on_tick every tick seconds"""
+        deadline = time.perf_counter() + duration
+        next_tick = time.perf_counter() + tick
+        next_send = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            if now >= next_tick:
+                on_tick()
+                next_tick += tick
+            if now >= deadline:
+                break
+            if now < next_send:
+                time.sleep(min(next_send, next_tick, deadline) - now)
+                continue
+            next_send += random.expovariate(self.rate)
+            with self.lock:
+                # Past the client pool's backlog the server has fallen behind - count it, don't queue forever
+                if self.pending >= self.backlog:
+                    self.dropped += 1
+                    continue
+                self.pending += 1
+            self.executor.submit(self._send, random.choices(self.kinds, self.weights)[0])
+
+    def window(self, since):
+        with self.lock:
+            return [result for result in self.results if result[0] >= since]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+def summarize(results, seconds):
+    """Per-endpoint count, errors, req/s and latency percentiles (ms)"""
+    summary = {}
+    for kind in list(REQUEST_MIX) + ['all']:
+        rows = results if kind == 'all' else [result for result in results if result[1] == kind]
+        if not rows:
+            continue
+        latencies = [result[2] for result in rows]
+        summary[kind] = {
+            'requests': len(rows),
+            'errors': sum(1 for result in rows if not result[3]),
+            'rps': round(len(rows) / seconds, 1),
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(max(latencies) * 1000, 1)
+        }
+    return summary
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of this run against a saved one: p99 or throughput worse than tolerance"""
+    problems = []
+    for stage, endpoints in baseline.items():
+        for kind, before in endpoints.items():
+            after = results.get(stage, {}).get(kind)
+            if after is None:
+                continue
+            if after['p99'] > before['p99'] * (1 + tolerance) and after['p99'] - before['p99'] > 5:
+                problems.append(f"{stage} {kind}: p99 {before['p99']}ms -> {after['p99']}ms")
+            if after['rps'] < before['rps'] * (1 - tolerance):
+                problems.append(f"{stage} {kind}: {before['rps']} -> {after['rps']} req/s")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the dashboard server against a fake miner fleet')
+    parser.add_argument('--miners', default='10,50,200', help='fleet size per stage, comma separated')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds per stage')
+    parser.add_argument('--rate', type=float, default=50.0, help='dashboard/collector requests per second')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent client connections')
+    parser.add_argument('--latency', type=float, default=0.08, help='mean miner response delay (s)')
+    parser.add_argument('--failure-rate', type=float, default=0.02, help='fraction of miner requests answered 500')
+    parser.add_argument('--dead', type=float, default=0.05, help='fraction of miners that never answer')
+    parser.add_argument('--variants', default=','.join(PAGE_VARIANTS),
+                        help=f'status page variants, cycled over the fleet ({", ".join(PAGE_VARIANTS)})')
+    parser.add_argument('--workers', type=int, default=server.HTTP_WORKERS, help='server HTTP workers')
+    parser.add_argument('--storage', choices=('rows', 'compact'), default='rows')
+    parser.add_argument('--report-every', type=float, default=10.0, help='seconds between progress lines')
+    parser.add_argument('--save', metavar='FILE', help='write the per-stage summary as JSON')
+    parser.add_argument('--compare', metavar='FILE', help='fail if p99 or req/s regressed against a saved summary')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed regression for --compare')
+    parser.add_argument('--verbose', action='store_true', help='keep the server and poller log output')
+    args = parser.parse_args()
+
+    stages = [int(count) for count in args.miners.split(',')]
+    out = sys.stdout
+    if not args.verbose:
+        sys.stdout = open(os.devnull, 'w')  # poller status lines would swamp the report
+
+    def report(line=''):
+        print(line, file=out, flush=True)
+
+    random.seed(1)
+    os.chdir(ROOT)
+    database.DB_FILE = os.path.join(tempfile.mkdtemp(), 'loadtest.db')
+    database.init_database(args.storage)
+    server.poller.start()
+    httpd = server.PooledHTTPServer(('127.0.0.1', 0), QuietHandler, workers=args.workers)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{httpd.server_address[1]}'
+
+    fleet = Fleet(args)
+    load = LoadGenerator(base_url, fleet, args.rate, args.concurrency)
+    started = time.perf_counter()
+    last = [started]
+
+    def tick():
+        now = time.perf_counter()
+        window = load.window(last[0])
+        last[0] = now
+        latencies = [result[2] for result in window]
+        stats = database.get_database_stats()
+        memory = rss_mb()
+        report(f"{now - started:>7.0f}{len(fleet.miners):>8}{len(window) / args.report_every:>9.1f}"
+               f"{sum(1 for result in window if not result[3]):>8}{load.dropped:>9}"
+               f"{percentile(latencies, 50) * 1000:>9.1f}{percentile(latencies, 99) * 1000:>9.1f}"
+               f"{stats['total_records']:>11}{database._database_size() / 1048576:>9.2f}"
+               f"{'-' if memory is None else f'{memory:.0f}':>9}")
+
+    report(f"Load test: stages of {args.miners} miners, {args.duration:g}s each, {args.rate:g} req/s, "
+           f"miner latency ~{args.latency * 1000:.0f}ms, {args.failure_rate:.0%} errors, {args.dead:.0%} dead\n")
+    report(f"{'time s':>7}{'miners':>8}{'req/s':>9}{'errors':>8}{'dropped':>9}{'p50 ms':>9}{'p99 ms':>9}"
+           f"{'db rows':>11}{'db MB':>9}{'RSS MB':>9}")
+
+    results = {}
+    try:
+        for count in stages:
+            fleet.grow(count)
+            stage_started = time.perf_counter()
+            load.run(args.duration, tick, args.report_every)
+            results[f'{count} miners'] = summarize(load.window(stage_started), time.perf_counter() - stage_started)
+    finally:
+        load.close()
+        httpd.shutdown()
+        httpd.server_close()
+        server.poller.stop()
+        fleet.stop()
+
+    for stage, summary in results.items():
+        report(f"\n{stage}")
+        report(f"  {'endpoint':<15}{'requests':>9}{'errors':>8}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}"
+               f"{'p99 ms':>9}{'max ms':>9}")
+        for kind, row in summary.items():
+            report(f"  {kind:<15}{row['requests']:>9}{row['errors']:>8}{row['rps']:>8}{row['p50']:>9}"
+                   f"{row['p95']:>9}{row['p99']:>9}{row['max']:>9}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        report(f"\n💾 Summary saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        if problems:
+            report(f"\n✖ {len(problems)} regression(s) against {args.compare}:")
+            for problem in problems:
+                report(f"  {problem}")
+            sys.exit(1)
+        report(f"\n✔ No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
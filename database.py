@@ -5,16 +5,233 @@ SQLite database for NerdMiner history tracking
 
 import sqlite3
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
+import threading
+import time
+import calendar
+import itertools
+import heapq
+import zlib
+import atexit
+import metrics
 
 DB_FILE = 'nerdminer_history.db'
 
-def init_database():
-    """Initialize the database with required tables"""
-    conn = sqlite3.connect(DB_FILE)
+# Write-behind queue: samples are coalesced into one transaction per flush
+FLUSH_INTERVAL = 1.0  # seconds
+
+# Rollup tiers maintained alongside raw history: (resolution, bucket seconds)
+ROLLUP_TIERS = (('1m', 60), ('1h', 3600), ('1d', 86400))
+RAW_SAMPLE_SECONDS = 5     # poll cadence - used to estimate raw row counts
+DEFAULT_MAX_POINTS = 1000  # history responses never exceed this many points
+CARRY_FORWARD_SECONDS = 300  # fleet totals keep a silent miner's last values this long
+
+# Background maintenance
+RETENTION_DAYS = 30          # history and rollups older than this are deleted
+STALE_MINER_DAYS = 30        # miners not seen online for this long stop being polled
+CLEANUP_BATCH = 5000         # rows per delete transaction
+MAINTENANCE_INTERVAL = 3600  # seconds between maintenance runs
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Columns of the rows iter_history_rows yields (miner_history's, without the row id)
+HISTORY_FIELDS = ('miner_ip', 'miner_name', 'timestamp', 'status', 'hashrate', 'shares', 'accepted_shares',
+                  'best_difficulty', 'temperature', 'uptime')
+
+# Analytics summaries (get_miner_analytics) and the thresholds behind their anomaly flags
+ANALYTICS_MAX_BUCKETS = 1500   # finest rollup tier with at most this many buckets per miner is used
+ANOMALY_AVAILABILITY = 90.0    # % - 'low_availability' below this
+ANOMALY_UNDERPERFORM = 0.8     # 'underperforming' below this fraction of the fleet's median hashrate
+ANOMALY_HASHRATE_DROP = 0.7    # 'hashrate_drop' when the last hour is below this fraction of the window median
+ANOMALY_TEMPERATURE = 70.0     # °C - 'overheating' at or above this
+ANOMALY_NO_SHARES_HOURS = 6    # 'no_shares' when online this long without a new share
+
+# Raw history layout, fixed per database file (init_database detects it):
+#   'rows'    - miner_history: one text-keyed row per sample
+#   'compact' - history_compact: integer miner id + epoch clustered key, no per-row
+#               name/uptime/shares (shares always equals accepted shares when scraped)
+#               Samples older than PACK_AFTER_DAYS are packed into history_blocks.
+# Convert an existing database with migrate_storage.py.
+STORAGE_MODE = 'rows'
+PACK_AFTER_DAYS = 7  # compact mode: days before raw samples are packed into compressed day blocks (0 = never)
+
+# Latency of each database function, served by /metrics
+DB_SECONDS = metrics.histogram('nerdminer_db_seconds', 'SQLite operation latency in seconds', ('operation',))
+SAMPLES_WRITTEN = metrics.counter('nerdminer_db_samples_written_total', 'History samples written to SQLite')
+metrics.gauge('nerdminer_db_write_queue', 'Samples waiting for the write-behind flush', lambda: len(_pending))
+
+_local = threading.local()
+_pending = []
+_pending_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_write_lock = threading.Lock()
+_writer_thread = None
+_last_shares = {}  # miner_ip -> last online accepted_shares, for share deltas
+_maintenance_thread = None
+_miner_ids = {}  # (DB_FILE, miner_ip) -> history_compact miner id
+
+# Progress of the background maintenance job (reported by /db/stats)
+maintenance_stats = {
+    'running': False,
+    'phase': None,
+    'last_run': None,
+    'last_duration_s': None,
+    'deleted_rows': 0,
+    'pruned_miners': 0,
+    'reclaimed_bytes': 0,
+    'total_deleted_rows': 0,
+    'total_reclaimed_bytes': 0
+}
+
+def get_connection():
+    """Get this thread's SQLite connection, opening it on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.db_file != DB_FILE:
+        conn = sqlite3.connect(DB_FILE, timeout=30)
+        # Only takes effect on a new file, and only before anything (even the
+        # WAL switch) writes its header - existing files see enable_incremental_vacuum
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        # WAL lets readers run while the writer commits; NORMAL sync is
+        # crash-safe under WAL and avoids an fsync per transaction
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA cache_size=-16000')  # 16 MB page cache
+        conn.execute('PRAGMA temp_store=MEMORY')
+        _local.conn = conn
+        _local.db_file = DB_FILE
+    return conn
+
+def close_connection():
+    """Close this thread's connection (reopened on next use)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+def init_database(storage=None):
+    """Initialize the database with required tables.
+    
+    storage picks the raw history layout ('rows' or 'compact') for a new file.
+    """
+    conn = get_connection()
     cursor = conn.cursor()
     
+    # Incremental auto-vacuum lets maintenance hand freed pages back to the OS.
+    # New files get it from get_connection; older ones need a blocking VACUUM,
+    # which only runs when asked for
+    cursor.execute('PRAGMA auto_vacuum')
+    if cursor.fetchone()[0] != 2:
+        print(f"ℹ️  {DB_FILE} does not return freed space to disk - "
+              f"start once with --vacuum to convert it (one-time VACUUM, blocks writes while it runs)")
+    
+    # Keep whichever history layout the file already has; new files use STORAGE_MODE
+    global STORAGE_MODE
+    cursor.execute('''
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND name IN ('miner_history', 'history_compact')
+    ''')
+    existing = {row[0] for row in cursor.fetchall()}
+    if existing:
+        STORAGE_MODE = 'compact' if 'history_compact' in existing else 'rows'
+        if storage and storage != STORAGE_MODE:
+            print(f"⚠️  {DB_FILE} uses '{STORAGE_MODE}' storage - run migrate_storage.py to convert it")
+    else:
+        STORAGE_MODE = storage or STORAGE_MODE
+    
+    if STORAGE_MODE == 'compact':
+        create_compact_tables(cursor)
+    else:
+        _create_row_tables(cursor)
+    
+    # Miner metadata table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS miners (
+            ip TEXT PRIMARY KEY,
+            name TEXT,
+            first_seen DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_seen DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Site of miners reported by a remote collector (NULL = polled by this server)
+    cursor.execute('PRAGMA table_info(miners)')
+    columns = {row[1] for row in cursor.fetchall()}
+    if 'site' not in columns:
+        cursor.execute('ALTER TABLE miners ADD COLUMN site TEXT')
+    
+    # Whether the poller scrapes a miner: only ones added by hand or by discovery.
+    # Miners only known from pushed samples (/save, /ingest) are listed, not polled
+    if 'polled' not in columns:
+        cursor.execute('ALTER TABLE miners ADD COLUMN polled INTEGER NOT NULL DEFAULT 1')
+    
+    # Rollup tables: per-bucket min/max/sum so long windows stay small.
+    # Hashrates are over online samples only (offline ones count as 0), temperatures
+    # over the online samples that reported one (temp_samples)
+    for resolution, _ in ROLLUP_TIERS:
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS miner_rollup_{resolution} (
+                miner_ip TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                samples INTEGER NOT NULL,
+                online_samples INTEGER NOT NULL,
+                hashrate_min REAL,
+                hashrate_max REAL,
+                hashrate_sum REAL,
+                temp_min REAL,
+                temp_max REAL,
+                temp_sum REAL,
+                shares_last INTEGER,
+                shares_delta INTEGER,
+                best_difficulty REAL,
+                temp_samples INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (miner_ip, bucket)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute(f'PRAGMA table_info(miner_rollup_{resolution})')
+        if 'temp_samples' not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute(f'ALTER TABLE miner_rollup_{resolution} ADD COLUMN temp_samples INTEGER NOT NULL DEFAULT 0')
+            # Older buckets only counted online samples - the best estimate there is
+            cursor.execute(f'''
+                UPDATE miner_rollup_{resolution}
+                SET temp_samples = online_samples
+                WHERE temp_max IS NOT NULL
+            ''')
+        # Fleet totals scan a bucket range across all miners
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_rollup_{resolution}_bucket
+            ON miner_rollup_{resolution}(bucket)
+        ''')
+    
+    conn.commit()
+    
+    # Build rollups for history recorded before they existed
+    cursor.execute('SELECT EXISTS(SELECT 1 FROM miner_rollup_1m)')
+    if not cursor.fetchone()[0]:
+        cursor.execute(f'SELECT EXISTS(SELECT 1 FROM {_history_table()})')
+        if cursor.fetchone()[0]:
+            rebuild_rollups()
+    
+    print(f"✅ Database initialized: {DB_FILE} ({STORAGE_MODE} storage)")
+
+def _history_table():
+    return 'history_compact' if STORAGE_MODE == 'compact' else 'miner_history'
+
+def _history_source():
+    """Raw history as (miner_ip, epoch, online, hashrate, temperature, accepted_shares, best_difficulty)"""
+    if STORAGE_MODE == 'compact':
+        return '''
+            SELECT m.ip AS miner_ip, h.ts AS epoch, h.online, h.hashrate, h.temperature,
+                   h.accepted_shares, h.best_difficulty
+            FROM history_compact h JOIN miner_ids m ON m.id = h.miner_id
+        '''
+    return '''
+        SELECT miner_ip, CAST(strftime('%s', timestamp) AS INTEGER) AS epoch, status = 'online' AS online,
+               hashrate, temperature, accepted_shares, best_difficulty
+        FROM miner_history
+    '''
+
+def _create_row_tables(cursor):
     # Miner stats history table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS miner_history (
@@ -38,200 +255,1191 @@ def init_database():
         ON miner_history(miner_ip, timestamp)
     ''')
     
-    # Miner metadata table
+    # Retention cleanup finds expired rows by time alone
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS miners (
-            ip TEXT PRIMARY KEY,
-            name TEXT,
-            first_seen DATETIME DEFAULT CURRENT_TIMESTAMP,
-            last_seen DATETIME DEFAULT CURRENT_TIMESTAMP
+        CREATE INDEX IF NOT EXISTS idx_history_timestamp
+        ON miner_history(timestamp)
+    ''')
+
+def create_compact_tables(cursor):
+    """Create the compact history tables (new files and migrate_to_compact)"""
+    # Small integer ids stand in for the miner IP in every compact row (never pruned)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS miner_ids (
+            id INTEGER PRIMARY KEY,
+            ip TEXT NOT NULL UNIQUE,
+            name TEXT
         )
     ''')
     
-    conn.commit()
-    conn.close()
-    print(f"✅ Database initialized: {DB_FILE}")
+    # Raw samples clustered by miner then time, so a miner's range is one contiguous scan
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS history_compact (
+            miner_id INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            online INTEGER NOT NULL,
+            hashrate REAL,
+            accepted_shares INTEGER,
+            best_difficulty REAL,
+            temperature REAL,
+            PRIMARY KEY (miner_id, ts)
+        ) WITHOUT ROWID
+    ''')
+    
+    # One zlib-compressed, delta-encoded block per miner per UTC day for older samples
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS history_blocks (
+            miner_id INTEGER NOT NULL,
+            ts_start INTEGER NOT NULL,
+            ts_end INTEGER NOT NULL,
+            samples INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (miner_id, ts_start)
+        ) WITHOUT ROWID
+    ''')
+
+@metrics.timed(DB_SECONDS, 'rebuild_rollups')
+def rebuild_rollups():
+    """Recompute every rollup tier from raw history.
+    
+    Share deltas are approximated as max - min accepted shares per bucket.
+    Samples already packed into history_blocks are not included.
+    """
+    conn = get_connection()
+    
+    with _write_lock, conn:
+        for resolution, seconds in ROLLUP_TIERS:
+            conn.execute(f'DELETE FROM miner_rollup_{resolution}')
+            conn.execute(f'''
+                INSERT INTO miner_rollup_{resolution}
+                (miner_ip, bucket, samples, online_samples, hashrate_min, hashrate_max, hashrate_sum,
+                 temp_min, temp_max, temp_sum, shares_last, shares_delta, best_difficulty, temp_samples)
+                SELECT
+                    miner_ip,
+                    epoch / {seconds} * {seconds} AS bucket,
+                    COUNT(*),
+                    SUM(online),
+                    MIN(CASE WHEN online THEN hashrate ELSE 0 END),
+                    MAX(CASE WHEN online THEN hashrate ELSE 0 END),
+                    SUM(CASE WHEN online THEN hashrate ELSE 0 END),
+                    MIN(CASE WHEN online THEN NULLIF(temperature, 0) END),
+                    MAX(CASE WHEN online THEN NULLIF(temperature, 0) END),
+                    COALESCE(SUM(CASE WHEN online THEN NULLIF(temperature, 0) END), 0),
+                    MAX(accepted_shares),
+                    MAX(accepted_shares) - MIN(CASE WHEN online THEN accepted_shares END),
+                    MAX(best_difficulty),
+                    COUNT(CASE WHEN online THEN NULLIF(temperature, 0) END)
+                FROM ({_history_source()})
+                GROUP BY miner_ip, bucket
+            ''')
+    print(f"📈 Rebuilt history rollups")
+
+def save_miner_data(miner_ip, miner_name, data, timestamp=None):
+    """Queue miner data for the history table (written by the background writer)"""
+    timestamp = timestamp or datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    with _pending_lock:
+        _pending.append((miner_ip, miner_name, timestamp, data))
+    _start_writer()
+
+def flush():
+    """Write all queued samples in a single transaction.
+    
+    If the transaction fails on a sample's data, the batch is retried one
+    sample per transaction so only the bad samples are dropped. When the
+    database itself fails (locked, disk full) the samples go back on the
+    queue for the next flush.
+    """
+    with _flush_lock:
+        with _pending_lock:
+            samples = _pending[:]
+            del _pending[:]
+        if not samples:
+            return 0
+        
+        try:
+            write_samples(samples)
+            written = len(samples)
+        except sqlite3.OperationalError:
+            _requeue(samples)
+            raise
+        except Exception:
+            written = 0
+            for i, sample in enumerate(samples):
+                try:
+                    write_samples([sample])
+                    written += 1
+                except sqlite3.OperationalError:
+                    _requeue(samples[i:])
+                    raise
+                except Exception as e:
+                    print(f"⚠️  Dropped a history sample for {sample[0]}: {e}")
+        
+        SAMPLES_WRITTEN.inc(amount=written)
+        return written
+
+def _requeue(samples):
+    """Put unwritten samples back at the front of the queue, oldest first"""
+    with _pending_lock:
+        _pending[:0] = samples
+
+def save_samples(samples):
+    """Write a batch of (miner_ip, miner_name, timestamp, data) samples now, in one transaction"""
+    samples = sorted(samples, key=lambda sample: sample[2])  # share deltas need time order
+    flush()  # queued samples first, so rollups see each miner's samples in order
+    with _flush_lock:
+        write_samples(samples)
+        SAMPLES_WRITTEN.inc(amount=len(samples))
+    return len(samples)
+
+@metrics.timed(DB_SECONDS, 'write_samples')
+def write_samples(samples):
+    """Insert (miner_ip, miner_name, timestamp, data) samples in one transaction"""
+    conn = get_connection()
+    last_shares = {ip: _last_shares.get(ip) for ip, _, _, _ in samples}
+    
+    try:
+        with _write_lock, conn:
+            _update_rollups(conn, samples)
+            
+            # Update or insert miner metadata
+            conn.executemany('''
+                INSERT INTO miners (ip, name, last_seen, site, polled)
+                VALUES (?, ?, ?, ?, 0)
+                ON CONFLICT(ip) DO UPDATE SET
+                    name = excluded.name,
+                    last_seen = CASE WHEN ? = 'online' THEN excluded.last_seen ELSE miners.last_seen END,
+                    site = excluded.site
+            ''', [(ip, name, timestamp, miner_site(ip), data.get('status', 'offline'))
+                  for ip, name, timestamp, data in samples])
+            
+            if STORAGE_MODE == 'compact':
+                _insert_compact(conn, samples)
+                return
+            
+            # Insert history records
+            conn.executemany('''
+                INSERT INTO miner_history 
+                (miner_ip, miner_name, timestamp, status, hashrate, shares, accepted_shares, 
+                 best_difficulty, temperature, uptime)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                ip,
+                name,
+                timestamp,
+                data.get('status', 'offline'),
+                data.get('hashrate', 0),
+                data.get('shares', 0),
+                data.get('acceptedShares', 0),
+                data.get('bestDiff', 0),
+                data.get('temp', 0),
+                data.get('uptime', 0)
+            ) for ip, name, timestamp, data in samples])
+    except Exception:
+        # Compact ids assigned in the rolled-back transaction no longer exist,
+        # and share deltas must be counted again from the last committed values
+        _miner_ids.clear()
+        for ip, shares in last_shares.items():
+            if shares is None:
+                _last_shares.pop(ip, None)
+            else:
+                _last_shares[ip] = shares
+        raise
+
+def remote_miner_ip(site, miner_ip):
+    """History key for a miner reported by a collector - site networks can reuse the same IPs"""
+    return f'{site}/{miner_ip}'
+
+def miner_site(miner_ip):
+    """Collector site of a history key, or None for miners this server polls itself"""
+    return miner_ip.split('/', 1)[0] if '/' in miner_ip else None
+
+def _epoch(timestamp):
+    return calendar.timegm(time.strptime(timestamp, TIMESTAMP_FORMAT))
+
+def _miner_id(conn, miner_ip, miner_name=None):
+    """Compact-storage id for a miner IP, assigned on first sight"""
+    key = (DB_FILE, miner_ip)
+    miner_id = _miner_ids.get(key)
+    if miner_id is None:
+        conn.execute('INSERT INTO miner_ids (ip, name) VALUES (?, ?) ON CONFLICT(ip) DO NOTHING',
+                     (miner_ip, miner_name))
+        miner_id = conn.execute('SELECT id FROM miner_ids WHERE ip = ?', (miner_ip,)).fetchone()[0]
+        _miner_ids[key] = miner_id
+    return miner_id
+
+def _insert_compact(conn, samples):
+    """Insert samples into history_compact (called inside the write transaction)"""
+    rows = []
+    names = {}
+    for ip, name, timestamp, data in samples:
+        miner_id = _miner_id(conn, ip, name)
+        names[miner_id] = name
+        rows.append((
+            miner_id,
+            _epoch(timestamp),
+            int(data.get('status', 'offline') == 'online'),
+            data.get('hashrate', 0),
+            data.get('acceptedShares', 0),
+            data.get('bestDiff', 0),
+            data.get('temp', 0)
+        ))
+    
+    conn.executemany('UPDATE miner_ids SET name = ? WHERE id = ? AND name IS NOT ?',
+                     [(name, miner_id, name) for miner_id, name in names.items() if name])
+    # Two samples in the same second: the later one wins
+    conn.executemany('''
+        INSERT OR REPLACE INTO history_compact
+        (miner_id, ts, online, hashrate, accepted_shares, best_difficulty, temperature)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
 
-def save_miner_data(miner_ip, miner_name, data):
-    """Save miner data to history"""
-    conn = sqlite3.connect(DB_FILE)
+def _update_rollups(conn, samples):
+    """Fold samples into every rollup tier (called inside the write transaction)"""
+    rows = []
+    for ip, _, timestamp, data in samples:
+        online = data.get('status', 'offline') == 'online'
+        hashrate = (data.get('hashrate', 0) or 0) if online else 0
+        temp = data.get('temp') if online else None
+        accepted = data.get('acceptedShares', 0) or 0
+        
+        # Share delta since the miner's previous online sample (counter resets count from zero)
+        delta = 0
+        if online:
+            if ip not in _last_shares:
+                if STORAGE_MODE == 'compact':
+                    row = conn.execute('''
+                        SELECT accepted_shares FROM history_compact
+                        WHERE miner_id = ? AND online = 1
+                        ORDER BY ts DESC LIMIT 1
+                    ''', (_miner_id(conn, ip),)).fetchone()
+                else:
+                    row = conn.execute('''
+                        SELECT accepted_shares FROM miner_history
+                        WHERE miner_ip = ? AND status = 'online'
+                        ORDER BY timestamp DESC LIMIT 1
+                    ''', (ip,)).fetchone()
+                _last_shares[ip] = row[0] if row else accepted
+            previous = _last_shares[ip] or 0
+            delta = accepted - previous if accepted >= previous else accepted
+            _last_shares[ip] = accepted
+        
+        epoch = _epoch(timestamp)
+        rows.append((ip, epoch, int(online), hashrate, temp, accepted if online else None,
+                     delta, data.get('bestDiff', 0) or 0))
+    
+    for resolution, seconds in ROLLUP_TIERS:
+        conn.executemany(f'''
+            INSERT INTO miner_rollup_{resolution}
+            (miner_ip, bucket, samples, online_samples, hashrate_min, hashrate_max, hashrate_sum,
+             temp_min, temp_max, temp_sum, shares_last, shares_delta, best_difficulty, temp_samples)
+            VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, COALESCE(?, 0), ?, ?, ?, ?)
+            ON CONFLICT(miner_ip, bucket) DO UPDATE SET
+                samples = samples + 1,
+                online_samples = online_samples + excluded.online_samples,
+                hashrate_min = MIN(hashrate_min, excluded.hashrate_min),
+                hashrate_max = MAX(hashrate_max, excluded.hashrate_max),
+                hashrate_sum = hashrate_sum + excluded.hashrate_sum,
+                temp_min = MIN(COALESCE(temp_min, excluded.temp_min), COALESCE(excluded.temp_min, temp_min)),
+                temp_max = MAX(COALESCE(temp_max, excluded.temp_max), COALESCE(excluded.temp_max, temp_max)),
+                temp_sum = temp_sum + excluded.temp_sum,
+                shares_last = COALESCE(excluded.shares_last, shares_last),
+                shares_delta = shares_delta + excluded.shares_delta,
+                best_difficulty = MAX(best_difficulty, excluded.best_difficulty),
+                temp_samples = temp_samples + excluded.temp_samples
+        ''', [(ip, epoch // seconds * seconds, online, hashrate, hashrate, hashrate,
+               temp, temp, temp, shares, delta, best, int(temp is not None))
+              for ip, epoch, online, hashrate, temp, shares, delta, best in rows])
+
+def _start_writer():
+    global _writer_thread
+    if _writer_thread is None:
+        with _flush_lock:
+            if _writer_thread is None:
+                _writer_thread = threading.Thread(target=_writer_loop, name='db-writer', daemon=True)
+                _writer_thread.start()
+
+def _writer_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception as e:
+            print(f"⚠️  Database write error: {e}")
+
+# Don't lose queued samples on shutdown
+atexit.register(flush)
+
+@metrics.timed(DB_SECONDS, 'register_miner')
+def register_miner(miner_ip, miner_name):
+    """Add a miner to the polling list (or rename an existing one)"""
+    conn = get_connection()
     cursor = conn.cursor()
     
-    # Update or insert miner metadata
     cursor.execute('''
-        INSERT INTO miners (ip, name, last_seen)
-        VALUES (?, ?, CURRENT_TIMESTAMP)
+        INSERT INTO miners (ip, name, site, polled)
+        VALUES (?, ?, ?, 1)
         ON CONFLICT(ip) DO UPDATE SET
-            name = excluded.name,
-            last_seen = CURRENT_TIMESTAMP
-    ''', (miner_ip, miner_name))
-    
-    # Insert history record
-    cursor.execute('''
-        INSERT INTO miner_history 
-        (miner_ip, miner_name, status, hashrate, shares, accepted_shares, 
-         best_difficulty, temperature, uptime)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        miner_ip,
-        miner_name,
-        data.get('status', 'offline'),
-        data.get('hashrate', 0),
-        data.get('shares', 0),
-        data.get('acceptedShares', 0),
-        data.get('bestDiff', 0),
-        data.get('temp', 0),
-        data.get('uptime', 0)
-    ))
+            name = COALESCE(excluded.name, miners.name),
+            polled = 1
+    ''', (miner_ip, miner_name, miner_site(miner_ip)))
     
     conn.commit()
-    conn.close()
 
-def get_miner_history(miner_ip, hours=24):
-    """Get historical data for a specific miner with zero-filled gaps"""
-    from datetime import datetime, timedelta
+@metrics.timed(DB_SECONDS, 'remove_miner')
+def remove_miner(miner_ip):
+    """Remove a miner from the polling list (history is kept)"""
+    # Drop queued samples so the writer doesn't re-create the miner
+    with _pending_lock:
+        _pending[:] = [sample for sample in _pending if sample[0] != miner_ip]
     
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT
-            timestamp,
-            status,
-            hashrate,
-            shares,
-            accepted_shares,
-            best_difficulty,
-            temperature,
-            uptime
-        FROM miner_history
-        WHERE miner_ip = ?
-            AND timestamp >= datetime('now', '-' || ? || ' hours')
-        ORDER BY timestamp ASC
-    ''', (miner_ip, hours))
+    cursor.execute('DELETE FROM miners WHERE ip = ?', (miner_ip,))
+    removed = cursor.rowcount
     
-    rows = cursor.fetchall()
-    conn.close()
+    conn.commit()
+    return removed > 0
+
+@metrics.timed(DB_SECONDS, 'get_miners')
+def get_miners(include_remote=False):
+    """Get registered miners as (ip, name) tuples - only the ones polled here unless include_remote"""
+    conn = get_connection()
+    cursor = conn.cursor()
     
-    history = []
-    for row in rows:
-        history.append({
-            'timestamp': row[0],
-            'status': row[1],
-            'hashrate': row[2],
-            'shares': row[3],
-            'accepted_shares': row[4],
-            'best_difficulty': row[5],
-            'temperature': row[6],
-            'uptime': row[7]
-        })
+    where = '' if include_remote else 'WHERE site IS NULL AND polled = 1'
+    cursor.execute(f'SELECT ip, name FROM miners {where} ORDER BY ip')
+    miners = cursor.fetchall()
     
-    return history
+    return miners
 
-def get_all_miners_history(hours=24):
-    """Get historical data for all miners"""
-    conn = sqlite3.connect(DB_FILE)
+def pick_resolution(hours, resolution=None, max_points=None):
+    """Choose raw rows or a rollup tier so a window fits in max_points"""
+    if resolution:
+        if resolution != 'raw' and resolution not in dict(ROLLUP_TIERS):
+            raise ValueError(f"Unknown resolution '{resolution}'")
+        return resolution
+    
+    max_points = max_points or DEFAULT_MAX_POINTS
+    window = hours * 3600
+    if window / RAW_SAMPLE_SECONDS <= max_points:
+        return 'raw'
+    for name, seconds in ROLLUP_TIERS:
+        if window / seconds <= max_points:
+            return name
+    return ROLLUP_TIERS[-1][0]
+
+def _window_start(hours, resolution, since=None):
+    """Start of the first rollup bucket overlapping the last `hours` hours (and holding `since`)"""
+    seconds = dict(ROLLUP_TIERS)[resolution]
+    start = int(time.time()) - int(hours * 3600)
+    if since is not None:
+        start = max(start, int(since))
+    return start // seconds * seconds
+
+def history_window_start(hours, resolution, totals=False):
+    """Timestamp of the oldest point a window can hold at a picked resolution.
+    
+    Raw windows start `hours` ago; rollup windows at the start of the bucket
+    holding that time, which is earlier. totals reads 'raw' as the 1m tier,
+    like get_total_stats_history.
+    """
+    if resolution == 'raw' and totals:
+        resolution = ROLLUP_TIERS[0][0]
+    if resolution == 'raw':
+        start = int(time.time()) - int(hours * 3600)
+    else:
+        start = _window_start(hours, resolution)
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(start))
+
+def _since_text(since):
+    """A since cursor as a miner_history timestamp ('' matches every row)"""
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(since)) if since is not None else ''
+
+def _compact_raw_rows(conn, hours, miner_ip=None, since=None):
+    """Compact history in miner_history's column order, grouped by miner and oldest first.
+    
+    Packed day blocks overlapping the window are decoded one at a time and
+    merged with the clustered rows (blocks never overlap - see pack_history_blocks).
+    """
+    since = max(int(time.time() - hours * 3600), int(since or 0))
+    miners = {miner_id: (ip, name) for miner_id, ip, name in conn.execute('SELECT id, ip, name FROM miner_ids')}
+    if miner_ip is not None:
+        ids = [miner_id for miner_id, (ip, _) in miners.items() if ip == miner_ip]
+        if not ids:
+            return
+        where, params = 'AND miner_id = ?', (ids[0],)
+    else:
+        where, params = '', ()
+    
+    rows = conn.execute(f'''
+        SELECT miner_id, ts, online, hashrate, accepted_shares, best_difficulty, temperature
+        FROM history_compact
+        WHERE ts >= ? {where}
+        ORDER BY miner_id, ts
+    ''', (since,) + params)
+    blocks = conn.execute(f'''
+        SELECT miner_id, data FROM history_blocks
+        WHERE ts_end >= ? {where}
+        ORDER BY miner_id, ts_start
+    ''', (since,) + params)
+    
+    def block_rows():
+        for miner_id, data in blocks:
+            for row in _decode_block(miner_id, data):
+                if row[1] >= since:
+                    yield row
+    
+    for miner_id, ts, online, hashrate, accepted, best, temp in heapq.merge(
+            block_rows(), rows, key=lambda row: (row[0], row[1])):
+        ip, name = miners.get(miner_id, (str(miner_id), None))
+        yield (ip, name, time.strftime(TIMESTAMP_FORMAT, time.gmtime(ts)), 'online' if online else 'offline',
+               hashrate, accepted, accepted, best, temp, 0)
+
+def _encode_block(rows):
+    """Pack (ts, online, hashrate, accepted_shares, best_difficulty, temperature) rows into one blob.
+    
+    Timestamps and share counters are stored as deltas so the JSON is mostly
+    small repeating numbers, which zlib compresses well.
+    """
+    def deltas(values):
+        return [values[0]] + [b - a for a, b in zip(values, values[1:])]
+    
+    columns = {
+        'ts': deltas([row[0] for row in rows]),
+        'online': [row[1] for row in rows],
+        'hashrate': [row[2] for row in rows],
+        'accepted': deltas([row[3] or 0 for row in rows]),
+        'best': [row[4] for row in rows],
+        'temp': [row[5] for row in rows]
+    }
+    return zlib.compress(json.dumps(columns, separators=(',', ':')).encode(), 9)
+
+def _decode_block(miner_id, data):
+    """Rows of a packed block as (miner_id, ts, online, hashrate, accepted, best, temp)"""
+    columns = json.loads(zlib.decompress(data))
+    return list(zip(
+        itertools.repeat(miner_id),
+        itertools.accumulate(columns['ts']),
+        columns['online'],
+        columns['hashrate'],
+        itertools.accumulate(columns['accepted']),
+        columns['best'],
+        columns['temp']
+    ))
+
+def _raw_point(row):
+    return {
+        'timestamp': row[0],
+        'status': row[1],
+        'hashrate': row[2],
+        'shares': row[3],
+        'accepted_shares': row[4],
+        'best_difficulty': row[5],
+        'temperature': row[6],
+        'uptime': row[7]
+    }
+
+def _rollup_point(row):
+    bucket, samples, online, h_min, h_max, h_sum, t_min, t_max, t_sum, t_samples, shares, delta, best = row
+    return {
+        'timestamp': datetime.fromtimestamp(bucket, timezone.utc).strftime(TIMESTAMP_FORMAT),
+        'status': 'online' if online else 'offline',
+        'hashrate': h_sum / samples,
+        'hashrate_min': h_min,
+        'hashrate_max': h_max,
+        'shares': shares,
+        'accepted_shares': shares,
+        'shares_delta': delta,
+        'best_difficulty': best,
+        'temperature': round(t_sum / t_samples, 1) if t_samples else None,
+        'temperature_min': t_min,
+        'temperature_max': t_max,
+        'uptime': 0,
+        'samples': samples
+    }
+
+def _merge_points(group):
+    """Combine consecutive history points into one"""
+    merged = dict(group[-1])
+    merged['timestamp'] = group[0]['timestamp']
+    merged['status'] = 'online' if any(p['status'] == 'online' for p in group) else 'offline'
+    merged['hashrate'] = sum(p['hashrate'] or 0 for p in group) / len(group)
+    temps = [p['temperature'] for p in group if p['temperature']]
+    merged['temperature'] = round(sum(temps) / len(temps), 1) if temps else merged['temperature']
+    if 'samples' in merged:
+        merged['samples'] = sum(p['samples'] for p in group)
+        merged['shares_delta'] = sum(p['shares_delta'] or 0 for p in group)
+        merged['hashrate_min'] = min(p['hashrate_min'] for p in group)
+        merged['hashrate_max'] = max(p['hashrate_max'] for p in group)
+        t_mins = [p['temperature_min'] for p in group if p['temperature_min'] is not None]
+        t_maxs = [p['temperature_max'] for p in group if p['temperature_max'] is not None]
+        merged['temperature_min'] = min(t_mins) if t_mins else None
+        merged['temperature_max'] = max(t_maxs) if t_maxs else None
+    return merged
+
+def downsample(points, max_points):
+    """Merge neighbouring points until no more than max_points remain"""
+    if not max_points or len(points) <= max_points:
+        return points
+    size = -(-len(points) // max_points)  # ceiling division
+    return [_merge_points(points[i:i + size]) for i in range(0, len(points), size)]
+
+@metrics.timed(DB_SECONDS, 'get_miner_history')
+def get_miner_history(miner_ip, hours=24, resolution=None, max_points=None, since=None):
+    """Get historical data for a specific miner, downsampled to fit max_points.
+    
+    Short windows return raw rows; longer ones read the smallest rollup tier
+    that fits (avg values plus min/max and share deltas per bucket).
+    
+    since (epoch seconds, usually the timestamp of the last point a client
+    already has) limits the result to points at or after it. The point at
+    since comes back too, because the rollup bucket it stands for may have
+    grown since - clients replace their points from since onwards.
+    """
+    resolution = pick_resolution(hours, resolution, max_points)
+    
+    conn = get_connection()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT DISTINCT miner_ip, miner_name
-        FROM miner_history
-        WHERE timestamp >= datetime('now', '-' || ? || ' hours')
-    ''', (hours,))
+    if resolution == 'raw' and STORAGE_MODE == 'compact':
+        history = [_raw_point(row[2:]) for row in _compact_raw_rows(conn, hours, miner_ip, since)]
+    elif resolution == 'raw':
+        cursor.execute('''
+            SELECT
+                timestamp,
+                status,
+                hashrate,
+                shares,
+                accepted_shares,
+                best_difficulty,
+                temperature,
+                uptime
+            FROM miner_history
+            WHERE miner_ip = ?
+                AND timestamp >= datetime('now', '-' || ? || ' hours')
+                AND timestamp >= ?
+            ORDER BY timestamp ASC
+        ''', (miner_ip, hours, _since_text(since)))
+        history = [_raw_point(row) for row in cursor.fetchall()]
+    else:
+        cursor.execute(f'''
+            SELECT bucket, samples, online_samples, hashrate_min, hashrate_max, hashrate_sum,
+                   temp_min, temp_max, temp_sum, temp_samples, shares_last, shares_delta, best_difficulty
+            FROM miner_rollup_{resolution}
+            WHERE miner_ip = ?
+                AND bucket >= ?
+            ORDER BY bucket ASC
+        ''', (miner_ip, _window_start(hours, resolution, since)))
+        history = [_rollup_point(row) for row in cursor.fetchall()]
     
-    miners = cursor.fetchall()
-    result = {}
+    return downsample(history, max_points or DEFAULT_MAX_POINTS)
+
+def iter_all_miners_history(hours=24, resolution=None, max_points=None, since=None):
+    """Yield (miner_ip, miner_name, history) for every miner from one ordered scan (since as in get_miner_history)"""
+    resolution = pick_resolution(hours, resolution, max_points)
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    
+    if resolution == 'raw' and STORAGE_MODE == 'compact':
+        cursor = _compact_raw_rows(conn, hours, since=since)
+        to_point = _raw_point
+    elif resolution == 'raw':
+        cursor.execute('''
+            SELECT
+                miner_ip,
+                miner_name,
+                timestamp,
+                status,
+                hashrate,
+                shares,
+                accepted_shares,
+                best_difficulty,
+                temperature,
+                uptime
+            FROM miner_history
+            WHERE timestamp >= datetime('now', '-' || ? || ' hours')
+                AND timestamp >= ?
+            ORDER BY miner_ip, timestamp ASC
+        ''', (hours, _since_text(since)))
+        to_point = _raw_point
+    else:
+        cursor.execute(f'''
+            SELECT r.miner_ip, m.name, r.bucket, r.samples, r.online_samples,
+                   r.hashrate_min, r.hashrate_max, r.hashrate_sum,
+                   r.temp_min, r.temp_max, r.temp_sum, r.temp_samples, r.shares_last, r.shares_delta,
+                   r.best_difficulty
+            FROM miner_rollup_{resolution} r
+            LEFT JOIN miners m ON m.ip = r.miner_ip
+            WHERE r.bucket >= ?
+            ORDER BY r.miner_ip, r.bucket ASC
+        ''', (_window_start(hours, resolution, since),))
+        to_point = _rollup_point
+    # Time to the first row only - the rest streams out at the caller's pace
+    DB_SECONDS.observe(time.perf_counter() - started, 'iter_all_miners_history')
     
-    for miner_ip, miner_name in miners:
+    # Rows arrive grouped by miner, so only one miner's points are held at a time
+    for miner_ip, rows in itertools.groupby(cursor, key=lambda row: row[0]):
+        miner_name = None
+        history = []
+        for row in rows:
+            miner_name = row[1] or miner_name
+            history.append(to_point(row[2:]))
+        yield miner_ip, miner_name, downsample(history, max_points or DEFAULT_MAX_POINTS)
+
+@metrics.timed(DB_SECONDS, 'get_all_miners_history')
+def get_all_miners_history(hours=24, resolution=None, max_points=None, since=None):
+    """Get historical data for all miners"""
+    result = {}
+    for miner_ip, miner_name, history in iter_all_miners_history(hours, resolution, max_points, since):
         result[miner_ip] = {
             'name': miner_name,
-            'history': get_miner_history(miner_ip, hours)
+            'history': history
         }
-    
-    conn.close()
     return result
 
-def get_total_stats_history(hours=24):
-    """Get aggregated stats history across all miners"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+def iter_history_rows(miners=None, start=None, end=None):
+    """Yield raw history rows (HISTORY_FIELDS order) for export, grouped by miner and oldest first.
     
-    cursor.execute('''
-        SELECT 
-            timestamp,
-            SUM(hashrate) as total_hashrate,
-            SUM(accepted_shares) as total_shares,
-            COUNT(DISTINCT miner_ip) as active_miners
+    miners is a list of miner IPs (None = all); start and end are epoch
+    seconds, start inclusive and end exclusive. Rows come straight off the
+    cursor, so memory use doesn't grow with the range.
+    """
+    conn = get_connection()
+    start_text = _since_text(start)
+    end_text = _since_text(end) if end is not None else '9999-12-31 23:59:59'  # text - '9999' would compare as a number
+    
+    if STORAGE_MODE == 'compact':
+        hours = (time.time() - (start or 0)) / 3600
+        for miner_ip in (miners or [None]):
+            for row in _compact_raw_rows(conn, hours, miner_ip, start):
+                if row[2] < end_text:
+                    yield row
+        return
+    
+    where = ''
+    params = [start_text, end_text]
+    if miners:
+        where = f'AND miner_ip IN ({", ".join("?" * len(miners))})'
+        params += miners
+    yield from conn.execute(f'''
+        SELECT miner_ip, miner_name, timestamp, status, hashrate, shares, accepted_shares,
+               best_difficulty, temperature, uptime
         FROM miner_history
-        WHERE timestamp >= datetime('now', '-' || ? || ' hours')
-            AND status = 'online'
-        GROUP BY timestamp
-        ORDER BY timestamp ASC
-    ''', (hours,))
+        WHERE timestamp >= ? AND timestamp < ? {where}
+        ORDER BY miner_ip, timestamp ASC
+    ''', params)
+
+@metrics.timed(DB_SECONDS, 'get_total_stats_history')
+def get_total_stats_history(hours=24, resolution=None, max_points=None, since=None):
+    """Get fleet-wide totals aligned to fixed time buckets.
+    
+    Each miner's rollup is placed in its bucket and carried forward across
+    short gaps, so miners polled at different seconds still add up. Totals
+    are at least per-minute; 'raw' resolution reads the 1m tier. since works
+    as in get_miner_history.
+    """
+    resolution = pick_resolution(hours, resolution, max_points)
+    if resolution == 'raw':
+        resolution = ROLLUP_TIERS[0][0]
+    seconds = dict(ROLLUP_TIERS)[resolution]
+    carry = max(CARRY_FORWARD_SECONDS, seconds)
+    start = _window_start(hours, resolution, since)
+    
+    conn = get_connection()
+    cursor = conn.cursor()
     
-    rows = cursor.fetchall()
-    conn.close()
+    # With a cursor, read back one carry span so miners silent since then still count
+    cursor.execute(f'''
+        SELECT bucket, miner_ip, hashrate_sum / samples, shares_last, online_samples
+        FROM miner_rollup_{resolution}
+        WHERE bucket >= ?
+        ORDER BY bucket ASC
+    ''', (start if since is None else max(_window_start(hours, resolution), start - carry),))
     
     history = []
-    for row in rows:
-        history.append({
-            'timestamp': row[0],
-            'total_hashrate': row[1],
-            'total_shares': row[2],
-            'active_miners': row[3]
+    last_known = {}  # miner_ip -> (bucket, hashrate, shares, online)
+    for bucket, rows in itertools.groupby(cursor, key=lambda row: row[0]):
+        # Emit empty stretches between samples so gaps show up as gaps
+        previous = history[-1]['bucket'] if history else bucket - seconds
+        for gap in range(previous + seconds, bucket, seconds):
+            history.append(_total_point(gap, last_known, carry))
+        for _, miner_ip, hashrate, shares, online in rows:
+            last_known[miner_ip] = (bucket, hashrate, shares, online > 0)
+        history.append(_total_point(bucket, last_known, carry))
+    history = [point for point in history if point['bucket'] >= start]
+    
+    # Keep the response bounded by averaging neighbouring points
+    max_points = max_points or DEFAULT_MAX_POINTS
+    size = max(1, -(-len(history) // max_points))
+    
+    result = []
+    for i in range(0, len(history), size):
+        group = history[i:i + size]
+        result.append({
+            'timestamp': datetime.fromtimestamp(group[0]['bucket'], timezone.utc).strftime(TIMESTAMP_FORMAT),
+            'total_hashrate': sum(point['total_hashrate'] for point in group) / len(group),
+            'total_shares': max(point['total_shares'] for point in group),
+            'active_miners': max(point['active_miners'] for point in group)
         })
     
-    return history
+    return result
+
+def _total_point(bucket, last_known, carry):
+    """Fleet totals at a bucket from each miner's most recent values"""
+    total_hashrate = 0
+    total_shares = 0
+    active = 0
+    for seen, hashrate, shares, online in last_known.values():
+        if bucket - seen > carry:
+            continue
+        total_hashrate += hashrate or 0
+        total_shares += shares or 0
+        active += online
+    return {
+        'bucket': bucket,
+        'total_hashrate': total_hashrate,
+        'total_shares': total_shares,
+        'active_miners': active
+    }
+
+def _percentile(ordered, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return None
+    return ordered[max(0, -(-len(ordered) * pct // 100) - 1)]
+
+@metrics.timed(DB_SECONDS, 'get_miner_analytics')
+def get_miner_analytics(hours=24):
+    """Per-miner availability, share rate, hashrate percentiles and anomaly flags over a window.
+    
+    Everything is aggregated from the rollup tables: hashrate percentiles are
+    over per-bucket averages of the finest tier that fits ANALYTICS_MAX_BUCKETS
+    (per-minute up to a day, hourly beyond), so the cost does not grow with
+    the raw sample count. Availability is the share of minutes between a
+    miner's first and last sample that hold an online one, from the per-minute
+    tier whatever the window - the poller samples online miners every few
+    seconds and offline ones every few minutes, so counting samples would
+    overweight the time a miner was up.
+    """
+    resolution = next((name for name, seconds in ROLLUP_TIERS if hours * 3600 / seconds <= ANALYTICS_MAX_BUCKETS),
+                      ROLLUP_TIERS[-1][0])
+    seconds = dict(ROLLUP_TIERS)[resolution]
+    since = _window_start(hours, resolution)
+    recent = (int(time.time()) - 3600) // seconds * seconds
+    
+    conn = get_connection()
+    names = dict(conn.execute('SELECT ip, name FROM miners'))
+    
+    # Minutes covered and minutes with an online sample, per miner
+    coverage = {ip: (online_minutes, (last - first) // 60 + 1) for ip, online_minutes, first, last in conn.execute('''
+            SELECT miner_ip, SUM(online_samples > 0), MIN(bucket), MAX(bucket)
+            FROM miner_rollup_1m
+            WHERE bucket >= ?
+            GROUP BY miner_ip
+        ''', (_window_start(hours, '1m'),))}
+    
+    summaries = {}
+    for (ip, samples, online, hashrate_sum, temp_sum, temp_samples, temp_max, shares, best, first, last,
+         recent_sum, recent_online) in conn.execute(f'''
+            SELECT miner_ip, SUM(samples), SUM(online_samples), SUM(hashrate_sum), SUM(temp_sum), SUM(temp_samples),
+                   MAX(temp_max), SUM(shares_delta), MAX(best_difficulty), MIN(bucket), MAX(bucket),
+                   SUM(CASE WHEN bucket >= ? THEN hashrate_sum END), SUM(CASE WHEN bucket >= ? THEN online_samples END)
+            FROM miner_rollup_{resolution}
+            WHERE bucket >= ?
+            GROUP BY miner_ip
+        ''', (recent, recent, since)):
+        span_hours = (last + seconds - first) / 3600
+        online_minutes, minutes = coverage.get(ip, (0, 1))
+        shares = shares or 0
+        summaries[ip] = {
+            'ip': ip,
+            'name': names.get(ip),
+            'samples': samples,
+            'availability': round(online_minutes * 100 / minutes, 2),
+            'shares': shares,
+            'shares_per_hour': round(shares / span_hours, 2),
+            'hashrate_avg': hashrate_sum / online if online else 0,
+            'hashrate_p50': None,
+            'hashrate_p95': None,
+            'hashrate_last_hour': recent_sum / recent_online if recent_online else None,
+            'temperature_avg': round(temp_sum / temp_samples, 1) if temp_samples else None,
+            'temperature_max': temp_max,
+            'best_difficulty': best,
+            'first_seen': datetime.fromtimestamp(first, timezone.utc).strftime(TIMESTAMP_FORMAT),
+            'last_seen': datetime.fromtimestamp(last, timezone.utc).strftime(TIMESTAMP_FORMAT),
+            'flags': []
+        }
+        
+        flags = summaries[ip]['flags']
+        if summaries[ip]['availability'] < ANOMALY_AVAILABILITY:
+            flags.append('low_availability')
+        if temp_max is not None and temp_max >= ANOMALY_TEMPERATURE:
+            flags.append('overheating')
+        if not shares and online_minutes / 60 >= ANOMALY_NO_SHARES_HOURS:
+            flags.append('no_shares')
+    
+    # Percentiles of each miner's per-bucket average while online, from one ordered scan
+    for ip, rows in itertools.groupby(conn.execute(f'''
+            SELECT miner_ip, hashrate_sum / online_samples AS hashrate
+            FROM miner_rollup_{resolution}
+            WHERE bucket >= ? AND online_samples > 0
+            ORDER BY miner_ip, hashrate
+        ''', (since,)), key=lambda row: row[0]):
+        ordered = [row[1] for row in rows]
+        if ip in summaries:
+            summaries[ip]['hashrate_p50'] = _percentile(ordered, 50)
+            summaries[ip]['hashrate_p95'] = _percentile(ordered, 95)
+    
+    # Hashrate flags compare each miner with itself and with the rest of the fleet
+    miners = sorted(summaries.values(), key=lambda miner: miner['ip'])
+    medians = sorted(miner['hashrate_p50'] for miner in miners if miner['hashrate_p50'])
+    fleet_median = _percentile(medians, 50) if len(medians) >= 3 else None
+    for miner in miners:
+        median = miner['hashrate_p50']
+        if fleet_median and median and median < fleet_median * ANOMALY_UNDERPERFORM:
+            miner['flags'].append('underperforming')
+        if median and miner['hashrate_last_hour'] is not None and \
+                miner['hashrate_last_hour'] < median * ANOMALY_HASHRATE_DROP:
+            miner['flags'].append('hashrate_drop')
+    
+    minutes = sum(coverage.get(miner['ip'], (0, 0))[1] for miner in miners)
+    return {
+        'hours': hours,
+        'resolution': resolution,
+        'generated': time.time(),
+        'fleet': {
+            'miners': len(miners),
+            'flagged': sum(1 for miner in miners if miner['flags']),
+            'availability': round(sum(coverage.get(miner['ip'], (0, 0))[0] for miner in miners) * 100 / minutes, 2)
+                            if minutes else None,
+            'shares': sum(miner['shares'] for miner in miners),
+            'shares_per_hour': round(sum(miner['shares_per_hour'] for miner in miners), 2),
+            'hashrate_median': fleet_median
+        },
+        'miners': miners
+    }
 
-def cleanup_old_data(days=30):
-    """Remove history older than specified days"""
-    conn = sqlite3.connect(DB_FILE)
+@metrics.timed(DB_SECONDS, 'cleanup_old_data')
+def cleanup_old_data(days=RETENTION_DAYS, batch_size=CLEANUP_BATCH):
+    """Remove history older than specified days, a small batch per transaction"""
+    conn = get_connection()
     cursor = conn.cursor()
+    deleted = 0
+    cutoff = int(time.time()) - days * 86400
     
-    cursor.execute('''
-        DELETE FROM miner_history
-        WHERE timestamp < datetime('now', '-' || ? || ' days')
-    ''', (days,))
+    if STORAGE_MODE == 'compact':
+        deleted = _cleanup_compact(conn, cutoff, batch_size)
     
-    deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
+    # Each batch is a range of idx_history_timestamp, so the write lock is never held for a table scan
+    while STORAGE_MODE == 'rows':
+        with _write_lock, conn:
+            cursor.execute('''
+                DELETE FROM miner_history
+                WHERE id IN (
+                    SELECT id FROM miner_history
+                    WHERE timestamp < ?
+                    LIMIT ?
+                )
+            ''', (time.strftime(TIMESTAMP_FORMAT, time.gmtime(cutoff)), batch_size))
+        deleted += cursor.rowcount
+        maintenance_stats['deleted_rows'] = deleted
+        if cursor.rowcount < batch_size:
+            break
+    
+    for resolution, _ in ROLLUP_TIERS:
+        with _write_lock, conn:
+            cursor.execute(f'DELETE FROM miner_rollup_{resolution} WHERE bucket < ?', (cutoff,))
     
     print(f"🧹 Cleaned up {deleted} old records (older than {days} days)")
     return deleted
 
+def _cleanup_compact(conn, cutoff, batch_size):
+    """Delete compact samples and whole packed blocks older than cutoff, batch by batch"""
+    deleted = 0
+    with _write_lock, conn:
+        cursor = conn.execute('SELECT COALESCE(SUM(samples), 0) FROM history_blocks WHERE ts_end < ?', (cutoff,))
+        deleted += cursor.fetchone()[0]
+        conn.execute('DELETE FROM history_blocks WHERE ts_end < ?', (cutoff,))
+    
+    # Each miner's old rows are the head of its clustered key range
+    for (miner_id,) in conn.execute('SELECT id FROM miner_ids').fetchall():
+        while True:
+            row = conn.execute('''
+                SELECT ts FROM history_compact
+                WHERE miner_id = ? AND ts < ?
+                ORDER BY ts LIMIT 1 OFFSET ?
+            ''', (miner_id, cutoff, batch_size)).fetchone()
+            end = row[0] if row else cutoff
+            with _write_lock, conn:
+                cursor = conn.execute('DELETE FROM history_compact WHERE miner_id = ? AND ts < ?', (miner_id, end))
+            deleted += cursor.rowcount
+            maintenance_stats['deleted_rows'] = deleted
+            if row is None:
+                break
+    return deleted
+
+@metrics.timed(DB_SECONDS, 'pack_history_blocks')
+def pack_history_blocks(days=PACK_AFTER_DAYS):
+    """Move compact samples older than `days` into one compressed block per miner per UTC day.
+    
+    A day that already has a block (samples that arrived late) is merged into
+    it, so blocks never overlap.
+    """
+    if STORAGE_MODE != 'compact' or not days:
+        return 0
+    conn = get_connection()
+    cutoff = (int(time.time()) - days * 86400) // 86400 * 86400
+    packed = 0
+    
+    for (miner_id,) in conn.execute('SELECT id FROM miner_ids').fetchall():
+        first = conn.execute('SELECT MIN(ts) FROM history_compact WHERE miner_id = ? AND ts < ?',
+                             (miner_id, cutoff)).fetchone()[0]
+        if first is None:
+            continue
+        for day in range(first // 86400 * 86400, cutoff, 86400):
+            with _write_lock, conn:
+                rows = conn.execute('''
+                    SELECT ts, online, hashrate, accepted_shares, best_difficulty, temperature
+                    FROM history_compact
+                    WHERE miner_id = ? AND ts >= ? AND ts < ?
+                    ORDER BY ts
+                ''', (miner_id, day, day + 86400)).fetchall()
+                if not rows:
+                    continue
+                
+                existing = conn.execute('''
+                    SELECT data FROM history_blocks
+                    WHERE miner_id = ? AND ts_start >= ? AND ts_start < ?
+                ''', (miner_id, day, day + 86400)).fetchall()
+                merged = {row[0]: row for row in rows}
+                for (data,) in existing:
+                    for row in _decode_block(miner_id, data):
+                        merged.setdefault(row[1], row[1:])
+                block = [merged[ts] for ts in sorted(merged)]
+                
+                conn.execute('DELETE FROM history_blocks WHERE miner_id = ? AND ts_start >= ? AND ts_start < ?',
+                             (miner_id, day, day + 86400))
+                conn.execute('''
+                    INSERT INTO history_blocks (miner_id, ts_start, ts_end, samples, data)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (miner_id, block[0][0], block[-1][0], len(block), _encode_block(block)))
+                conn.execute('DELETE FROM history_compact WHERE miner_id = ? AND ts >= ? AND ts < ?',
+                             (miner_id, day, day + 86400))
+            packed += len(rows)
+    
+    if packed:
+        print(f"📦 Packed {packed} samples older than {days} days into compressed blocks")
+    return packed
+
+@metrics.timed(DB_SECONDS, 'migrate_to_compact')
+def migrate_to_compact(batch_size=50000, progress=None):
+    """Copy miner_history into the compact layout, then drop it.
+    
+    Copies in id-range batches (one transaction each); rollups are kept as
+    they are. The caller should VACUUM afterwards to shrink the file.
+    """
+    global STORAGE_MODE
+    if STORAGE_MODE == 'compact':
+        return 0
+    flush()
+    conn = get_connection()
+    
+    with _write_lock, conn:
+        create_compact_tables(conn.cursor())
+        conn.execute('''
+            INSERT OR IGNORE INTO miner_ids (ip, name)
+            SELECT miner_ip, MAX(miner_name) FROM miner_history GROUP BY miner_ip
+        ''')
+        conn.execute('''
+            UPDATE miner_ids SET name = (SELECT name FROM miners WHERE miners.ip = miner_ids.ip)
+            WHERE ip IN (SELECT ip FROM miners WHERE name IS NOT NULL)
+        ''')
+    
+    last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM miner_history').fetchone()[0]
+    copied = 0
+    for start in range(0, last_id, batch_size):
+        with _write_lock, conn:
+            cursor = conn.execute('''
+                INSERT OR REPLACE INTO history_compact
+                (miner_id, ts, online, hashrate, accepted_shares, best_difficulty, temperature)
+                SELECT m.id, CAST(strftime('%s', h.timestamp) AS INTEGER), h.status = 'online',
+                       h.hashrate, h.accepted_shares, h.best_difficulty, h.temperature
+                FROM miner_history h JOIN miner_ids m ON m.ip = h.miner_ip
+                WHERE h.id > ? AND h.id <= ?
+                ORDER BY h.id
+            ''', (start, start + batch_size))
+        copied += cursor.rowcount
+        if progress:
+            progress(min(start + batch_size, last_id), last_id)
+    
+    with _write_lock, conn:
+        conn.execute('DROP TABLE miner_history')
+    STORAGE_MODE = 'compact'
+    _last_shares.clear()
+    return copied
+
+@metrics.timed(DB_SECONDS, 'prune_stale_miners')
+def prune_stale_miners(days=STALE_MINER_DAYS):
+    """Stop polling miners that have not been online for the given number of days"""
+    conn = get_connection()
+    
+    with _write_lock, conn:
+        cursor = conn.execute('''
+            DELETE FROM miners
+            WHERE last_seen < datetime('now', '-' || ? || ' days')
+        ''', (days,))
+    
+    if cursor.rowcount:
+        print(f"🧹 Pruned {cursor.rowcount} miners not seen for {days} days")
+    return cursor.rowcount
+
+def _database_size():
+    """Bytes on disk for the database and its WAL file"""
+    return sum(os.path.getsize(path) for path in (DB_FILE, DB_FILE + '-wal') if os.path.exists(path))
+
+@metrics.timed(DB_SECONDS, 'compact_database')
+def compact_database():
+    """Return free pages to the OS and refresh query planner statistics"""
+    conn = get_connection()
+    before = _database_size()
+    
+    with _write_lock:
+        # executescript steps the pragmas to completion (execute frees a single page)
+        conn.executescript('PRAGMA incremental_vacuum; PRAGMA optimize;')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    
+    return max(0, before - _database_size())
+
+@metrics.timed(DB_SECONDS, 'enable_incremental_vacuum')
+def enable_incremental_vacuum():
+    """Convert an older file to incremental auto-vacuum; False if it already uses it.
+    
+    Needs a full VACUUM that holds the write lock for as long as it takes,
+    so it runs only on request (server.py --vacuum, migrate_storage.py).
+    """
+    conn = get_connection()
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+        return False
+    
+    flush()
+    before = _database_size()
+    print(f"🗜️  Enabling incremental vacuum (one-time VACUUM)...")
+    with _write_lock:
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    print(f"✔ {before / 1048576:.1f} MB -> {_database_size() / 1048576:.1f} MB")
+    return True
+
+def run_maintenance(vacuum=False):
+    """Delete expired rows, prune stale miners and reclaim file space.
+    
+    vacuum also converts an older file to incremental auto-vacuum first.
+    """
+    started = time.time()
+    maintenance_stats.update(running=True, deleted_rows=0, pruned_miners=0, reclaimed_bytes=0)
+    try:
+        if vacuum:
+            maintenance_stats['phase'] = 'vacuum'
+            enable_incremental_vacuum()
+        maintenance_stats['phase'] = 'cleanup'
+        cleanup_old_data()
+        maintenance_stats['phase'] = 'prune'
+        maintenance_stats['pruned_miners'] = prune_stale_miners()
+        if STORAGE_MODE == 'compact':
+            maintenance_stats['phase'] = 'pack'
+            pack_history_blocks()
+        maintenance_stats['phase'] = 'compact'
+        maintenance_stats['reclaimed_bytes'] = compact_database()
+        
+        maintenance_stats['total_deleted_rows'] += maintenance_stats['deleted_rows']
+        maintenance_stats['total_reclaimed_bytes'] += maintenance_stats['reclaimed_bytes']
+    finally:
+        maintenance_stats.update(
+            running=False,
+            phase=None,
+            last_run=datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT),
+            last_duration_s=round(time.time() - started, 2)
+        )
+
+def start_maintenance(interval=MAINTENANCE_INTERVAL, vacuum=False):
+    """Run maintenance now and then every interval seconds in the background.
+    
+    vacuum converts an older file to incremental auto-vacuum on the first run.
+    """
+    global _maintenance_thread
+    
+    def loop():
+        convert = vacuum
+        while True:
+            try:
+                run_maintenance(vacuum=convert)
+                convert = False
+            except Exception as e:
+                print(f"⚠️  Maintenance error: {e}")
+            time.sleep(interval)
+    
+    if _maintenance_thread is None:
+        _maintenance_thread = threading.Thread(target=loop, name='db-maintenance', daemon=True)
+        _maintenance_thread.start()
+
+@metrics.timed(DB_SECONDS, 'get_database_stats')
 def get_database_stats():
     """Get statistics about the database"""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     cursor = conn.cursor()
     
-    # Total records
-    cursor.execute('SELECT COUNT(*) FROM miner_history')
-    total_records = cursor.fetchone()[0]
+    if STORAGE_MODE == 'compact':
+        # Raw rows plus samples packed into blocks
+        cursor.execute('SELECT COUNT(*), MIN(ts), MAX(ts) FROM history_compact')
+        rows, first, last = cursor.fetchone()
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(samples), 0), MIN(ts_start), MAX(ts_end) FROM history_blocks')
+        packed_blocks, packed_samples, block_first, block_last = cursor.fetchone()
+        total_records = rows + packed_samples
+        first = min((ts for ts in (first, block_first) if ts is not None), default=None)
+        last = max((ts for ts in (last, block_last) if ts is not None), default=None)
+        oldest, newest = (time.strftime(TIMESTAMP_FORMAT, time.gmtime(ts)) if ts is not None else None
+                          for ts in (first, last))
+    else:
+        # Total records
+        cursor.execute('SELECT COUNT(*) FROM miner_history')
+        total_records = cursor.fetchone()[0]
+        
+        # Oldest record
+        cursor.execute('SELECT MIN(timestamp) FROM miner_history')
+        oldest = cursor.fetchone()[0]
+        
+        # Newest record
+        cursor.execute('SELECT MAX(timestamp) FROM miner_history')
+        newest = cursor.fetchone()[0]
+        packed_blocks = 0
     
     # Unique miners
     cursor.execute('SELECT COUNT(*) FROM miners')
     total_miners = cursor.fetchone()[0]
     
-    # Oldest record
-    cursor.execute('SELECT MIN(timestamp) FROM miner_history')
-    oldest = cursor.fetchone()[0]
-    
-    # Newest record
-    cursor.execute('SELECT MAX(timestamp) FROM miner_history')
-    newest = cursor.fetchone()[0]
-    
-    # Database file size
-    file_size = os.path.getsize(DB_FILE) if os.path.exists(DB_FILE) else 0
+    # Database file size (including the WAL)
+    file_size = _database_size()
     
-    conn.close()
+    # Pages freed by deletes but not yet returned to the OS
+    cursor.execute('PRAGMA freelist_count')
+    free_pages = cursor.fetchone()[0]
+    cursor.execute('PRAGMA page_size')
+    page_size = cursor.fetchone()[0]
     
     return {
         'total_records': total_records,
         'total_miners': total_miners,
         'oldest_record': oldest,
         'newest_record': newest,
-        'file_size_mb': round(file_size / (1024 * 1024), 2)
+        'storage': STORAGE_MODE,
+        'packed_blocks': packed_blocks,
+        'file_size_mb': round(file_size / (1024 * 1024), 2),
+        'free_mb': round(free_pages * page_size / (1024 * 1024), 2),
+        'maintenance': dict(maintenance_stats)
     }
 
 if __name__ == '__main__':
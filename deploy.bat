@@ -39,8 +39,11 @@ copy /Y "styles.css" "%DEPLOY_PATH%\" >nul
 copy /Y "script.js" "%DEPLOY_PATH%\" >nul
 copy /Y "server.py" "%DEPLOY_PATH%\" >nul
 copy /Y "database.py" "%DEPLOY_PATH%\" >nul
+copy /Y "metrics.py" "%DEPLOY_PATH%\" >nul
+copy /Y "discovery.py" "%DEPLOY_PATH%\" >nul
+copy /Y "migrate_storage.py" "%DEPLOY_PATH%\" >nul
 copy /Y "favicon.svg" "%DEPLOY_PATH%\" >nul
-echo    - Copied 6 core files
+echo    - Copied 9 core files
 
 echo [2/5] Creating setup scripts...
 
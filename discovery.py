@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+LAN discovery of NerdMiner devices: an asyncio sweep of a CIDR range
+"""
+
+import asyncio
+import ipaddress
+import time
+
+DISCOVERY_CONCURRENCY = 256     # connection attempts in flight at once
+DISCOVERY_CONNECT_TIMEOUT = 0.5  # seconds - LAN hosts answer a SYN in a few ms
+DISCOVERY_READ_TIMEOUT = 2.0     # seconds - an ESP32 can take a while to render its page
+DISCOVERY_MAX_HOSTS = 4096       # refuse ranges larger than a /20
+DISCOVERY_PAGE_LIMIT = 64 * 1024  # bytes read from each status page
+
+
+def parse_network(cidr):
+    """ip_network for a CIDR string, or ValueError if it is invalid, too large or not a LAN range"""
+    network = ipaddress.ip_network(cidr.strip(), strict=False)
+    if network.version != 4:
+        raise ValueError('Only IPv4 ranges can be scanned')
+    # Miners live on the LAN - never let the dashboard sweep someone else's addresses
+    if not (network.is_private or network.is_link_local):
+        raise ValueError(f'{network} is not a private or link-local range')
+    if network.num_addresses > DISCOVERY_MAX_HOSTS:
+        raise ValueError(f'{network} has {network.num_addresses} addresses (at most {DISCOVERY_MAX_HOSTS})')
+    return network
+
+
+def hosts(network):
+    """Addresses to probe - every address for /31 and /32, otherwise skip network and broadcast"""
+    return list(network.hosts()) if network.num_addresses > 2 else list(network)
+
+
+async def _probe(address, port, fingerprint, connect_timeout, read_timeout):
+    """Stats if the host serves a NerdMiner status page on port, else None"""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(address, port), connect_timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+
+    try:
+        host = address if port == 80 else f'{address}:{port}'
+        writer.write(f'GET / HTTP/1.0\r\nHost: {host}\r\nUser-Agent: NerdMiner-Dashboard\r\n\r\n'.encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(DISCOVERY_PAGE_LIMIT), read_timeout)
+        while len(response) < DISCOVERY_PAGE_LIMIT:
+            chunk = await asyncio.wait_for(reader.read(DISCOVERY_PAGE_LIMIT - len(response)), read_timeout)
+            if not chunk:
+                break
+            response += chunk
+    except (OSError, asyncio.TimeoutError):
+        return None
+    finally:
+        writer.close()
+
+    head, _, body = response.partition(b'\r\n\r\n')
+    status = head.split(b'\r\n', 1)[0].split()
+    if len(status) < 2 or not status[0].startswith(b'HTTP/') or status[1] != b'200':
+        return None
+    return fingerprint(body)
+
+
+async def _sweep(targets, fingerprint, concurrency, connect_timeout, read_timeout, progress):
+    semaphore = asyncio.Semaphore(concurrency)
+    found = []
+
+    async def probe(address, port):
+        async with semaphore:
+            data = await _probe(str(address), port, fingerprint, connect_timeout, read_timeout)
+        if data is not None:
+            found.append((str(address) if port == 80 else f'{address}:{port}', data))
+        if progress:
+            progress(address, port, data)
+
+    await asyncio.gather(*(probe(address, port) for address, port in targets))
+    return found
+
+
+def discover(network, fingerprint, ports=(80,), concurrency=DISCOVERY_CONCURRENCY,
+             connect_timeout=DISCOVERY_CONNECT_TIMEOUT, read_timeout=DISCOVERY_READ_TIMEOUT, progress=None):
+    """Probe every host in network on each port and return [(miner_ip, stats), ...].
+
+    fingerprint(page bytes) returns the stats parsed from a NerdMiner status
+    page, or None when the page is something else. Miner IPs on a port other
+    than 80 are returned as host:port, the way the dashboard stores them.
+    progress(address, port, stats or None) is called after each probe.
+    """
+    if isinstance(network, str):
+        network = parse_network(network)
+    targets = [(address, port) for address in hosts(network) for port in ports]
+    started = time.time()
+    found = asyncio.run(_sweep(targets, fingerprint, concurrency, connect_timeout, read_timeout, progress))
+    found.sort(key=lambda hit: (ipaddress.ip_address(hit[0].split(':')[0]), hit[0]))
+    print(f"🔎 Scanned {len(targets)} addresses in {network} in {time.time() - started:.1f}s - "
+          f"{len(found)} NerdMiner(s) found")
+    return found
+
+
+if __name__ == '__main__':
+    import argparse
+    import server
+
+    parser = argparse.ArgumentParser(description='Find NerdMiner devices on the local network')
+    parser.add_argument('network', help='CIDR range to scan, e.g. 192.168.1.0/24')
+    parser.add_argument('--port', type=int, action='append', help='port to probe (repeatable, default 80)')
+    parser.add_argument('--concurrency', type=int, default=DISCOVERY_CONCURRENCY)
+    parser.add_argument('--timeout', type=float, default=DISCOVERY_CONNECT_TIMEOUT, help='connect timeout (s)')
+    args = parser.parse_args()
+
+    for miner_ip, data in discover(args.network, server.fingerprint_miner, tuple(args.port or (80,)),
+                                   args.concurrency, args.timeout):
+        print(f"⛏️  {miner_ip}: {data}")
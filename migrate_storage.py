@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Convert a NerdMiner history database to the compact storage layout
+Stop server.py first - the copy runs in batches and ends with a VACUUM
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import database
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate miner history to compact storage')
+    parser.add_argument('--db', default=database.DB_FILE, help=f'database file (default: {database.DB_FILE})')
+    parser.add_argument('--batch', type=int, default=50000, help='history rows copied per transaction')
+    parser.add_argument('--pack-after', type=int, default=database.PACK_AFTER_DAYS,
+                        help=f'pack samples older than this many days into compressed blocks, 0 = never '
+                             f'(default: {database.PACK_AFTER_DAYS})')
+    parser.add_argument('--no-vacuum', action='store_true', help='skip the final VACUUM')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"✖ {args.db} not found")
+        sys.exit(1)
+
+    database.DB_FILE = args.db
+    database.init_database()
+    if database.STORAGE_MODE == 'compact':
+        print(f"✔ {args.db} already uses compact storage")
+    else:
+        before = database.get_database_stats()
+        started = time.time()
+
+        def progress(done, total):
+            print(f"\r🔁 Copying history... {done * 100 // max(total, 1)}%", end='', flush=True)
+
+        copied = database.migrate_to_compact(args.batch, progress)
+        print(f"\n✔ Copied {copied} samples in {time.time() - started:.1f}s "
+              f"({before['total_records']} rows before)")
+
+    if args.pack_after:
+        database.pack_history_blocks(args.pack_after)
+
+    if not args.no_vacuum:
+        size_before = database._database_size()
+        print("🗜️  Vacuuming...")
+        conn = database.get_connection()
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')  # the VACUUM converts older files too
+        conn.execute('VACUUM')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        print(f"✔ {size_before / 1048576:.1f} MB -> {database._database_size() / 1048576:.1f} MB")
+
+    stats = database.get_database_stats()
+    print(f"📊 {stats['total_records']} samples, {stats['packed_blocks']} packed blocks, {stats['file_size_mb']} MB")
+
+
+if __name__ == '__main__':
+    main()
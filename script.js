@@ -3,9 +3,7 @@ const CONFIG = {
     updateInterval: 5000, // 5 seconds - reduced frequency to ease load on miners
     maxDataPoints: 20,
     requestTimeout: 20000, // 20 second timeout per request
-    maxRetries: 2, // Retry failed requests up to 2 times
-    retryDelay: 1000, // 1 second delay between retries
-    staggerDelay: 500 // 500ms delay between each miner update
+    maxHistoryPoints: 500 // Server downsamples long history windows to this many points
 };
 
 // Data storage
@@ -59,12 +57,14 @@ document.addEventListener('DOMContentLoaded', () => {
     initializeEventListeners();
     initializeCharts();
     loadSavedMiners();
-    startAutoUpdate();
+    // Live updates start once the charts hold the server's recent samples
+    preloadRecentHistory().finally(startAutoUpdate);
 });
 
 // Event Listeners
 function initializeEventListeners() {
     document.getElementById('add-miner').addEventListener('click', addMiner);
+    document.getElementById('discover-miners').addEventListener('click', discoverMiners);
     document.getElementById('sort-miners').addEventListener('change', sortMiners);
     document.getElementById('dark-mode-toggle').addEventListener('click', toggleDarkMode);
     
@@ -102,8 +102,26 @@ function addMiner() {
         return;
     }
     
-    const miner = {
-        id: Date.now(),
+    const miner = createMiner(ip, name);
+    removedIps.delete(ip);
+    miners.push(miner);
+    renderMiner(miner);
+    saveMiners();
+    registerMinerOnServer(miner);
+    updateTotalStats();
+    
+    // Clear inputs
+    document.getElementById('miner-ip').value = '';
+    document.getElementById('miner-name').value = '';
+}
+
+// Ids stay unique when several miners are created in the same millisecond
+let lastMinerId = 0;
+
+function createMiner(ip, name) {
+    lastMinerId = Math.max(Date.now(), lastMinerId + 1);
+    return {
+        id: lastMinerId,
         ip: ip,
         name: name,
         status: 'online',
@@ -114,27 +132,24 @@ function addMiner() {
         lastShare: null,
         uptime: 0,
         temperature: 0,
-        addedAt: new Date().toISOString(),        consecutiveFailures: 0,
-        lastSuccessTime: null,
-        nextRetryTime: 0,        history: {
+        addedAt: new Date().toISOString(),
+        history: {
             labels: [],
             hashrate: []
         }
     };
-    
-    miners.push(miner);
-    renderMiner(miner);
-    saveMiners();
-    updateTotalStats();
-    
-    // Clear inputs
-    document.getElementById('miner-ip').value = '';
-    document.getElementById('miner-name').value = '';
 }
 
 function removeMiner(id) {
     if (!confirm('Are you sure you want to remove this miner?')) return;
     
+    const miner = miners.find(m => m.id === id);
+    if (miner) {
+        removedIps.add(miner.ip);
+        unregisterMinerOnServer(miner);
+        forgetCachedHistory(`miner:${miner.ip}:`);
+    }
+    
     miners = miners.filter(m => m.id !== id);
     document.getElementById(`miner-${id}`).remove();
     
@@ -319,57 +334,84 @@ function updateTotalChart() {
     totalChartInstance.update('none');
 }
 
-// Data Fetching and Updates
-async function fetchMinerData(miner, retryCount = 0) {
+// Live chart label for a history point ('YYYY-MM-DD HH:MM:SS', UTC)
+function liveLabel(timestamp) {
+    return new Date(timestamp.replace(' ', 'T') + 'Z').toLocaleTimeString();
+}
+
+// Fill the live charts with each miner's last samples, held in memory by the server,
+// so a reload or server restart doesn't start from empty charts
+async function preloadRecentHistory() {
     try {
-        // Fetch the main page and scrape it
-        const proxyUrl = `/proxy?url=${encodeURIComponent(`http://${miner.ip}/`)}`;
+        const response = await fetch(`/history/recent?points=${CONFIG.maxDataPoints}`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const recent = await response.json();
         
-        const response = await fetch(proxyUrl, {
-            method: 'GET',
-            cache: 'no-cache',
-            signal: AbortSignal.timeout(CONFIG.requestTimeout)
+        const latest = {}; // miner ip -> hashrate at the point being totalled
+        const totals = new Map(); // timestamp -> fleet hashrate
+        const points = [];
+        
+        miners.forEach(miner => {
+            const history = recent[miner.ip] ? recent[miner.ip].history : [];
+            const hashrates = history.map(point => point.status === 'online' ? point.hashrate || 0 : 0);
+            miner.history.labels = history.map(point => liveLabel(point.timestamp));
+            miner.history.hashrate = hashrates;
+            history.forEach((point, index) => points.push([point.timestamp, miner.ip, hashrates[index]]));
+            
+            const chart = minerCharts[miner.id];
+            if (chart) {
+                chart.data.labels = miner.history.labels;
+                chart.data.datasets[0].data = miner.history.hashrate;
+                chart.update('none');
+            }
         });
         
-        if (!response.ok) {
-            throw new Error(`HTTP ${response.status}`);
+        // Fleet total at each sample time, carrying every miner's last value forward
+        points.sort((a, b) => a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0);
+        points.forEach(([timestamp, ip, hashrate]) => {
+            latest[ip] = hashrate;
+            totals.set(timestamp, Object.values(latest).reduce((sum, value) => sum + value, 0));
+        });
+        const recentTotals = [...totals].slice(-CONFIG.maxDataPoints);
+        totalChartData.labels = recentTotals.map(([timestamp]) => liveLabel(timestamp));
+        totalChartData.datasets[0] = { data: recentTotals.map(([, total]) => total) };
+        if (totalChartInstance) {
+            totalChartInstance.data.labels = totalChartData.labels;
+            totalChartInstance.data.datasets[0].data = totalChartData.datasets[0].data;
+            totalChartInstance.update('none');
         }
-        
-        const data = await response.json();
-        console.log(`✅ ${miner.name} (${miner.ip}) - Scraped data:`, data);
-        
-        // Reset failure counter on success
-        miner.consecutiveFailures = 0;
-        miner.lastSuccessTime = Date.now();
-        miner.nextRetryTime = 0;
-        
-        // Return parsed data
-        return {
-            status: 'online',
-            hashrate: parseFloat(data.hashrate || 0),
-            shares: parseInt(data.shares || 0),
-            acceptedShares: parseInt(data.acceptedShares || data.valids || Math.floor((data.shares || 0) * 0.95)),
-            bestDifficulty: parseFloat(data.bestDiff || 0),
-            temperature: parseInt(data.temp || 0),
-            lastShare: null,
-            uptime: parseInt(data.uptime || 0)
-        };
     } catch (error) {
-        // Retry logic with exponential backoff
-        if (retryCount < CONFIG.maxRetries) {
-            const delay = CONFIG.retryDelay * Math.pow(2, retryCount); // Exponential backoff
-            console.warn(`⚠️ ${miner.name} (${miner.ip}) - Retry ${retryCount + 1}/${CONFIG.maxRetries} after ${delay}ms`);
-            await new Promise(resolve => setTimeout(resolve, delay));
-            return fetchMinerData(miner, retryCount + 1);
-        }
-        
-        console.error(`❌ ${miner.name} (${miner.ip}) - Failed after ${retryCount} retries:`, error.message);
-        
-        // Track consecutive failures for exponential backoff
-        miner.consecutiveFailures++;
-        const backoffMinutes = Math.min(miner.consecutiveFailures, 5); // Max 5 minute backoff
-        miner.nextRetryTime = Date.now() + (backoffMinutes * 60 * 1000);
-        
+        console.error('Failed to load recent history:', error);
+    }
+}
+
+// Data Fetching and Updates
+let fleetEtag = null; // Last /fleet ETag - unchanged fleets come back as 304
+
+async function fetchFleetSnapshot() {
+    const headers = {};
+    if (fleetEtag) headers['If-None-Match'] = fleetEtag;
+    
+    const response = await fetch('/fleet', {
+        method: 'GET',
+        cache: 'no-store',
+        headers: headers,
+        signal: AbortSignal.timeout(CONFIG.requestTimeout)
+    });
+    
+    if (response.status === 304) {
+        return null; // Nothing changed since the last sweep
+    }
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+    }
+    
+    fleetEtag = response.headers.get('ETag');
+    return await response.json();
+}
+
+function parseFleetEntry(entry) {
+    if (entry.status !== 'online') {
         return {
             status: 'offline',
             hashrate: 0,
@@ -381,28 +423,21 @@ async function fetchMinerData(miner, retryCount = 0) {
             uptime: 0
         };
     }
+    
+    const data = entry.data || {};
+    return {
+        status: 'online',
+        hashrate: parseFloat(data.hashrate || 0),
+        shares: parseInt(data.shares || 0),
+        acceptedShares: parseInt(data.acceptedShares || data.valids || Math.floor((data.shares || 0) * 0.95)),
+        bestDifficulty: parseFloat(data.bestDiff || 0),
+        temperature: parseInt(data.temp || 0),
+        lastShare: null,
+        uptime: parseInt(data.uptime || 0)
+    };
 }
 
-
-async function updateMinerData(miner) {
-    let data;
-    try {
-        data = await fetchMinerData(miner);
-    } catch (error) {
-        console.error(`Error fetching data for ${miner.name}:`, error);
-        // Return current data as offline
-        data = {
-            status: 'offline',
-            hashrate: 0,
-            shares: miner.shares || 0,
-            acceptedShares: miner.acceptedShares || 0,
-            bestDifficulty: miner.bestDifficulty || 0,
-            temperature: 0,
-            lastShare: null,
-            uptime: 0
-        };
-    }
-    
+function updateMinerData(miner, data) {
     // Update miner object
     miner.status = data.status;
     miner.hashrate = data.hashrate;
@@ -413,9 +448,6 @@ async function updateMinerData(miner) {
     miner.lastShare = data.lastShare;
     miner.uptime = data.uptime;
     
-    // Save to database
-    saveMinerToDatabase(miner, data);
-    
     // Update UI
     const minerCard = document.getElementById(`miner-${miner.id}`);
     if (minerCard) {
@@ -429,11 +461,16 @@ async function updateMinerData(miner) {
             ${miner.status}
         `;
         
-        document.getElementById(`miner-${miner.id}-hashrate`).textContent = `${miner.hashrate.toFixed(2)} H/s`;
-        document.getElementById(`miner-${miner.id}-accepted`).textContent = miner.acceptedShares;
-        document.getElementById(`miner-${miner.id}-shares`).textContent = miner.shares;
-        document.getElementById(`miner-${miner.id}-diff`).textContent = miner.bestDifficulty.toFixed(3);
-        document.getElementById(`miner-${miner.id}-temp`).textContent = `${miner.temperature}°C`;
+        // Not every card layout shows every stat
+        const setStat = (suffix, text) => {
+            const el = document.getElementById(`miner-${miner.id}-${suffix}`);
+            if (el) el.textContent = text;
+        };
+        setStat('hashrate', `${miner.hashrate.toFixed(2)} H/s`);
+        setStat('accepted', miner.acceptedShares);
+        setStat('shares', miner.shares);
+        setStat('diff', miner.bestDifficulty.toFixed(3));
+        setStat('temp', `${miner.temperature}°C`);
     }
     
     // Update chart
@@ -456,41 +493,126 @@ function updateTotalStats() {
     updateTotalChart();
 }
 
-async function updateAllMiners() {
-    // Stagger updates to avoid overwhelming the network
-    for (let i = 0; i < miners.length; i++) {
-        const miner = miners[i];
-        
-        // Skip if in exponential backoff period
-        if (miner.nextRetryTime && Date.now() < miner.nextRetryTime) {
-            const waitMinutes = Math.ceil((miner.nextRetryTime - Date.now()) / 60000);
-            console.log(`⏳ ${miner.name} - Skipping (backoff: ${waitMinutes}m remaining)`);
-            continue;
-        }
-        
-        // Update miner
+// Miners removed in this tab - an update already in flight must not bring them back
+const removedIps = new Set();
+
+function applyFleetEntry(ip, entry) {
+    // Miners the server found on its own (LAN discovery) show up like hand-added ones
+    if (!miners.some(miner => miner.ip === ip) && !removedIps.has(ip)) {
+        const miner = createMiner(ip, entry.name || `Miner-${ip}`);
+        miners.push(miner);
+        renderMiner(miner);
+        saveMiners();
+    }
+    
+    miners.filter(miner => miner.ip === ip).forEach(miner => {
         try {
-            await updateMinerData(miner);
+            updateMinerData(miner, parseFleetEntry(entry));
         } catch (err) {
             console.error(`Failed to update ${miner.name}:`, err);
         }
-        
-        // Add delay between miners
-        if (i < miners.length - 1) {
-            await new Promise(resolve => setTimeout(resolve, CONFIG.staggerDelay));
-        }
-    }
-    
+    });
+}
+
+function applyFleet(fleet) {
+    // Miners not in the snapshot have not been polled yet (just added)
+    Object.entries(fleet.miners).forEach(([ip, entry]) => applyFleetEntry(ip, entry));
     updateTotalStats();
     saveMiners();
 }
 
-function startAutoUpdate() {
-    // Clear any existing interval
+async function updateAllMiners() {
+    // One request returns every miner's latest stats from the server's poller
+    let fleet;
+    try {
+        fleet = await fetchFleetSnapshot();
+    } catch (error) {
+        console.error('Failed to load fleet snapshot:', error.message);
+        return;
+    }
+    if (fleet) applyFleet(fleet);
+}
+
+// Live push channel - /events streams each miner as soon as its stats change
+let eventSource = null;
+let eventRetryDelay = 1000; // Backoff before reconnecting, doubled per failure
+let eventRetryTimer = null;
+let totalsTimer = null;
+
+function scheduleTotalsUpdate() {
+    // Miners report one by one during a sweep - add one total chart point per burst
+    if (totalsTimer) return;
+    totalsTimer = setTimeout(() => {
+        totalsTimer = null;
+        updateTotalStats();
+        saveMiners();
+    }, 1000);
+}
+
+function startPolling() {
+    if (updateIntervalId) return;
+    updateAllMiners();
+    updateIntervalId = setInterval(updateAllMiners, CONFIG.updateInterval);
+}
+
+function stopPolling() {
     if (updateIntervalId) {
-        console.log('⚠️ Clearing existing update interval to prevent duplicates');
         clearInterval(updateIntervalId);
+        updateIntervalId = null;
     }
+}
+
+function connectLiveEvents() {
+    eventRetryTimer = null;
+    eventSource = new EventSource('/events');
+    
+    eventSource.onopen = () => {
+        console.log('📡 Live updates connected');
+        eventRetryDelay = 1000;
+        stopPolling(); // The stream replaces the polling fallback
+    };
+    
+    eventSource.addEventListener('fleet', event => {
+        applyFleet(JSON.parse(event.data));
+    });
+    
+    eventSource.addEventListener('miner', event => {
+        const entry = JSON.parse(event.data);
+        applyFleetEntry(entry.ip, entry);
+        scheduleTotalsUpdate();
+    });
+    
+    eventSource.onerror = () => {
+        // Take over reconnects so a busy or restarting server gets backoff, and poll meanwhile
+        eventSource.close();
+        eventSource = null;
+        startPolling();
+        
+        const delay = eventRetryDelay * (0.5 + Math.random());
+        console.log(`⚠️ Live updates lost - polling /fleet, reconnecting in ${(delay / 1000).toFixed(1)}s`);
+        eventRetryTimer = setTimeout(connectLiveEvents, delay);
+        eventRetryDelay = Math.min(eventRetryDelay * 2, 60000);
+    };
+}
+
+function stopAutoUpdate() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
+    if (eventRetryTimer) {
+        clearTimeout(eventRetryTimer);
+        eventRetryTimer = null;
+    }
+    stopPolling();
+}
+
+function startAutoUpdate() {
+    // Clear any existing stream or interval
+    if (eventSource || updateIntervalId) {
+        console.log('⚠️ Stopping existing live updates to prevent duplicates');
+    }
+    stopAutoUpdate();
     
     // Only start updates if not in history mode
     if (isHistoryMode) {
@@ -498,16 +620,15 @@ function startAutoUpdate() {
         return;
     }
     
-    console.log(`✅ Starting auto-update every ${CONFIG.updateInterval / 1000}s (staggered with ${CONFIG.staggerDelay}ms delays)`);
-    console.log(`⚙️ Request timeout: ${CONFIG.requestTimeout / 1000}s, Max retries: ${CONFIG.maxRetries}`);
-    
-    // Initial update
-    updateAllMiners();
+    console.log(`⚙️ Request timeout: ${CONFIG.requestTimeout / 1000}s`);
     
-    // Set up interval
-    updateIntervalId = setInterval(() => {
-        updateAllMiners();
-    }, CONFIG.updateInterval);
+    if (window.EventSource) {
+        console.log('✅ Starting live updates from /events');
+        connectLiveEvents();
+    } else {
+        console.log(`✅ Starting auto-update every ${CONFIG.updateInterval / 1000}s`);
+        startPolling();
+    }
 }
 
 // Handle time range change
@@ -517,7 +638,7 @@ async function handleTimeRangeChange(range) {
     if (range === 'live') {
         // Switch back to live mode
         isHistoryMode = false;
-        statusEl.textContent = 'Showing live data - updates every 5 seconds';
+        statusEl.textContent = 'Showing live data - updates as miners report';
         statusEl.className = 'text-muted mt-2';
         
         // Resume live updates
@@ -527,9 +648,7 @@ async function handleTimeRangeChange(range) {
         isHistoryMode = true;
         
         // Stop live updates
-        if (updateIntervalId) {
-            clearInterval(updateIntervalId);
-        }
+        stopAutoUpdate();
         
         // Parse hours from range value
         const hours = parseInt(range);
@@ -557,22 +676,23 @@ async function handleTimeRangeChange(range) {
 // Load historical data
 async function loadHistoricalData(hours) {
     try {
-        // Load total stats history
-        const totalHistory = await loadTotalHistory(hours);
+        // Load total and individual miner history in parallel
+        const [totalHistory, minerHistories] = await Promise.all([
+            loadTotalHistory(hours),
+            Promise.all(miners.map(miner => loadMinerHistory(miner.ip, hours)))
+        ]);
         
         // Update total chart with historical data
         if (totalHistory && totalHistory.length > 0) {
             updateTotalChartWithHistory(totalHistory);
         }
         
-        // Load individual miner history
-        const miners = JSON.parse(localStorage.getItem('miners') || '[]');
-        for (const miner of miners) {
-            const minerHistory = await loadMinerHistory(miner.ip, hours);
+        miners.forEach((miner, index) => {
+            const minerHistory = minerHistories[index];
             if (minerHistory && minerHistory.length > 0) {
-                updateMinerChartWithHistory(miner.ip, minerHistory);
+                updateMinerChartWithHistory(miner.id, minerHistory);
             }
-        }
+        });
     } catch (error) {
         console.error('Error in loadHistoricalData:', error);
         throw error;
@@ -611,8 +731,8 @@ function updateTotalChartWithHistory(historyData) {
 }
 
 // Update individual miner chart with historical data
-function updateMinerChartWithHistory(minerIp, historyData) {
-    const chartInstance = minerCharts[minerIp];
+function updateMinerChartWithHistory(minerId, historyData) {
+    const chartInstance = minerCharts[minerId];
     if (!chartInstance) return;
     
     if (!historyData || historyData.length === 0) {
@@ -655,10 +775,7 @@ function saveMiners() {
             temperature: m.temperature,
             lastShare: m.lastShare,
             uptime: m.uptime,
-            addedAt: m.addedAt,
-            consecutiveFailures: m.consecutiveFailures || 0,
-            lastSuccessTime: m.lastSuccessTime,
-            nextRetryTime: m.nextRetryTime || 0
+            addedAt: m.addedAt
         }));
         localStorage.setItem('nerdminer-miners', JSON.stringify(minersData));
     } catch (error) {
@@ -674,9 +791,6 @@ function loadSavedMiners() {
             minersData.forEach(minerData => {
                 const miner = {
                     ...minerData,
-                    consecutiveFailures: minerData.consecutiveFailures || 0,
-                    lastSuccessTime: minerData.lastSuccessTime || null,
-                    nextRetryTime: minerData.nextRetryTime || 0,
                     history: {
                         labels: [],
                         hashrate: []
@@ -684,6 +798,7 @@ function loadSavedMiners() {
                 };
                 miners.push(miner);
                 renderMiner(miner);
+                registerMinerOnServer(miner);
             });
             updateTotalStats();
         }
@@ -746,38 +861,170 @@ function sortMiners() {
     miners.forEach(miner => renderMiner(miner));
 }
 
-// Database functions
-async function saveMinerToDatabase(miner, data) {
+// Server-side polling registration
+async function registerMinerOnServer(miner) {
     try {
-        await fetch('/save', {
+        await fetch('/miners', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({
-                ip: miner.ip,
-                name: miner.name,
-                data: {
-                    status: data.status,
-                    hashrate: data.hashrate,
-                    shares: data.shares,
-                    acceptedShares: data.acceptedShares,
-                    bestDiff: data.bestDifficulty,
-                    temp: data.temperature,
-                    uptime: data.uptime
-                }
-            })
+            body: JSON.stringify({ ip: miner.ip, name: miner.name })
         });
     } catch (error) {
-        console.error('Failed to save to database:', error);
+        console.error('Failed to register miner with server:', error);
     }
 }
 
+async function discoverMiners() {
+    const network = document.getElementById('discover-network').value.trim();
+    const status = document.getElementById('discover-status');
+    const button = document.getElementById('discover-miners');
+    
+    if (!network) {
+        alert('Please enter a network range, e.g. 192.168.1.0/24');
+        return;
+    }
+    
+    button.disabled = true;
+    try {
+        let response = await fetch('/discover', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ network: network })
+        });
+        if (response.status === 400) {
+            status.textContent = 'Invalid network range';
+            return;
+        }
+        
+        // The sweep runs on the server - follow its progress
+        let result = await response.json();
+        while (result.running) {
+            status.textContent = `Scanning ${result.network}... ${result.scanned}/${result.total}`;
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            result = await (await fetch('/discover')).json();
+        }
+        
+        const added = result.found.filter(hit => hit.new).length;
+        status.textContent = result.error
+            ? `Scan failed: ${result.error}`
+            : `Found ${result.found.length} miner(s), ${added} new`;
+        if (added) updateAllMiners();
+    } catch (error) {
+        console.error('Discovery failed:', error);
+        status.textContent = 'Scan failed';
+    } finally {
+        button.disabled = false;
+    }
+}
+
+async function unregisterMinerOnServer(miner) {
+    try {
+        await fetch('/miners/remove', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ ip: miner.ip })
+        });
+    } catch (error) {
+        console.error('Failed to unregister miner from server:', error);
+    }
+}
+
+// History cache - each range's points are kept in IndexedDB, so re-opening
+// a range only fetches the points added since it was last shown
+const HISTORY_DB = 'nerdminer-history';
+const HISTORY_STORE = 'ranges';
+let historyDb = null;
+
+function openHistoryDb() {
+    if (!historyDb) {
+        historyDb = new Promise(resolve => {
+            if (!window.indexedDB) {
+                resolve(null);
+                return;
+            }
+            const request = indexedDB.open(HISTORY_DB, 1);
+            request.onupgradeneeded = () => request.result.createObjectStore(HISTORY_STORE, { keyPath: 'key' });
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => {
+                // Private browsing and disabled storage just fetch everything
+                console.warn('History cache unavailable:', request.error);
+                resolve(null);
+            };
+        });
+    }
+    return historyDb;
+}
+
+function historyStoreRequest(db, mode, action) {
+    return new Promise((resolve, reject) => {
+        const request = action(db.transaction(HISTORY_STORE, mode).objectStore(HISTORY_STORE));
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// The server's timestamp format (UTC), which sorts correctly as text
+function historyTimestamp(date) {
+    return date.toISOString().slice(0, 19).replace('T', ' ');
+}
+
+async function fetchCachedHistory(key, url, hours) {
+    const db = await openHistoryDb();
+    let cached = null;
+    if (db) {
+        try {
+            cached = await historyStoreRequest(db, 'readonly', store => store.get(key));
+        } catch (error) {
+            console.warn('Failed to read history cache:', error);
+        }
+    }
+    
+    // Only ask for points from the last cached one on
+    const since = cached && cached.points.length > 0 ? cached.points[cached.points.length - 1].timestamp : null;
+    const response = await fetch(since ? `${url}&since=${encodeURIComponent(since)}` : url);
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    const newPoints = await response.json();
+    
+    // The point at `since` comes back too (its rollup bucket may have grown), so it is replaced.
+    // Rollup windows start at the bucket holding `hours` ago - the server says where
+    let points = newPoints;
+    if (since) {
+        const windowStart = response.headers.get('X-Window-Start') ||
+            historyTimestamp(new Date(Date.now() - hours * 3600 * 1000));
+        points = cached.points
+            .filter(point => point.timestamp >= windowStart && point.timestamp < since)
+            .concat(newPoints);
+    }
+    
+    if (db) {
+        historyStoreRequest(db, 'readwrite', store => store.put({ key, points, saved: Date.now() }))
+            .catch(error => console.warn('Failed to update history cache:', error));
+    }
+    return points;
+}
+
+async function forgetCachedHistory(prefix) {
+    const db = await openHistoryDb();
+    if (!db) return;
+    try {
+        await historyStoreRequest(db, 'readwrite',
+            store => store.delete(IDBKeyRange.bound(prefix, prefix + '\uffff')));
+    } catch (error) {
+        console.warn('Failed to clear history cache:', error);
+    }
+}
+
+// Database functions
 async function loadMinerHistory(minerIp, hours = 24) {
     try {
-        const response = await fetch(`/history/miner?ip=${encodeURIComponent(minerIp)}&hours=${hours}`);
-        if (!response.ok) throw new Error(`HTTP ${response.status}`);
-        return await response.json();
+        const url = `/history/miner?ip=${encodeURIComponent(minerIp)}&hours=${hours}&max_points=${CONFIG.maxHistoryPoints}`;
+        return await fetchCachedHistory(`miner:${minerIp}:${hours}:${CONFIG.maxHistoryPoints}`, url, hours);
     } catch (error) {
         console.error('Failed to load history:', error);
         return [];
@@ -786,9 +1033,8 @@ async function loadMinerHistory(minerIp, hours = 24) {
 
 async function loadTotalHistory(hours = 24) {
     try {
-        const response = await fetch(`/history/total?hours=${hours}`);
-        if (!response.ok) throw new Error(`HTTP ${response.status}`);
-        return await response.json();
+        const url = `/history/total?hours=${hours}&max_points=${CONFIG.maxHistoryPoints}`;
+        return await fetchCachedHistory(`total:${hours}:${CONFIG.maxHistoryPoints}`, url, hours);
     } catch (error) {
         console.error('Failed to load total history:', error);
         return [];
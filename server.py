@@ -5,57 +5,230 @@ Pool API primary + HTML scraping fallback with caching + SQLite history
 """
 
 import http.server
-import socketserver
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse, parse_qs, quote
 import json
 import urllib.request
 import urllib.error
+import http.client
 import re
+import html
+import codecs
+import functools
 from html.parser import HTMLParser
 import time
-import database
+import random
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections import OrderedDict, deque
+from array import array
+import argparse
+import hashlib
+import hmac
+import itertools
+import bisect
+import math
+import calendar
+import socket
+import uuid
+import os
 import sys
+import io
+import csv
+import gzip
+import zlib
+import mimetypes
+import email.utils
+import database
+import discovery
+import metrics
+
+try:
+    import brotli  # optional - pip install brotli; gzip is used without it
+except ImportError:
+    brotli = None
 
 # Default port (can be overridden via command-line argument)
 PORT = 8000
 
-# Parse command-line arguments for custom port
-if len(sys.argv) > 1:
-    try:
-        PORT = int(sys.argv[1])
-        if PORT < 1 or PORT > 65535:
-            print(f"⚠️  Invalid port number: {PORT}")
-            print(f"   Port must be between 1 and 65535")
-            print(f"   Using default port 8000 instead")
-            PORT = 8000
-    except ValueError:
-        print(f"⚠️  Invalid port argument: {sys.argv[1]}")
-        print(f"   Usage: python server.py [port]")
-        print(f"   Using default port 8000 instead")
-        PORT = 8000
+# HTTP worker threads - a slow /proxy call only ties up one of them
+HTTP_WORKERS = 16
+HTTP_BACKLOG = 64   # accepted connections waiting for a worker before new ones get 503
+
+# Cache for miner data (see MinerCache)
+CACHE_DURATION = 5         # seconds - reduce polling load on ESP32
+CACHE_STALE_DURATION = 25  # seconds an expired entry is still served while it refreshes
+CACHE_MAX_ENTRIES = 1024   # least recently used entries are evicted beyond this
+CAPABILITY_RECHECK = 3600  # seconds before a miner without a JSON API is probed again (firmware updates)
+
+# HTTP statuses that mean a JSON status path does not exist (not just a busy miner)
+JSON_ABSENT_STATUSES = (404, 405, 501)
+
+# Background poller settings
+POLL_INTERVAL = 5   # seconds - default per-miner poll interval, and how often the miner list is re-read
+POLL_WORKERS = 32   # miners scraped concurrently
+POLL_TIMEOUT = 4    # seconds - keep dead miners from stalling a sweep
+
+# Adaptive per-miner schedule (see MinerPoller.reschedule)
+POLL_MIN_INTERVAL = 2      # seconds - miners whose stats change on every poll
+POLL_STEADY_INTERVAL = 15  # seconds - healthy miners whose stats have stopped changing
+POLL_BACKOFF_MAX = 300     # seconds - cap for unreachable miners
+POLL_LATENCY_FACTOR = 4    # never poll more often than this many response times
+POLL_EWMA_ALPHA = 0.3      # weight of the newest latency / change sample
+POLL_HASHRATE_CHANGE = 0.05  # relative hashrate move that counts as a change (ESP32 readings jitter)
+PROXY_TIMEOUT = 18  # seconds - on-demand /proxy fetches of unpolled URLs
+
+# Live push channel (/events) settings
+SSE_MAX_CLIENTS = HTTP_WORKERS // 2  # each open stream holds an HTTP worker thread
+SSE_BACKLOG = 256       # queued updates per client before a slow client is dropped
+SSE_KEEPALIVE = 15      # seconds between keepalive comments on an idle stream
+SSE_RETRY_MS = 5000     # reconnect delay suggested to browsers
+
+# Bulk history writes (/save/batch)
+SAVE_BATCH_MAX = 5000            # samples per request
+SAVE_BODY_MAX = 4 * 1024 * 1024  # bytes per request
+SAMPLE_MAX_SKEW = 300            # seconds a sample timestamp may be ahead of this server's clock
+SAMPLE_NUMERIC_FIELDS = ('hashrate', 'shares', 'acceptedShares', 'bestDiff', 'temp', 'uptime')
+
+# Recent history kept in memory (RecentHistory) - live charts and windows this short skip SQLite
+RECENT_HISTORY_HOURS = 1       # hours of samples kept per miner
+RECENT_HISTORY_POINTS = 2048   # samples per miner ring (an hour at the fastest poll interval is 1800)
+RECENT_POINTS_DEFAULT = 20     # /history/recent points per miner, like the live charts
+
+# History export (/export)
+EXPORT_CHUNK_BYTES = 64 * 1024  # rows are buffered up to this size per chunk
+EXPORT_TIME_FORMATS = (database.TIMESTAMP_FORMAT, '%Y-%m-%d')  # besides epoch seconds, always UTC
+
+# Response compression and browser caching
+COMPRESS_MIN_BYTES = 1024   # smaller bodies are sent as-is
+COMPRESS_LEVEL = 5          # gzip level for JSON built per request (static files use 9)
+STATIC_CACHE_MAX_BYTES = 4 * 1024 * 1024  # larger files are streamed from disk uncached
+STATIC_IMMUTABLE_AGE = 365 * 86400        # seconds - assets requested with their current ?v= fingerprint
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+
+# Analytics summaries (/analytics) are recomputed at most this often per window
+ANALYTICS_CACHE_TTL = 60       # seconds
+ANALYTICS_STALE_DURATION = 240  # seconds an expired summary is still served while it recomputes
+
+# LAN discovery (/discover, --discover) - timeouts and concurrency live in discovery.py
+DISCOVERY_INTERVAL = 3600  # seconds between re-sweeps of a --discover range (DHCP moves miners around)
+DISCOVERY_PORTS = (80,)    # the only ports sweeps may probe (--discover-port)
+
+# Federation: collectors (--forward-to) push samples to a central server's /ingest
+FORWARD_INTERVAL = 5            # seconds between batches sent by a collector
+FORWARD_BATCH_MAX = SAVE_BATCH_MAX  # samples per batch
+FORWARD_BUFFER_MAX = 200000     # samples held while the central server is unreachable (oldest dropped)
+FORWARD_BACKOFF_MAX = 300       # seconds - cap for resend backoff
+FORWARD_TIMEOUT = 30            # seconds per batch upload
+INGEST_BODY_MAX = 64 * 1024 * 1024  # bytes of a batch after decompression
+INGEST_RECENT_BATCHES = 4096    # batch ids remembered so a resent batch is not stored twice
+SITE_PATTERN = re.compile(r'^[\w.-]{1,64}$')
+
+# Mining pool API settings
+DEFAULT_POOL = 'public-pool.io:40557'
+POOL_CACHE_TTL = 60        # seconds a pool response is reused per (pool, wallet)
+POOL_STALE_DURATION = 300  # seconds an expired response is still served while it refreshes
+POOL_TIMEOUT = 18          # seconds - public pools can be slow
+POOL_IDLE_CONNECTIONS = 4  # keep-alive connections kept open per pool host
+
+# Value patterns for the stats on the NerdMiner status page
+HASHRATE_PATTERN = re.compile(r'([\d.]+)\s*(h/s|kh/s|mh/s)', re.IGNORECASE)
+INTEGER_PATTERN = re.compile(r'(\d+)')
+NUMBER_PATTERN = re.compile(r'([\d.]+)')
+TEMPERATURE_PATTERN = re.compile(r'([\d.]+)\s*[°]?\s*([cf])?', re.IGNORECASE)
+HASHRATE_UNITS = {'h/s': 1, 'kh/s': 1000, 'mh/s': 1000000}
+
+PARSE_CHUNK = 2048  # bytes fed to the parser at a time, up to the next tag (stops early once complete)
+BYTE_SCAN = False   # use scan_miner_page instead of HTMLParser (--byte-scan)
+
+# Hot-path metrics served by /metrics (see metrics.py)
+SCRAPE_SECONDS = metrics.histogram('nerdminer_scrape_seconds', 'Miner scrape latency in seconds',
+                                   ('miner', 'result'))
+PARSE_SECONDS = metrics.histogram('nerdminer_parse_seconds', 'Status page / JSON parse time in seconds',
+                                  ('parser',))
+HTTP_REQUESTS = metrics.counter('nerdminer_http_requests_total', 'HTTP responses by route and status',
+                                ('route', 'status'))
+HTTP_SECONDS = metrics.histogram('nerdminer_http_request_seconds', 'HTTP request handling time in seconds',
+                                 ('route',))
+HTTP_REJECTED = metrics.counter('nerdminer_http_rejected_total',
+                                'Connections answered 503 because every worker was busy and the backlog full')
+
+
+def _parse_hashrate(text, data):
+    match = HASHRATE_PATTERN.search(text)
+    if match:
+        # Convert to H/s
+        data['hashrate'] = float(match.group(1)) * HASHRATE_UNITS[match.group(2).lower()]
+        return True
+    return False
+
+
+def _parse_accepted(text, data):
+    match = INTEGER_PATTERN.search(text)
+    if match:
+        data['acceptedShares'] = int(match.group(1))
+        data['shares'] = int(match.group(1))  # Use same value for total shares
+        return True
+    return False
+
+
+def _parse_best_diff(text, data):
+    match = NUMBER_PATTERN.search(text)
+    if match:
+        data['bestDiff'] = float(match.group(1))
+        return True
+    return False
+
+
+def _parse_temperature(text, data):
+    match = TEMPERATURE_PATTERN.search(text)
+    if match:
+        temp = float(match.group(1))
+        unit = match.group(2).lower() if match.group(2) else 'c'
+        # Convert Fahrenheit to Celsius if needed
+        if unit == 'f':
+            temp = (temp - 32) * 5.0 / 9.0
+        data['temp'] = round(temp, 1)
+        return True
+    return False
+
+
+# Label text before a value span -> (stat, value parser); first match wins
+LABEL_FIELDS = (
+    (('hash rate',), 'hashrate', _parse_hashrate),
+    (('accepted', 'share'), 'acceptedShares', _parse_accepted),
+    (('best', 'diff'), 'bestDiff', _parse_best_diff),
+    (('temp',), 'temp', _parse_temperature),
+)
 
-# Initialize database on startup
-database.init_database()
 
-# Cache for miner data (IP -> {data, timestamp})
-miner_cache = {}
-CACHE_DURATION = 5  # seconds - reduce polling load on ESP32
+@functools.lru_cache(maxsize=512)
+def label_field(label):
+    """(stat, value parser) a label introduces, or None - labels repeat every poll"""
+    label = label.lower()
+    for words, field, parse in LABEL_FIELDS:
+        if all(word in label for word in words):
+            return field, parse
+    return None
+
 
 class NerdMinerHTMLParser(HTMLParser):
     """Parse NerdMiner HTML to extract stats"""
     def __init__(self):
         super().__init__()
         self.data = {}
-        self.current_tag = None
-        self.current_attrs = {}
+        self.found = set()
         self.in_val_span = False
         self.last_text = ""
+    
+    @property
+    def complete(self):
+        """True once every known stat has been extracted"""
+        return len(self.found) == len(LABEL_FIELDS)
         
     def handle_starttag(self, tag, attrs):
-        self.current_tag = tag
-        self.current_attrs = dict(attrs)
         # Check if this is a <span class="val">
-        if tag == 'span' and self.current_attrs.get('class') == 'val':
+        if tag == 'span' and dict(attrs).get('class') == 'val':
             self.in_val_span = True
         
     def handle_endtag(self, tag):
@@ -69,96 +242,1849 @@ class NerdMinerHTMLParser(HTMLParser):
         
         # If we're in a val span, use the last_text to determine what this value is
         if self.in_val_span:
-            # Hash Rate value
-            if 'hash rate' in self.last_text.lower():
-                match = re.search(r'([\d.]+)\s*(h/s|kh/s|mh/s)', text, re.IGNORECASE)
-                if match:
-                    hashrate = float(match.group(1))
-                    unit = match.group(2).lower()
-                    # Convert to H/s
-                    if unit == 'kh/s':
-                        hashrate = hashrate * 1000
-                    elif unit == 'mh/s':
-                        hashrate = hashrate * 1000000
-                    self.data['hashrate'] = hashrate
-            
-            # Accepted Shares value
-            elif 'accepted' in self.last_text.lower() and 'share' in self.last_text.lower():
-                match = re.search(r'(\d+)', text)
-                if match:
-                    self.data['acceptedShares'] = int(match.group(1))
-                    self.data['shares'] = int(match.group(1))  # Use same value for total shares
-            
-            # Best difficulty value
-            elif 'best' in self.last_text.lower() and 'diff' in self.last_text.lower():
-                match = re.search(r'([\d.]+)', text)
-                if match:
-                    self.data['bestDiff'] = float(match.group(1))
-            
-            # Temperature value (C or F)
-            elif 'temp' in self.last_text.lower():
-                match = re.search(r'([\d.]+)\s*[°]?\s*([cf])?', text, re.IGNORECASE)
-                if match:
-                    temp = float(match.group(1))
-                    unit = match.group(2).lower() if match.group(2) else 'c'
-                    # Convert Fahrenheit to Celsius if needed
-                    if unit == 'f':
-                        temp = (temp - 32) * 5.0 / 9.0
-                    self.data['temp'] = round(temp, 1)
+            field = label_field(self.last_text)
+            if field and field[1](text, self.data):
+                self.found.add(field[0])
         
         # Save the current text for context
         self.last_text = text
 
 
-def fetch_miner_with_cache(url):
-    """Fetch miner data with intelligent caching to reduce load"""
-    now = time.time()
+def parse_miner_page(content):
+    """Extract stats from a status page (bytes), stopping once every stat is found"""
+    if BYTE_SCAN:
+        return scan_miner_page(content)
+    
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    parser = NerdMinerHTMLParser()
+    start = 0
+    while start < len(content):
+        # Cut chunks just before a '<' - HTMLParser reports text at the end of a feed
+        # as it stands, so a value split between two feeds would be read as two values
+        end = content.find(b'<', start + PARSE_CHUNK)
+        if end < 0:
+            end = len(content)
+        parser.feed(decoder.decode(content[start:end]))
+        if parser.complete:
+            break
+        start = end
+    return parser.data
+
+
+# Tokens for scan_miner_page, in the order HTMLParser would report them
+SCAN_TOKEN = re.compile(
+    rb'<!--.*?-->|<![^>]*>|<\?[^>]*>'                                            # ignored
+    rb'|<(?P<raw>script|style)\b[^>]*>(?P<raw_text>.*?)</(?P=raw)\s*>'           # raw text
+    rb'|<(?P<close>/?)(?P<tag>[a-zA-Z][^\s/>]*)(?P<attrs>[^>]*)>'                 # tags
+    rb'|(?P<text>[^<]+)',                                                       # text
+    re.DOTALL | re.IGNORECASE
+)
+SCAN_CLASS = re.compile(rb'''class\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''', re.IGNORECASE)
+
+
+def scan_miner_page(content):
+    """Byte-level equivalent of NerdMinerHTMLParser for well-formed status pages.
     
-    # Check cache first
-    if url in miner_cache:
-        cached_data, cached_time = miner_cache[url]
-        if now - cached_time < CACHE_DURATION:
-            return cached_data, True  # Cache hit
+    Skips building a DOM event stream in pure Python; text is only decoded
+    and unescaped when it can matter.
+    """
+    data = {}
+    found = set()
+    in_val_span = False
+    last_text = ''
     
-    # Fetch fresh data
-    try:
-        req = urllib.request.Request(url, headers={'User-Agent': 'NerdMiner-Dashboard'})
-        with urllib.request.urlopen(req, timeout=18) as response:
-            html_content = response.read().decode('utf-8', errors='ignore')
+    for match in SCAN_TOKEN.finditer(content):
+        tag = match.group('tag')
+        if tag is not None:
+            if tag.lower() == b'span':
+                attrs = match.group('attrs')
+                if match.group('close') or attrs.rstrip().endswith(b'/'):
+                    in_val_span = False
+                else:
+                    classes = SCAN_CLASS.findall(attrs)
+                    if classes and b''.join(classes[-1]) == b'val':
+                        in_val_span = True
+            continue
+        
+        raw = match.group('text')
+        if raw is None:
+            raw = match.group('raw_text')
+            if raw is None:
+                continue  # comment or declaration
+        
+        text = raw.decode('utf-8', errors='ignore')
+        if '&' in text:
+            text = html.unescape(text)
+        text = text.strip()
+        if not text:
+            continue
+        
+        if in_val_span:
+            field = label_field(last_text)
+            if field and field[1](text, data):
+                found.add(field[0])
+                if len(found) == len(LABEL_FIELDS):
+                    break
+        last_text = text
+    
+    return data
+
+
+# JSON status endpoints some firmware builds expose, tried in order
+JSON_STATUS_PATHS = ('/api/status', '/json')
+
+# Stat -> accepted JSON keys (numeric hashrates are H/s; strings keep their units)
+JSON_FIELDS = {
+    'hashrate': ('hashrate', 'hashRate', 'hash_rate'),
+    'acceptedShares': ('acceptedShares', 'accepted', 'shares', 'valids'),
+    'bestDiff': ('bestDiff', 'bestDifficulty', 'best_diff'),
+    'temp': ('temp', 'temperature')
+}
+JSON_PARSERS = {
+    'hashrate': _parse_hashrate,
+    'acceptedShares': _parse_accepted,
+    'bestDiff': _parse_best_diff,
+    'temp': _parse_temperature
+}
+
+def miner_url(miner_ip):
+    """Status page URL for a miner IP"""
+    return f'http://{miner_ip}/'
+
+
+def fetch_miner(url, timeout=18):
+    """Fetch a miner's stats (no caching), preferring its JSON API when it has one"""
+    capability = miner_cache.capability(url)
+    if capability is None:
+        capability = probe_miner(url, timeout)
+    
+    if capability != 'html':
+        try:
+            content = _download(capability, timeout)
+            with PARSE_SECONDS.time('json'):
+                return parse_miner_json(content)
+        except urllib.error.HTTPError as e:
+            # Endpoint went away (firmware change): re-probe next time. Either way scrape the page now
+            if e.code in JSON_ABSENT_STATUSES:
+                miner_cache.forget_capability(url)
+        except ValueError:
+            miner_cache.forget_capability(url)
+    
+    content = _download(url, timeout)
+    with PARSE_SECONDS.time('byte-scan' if BYTE_SCAN else 'html'):
+        return parse_miner_page(content)
+
+
+def _download(url, timeout):
+    req = urllib.request.Request(url, headers={'User-Agent': 'NerdMiner-Dashboard'})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return response.read()
+
+
+def probe_miner(url, timeout):
+    """Find out whether a miner serves a JSON status endpoint.
+    
+    Only a missing path (JSON_ABSENT_STATUSES) or a 200 that is not a status
+    payload count as no API. A busy miner's 5xx scrapes the page this time
+    without remembering anything, and connection failures are raised, so
+    either is probed again on the next poll.
+    """
+    busy = False
+    for path in JSON_STATUS_PATHS:
+        json_url = url.rstrip('/') + path
+        try:
+            parse_miner_json(_download(json_url, timeout))
+        except urllib.error.HTTPError as e:
+            busy = busy or e.code not in JSON_ABSENT_STATUSES
+            continue
+        except ValueError:
+            continue
+        miner_cache.set_capability(url, json_url)
+        return json_url
+    
+    if not busy:
+        miner_cache.set_capability(url, 'html')
+    return 'html'
+
+
+def parse_miner_json(content):
+    """Map a JSON status payload onto the same fields the HTML parser returns"""
+    payload = json.loads(content)
+    if not isinstance(payload, dict):
+        raise ValueError('Status payload is not a JSON object')
+    
+    data = {}
+    for field, keys in JSON_FIELDS.items():
+        value = next((payload[key] for key in keys if payload.get(key) is not None), None)
+        if value is None:
+            continue
+        if field == 'hashrate' and isinstance(value, (int, float)):
+            data['hashrate'] = float(value)
+        else:
+            # Strings like "45.2 KH/s" or "118 F" go through the page value parsers
+            JSON_PARSERS[field](str(value), data)
+    
+    if 'hashrate' not in data:
+        raise ValueError('Status payload has no hashrate')
+    return data
+
+
+class MinerCache:
+    """Bounded LRU cache of miner data keyed by URL.
+    
+    Fresh entries (younger than ttl) are hits. Entries up to stale_ttl past
+    that are served immediately while one background refresh runs. Older or
+    missing entries are fetched, and concurrent misses on the same URL share
+    a single in-flight fetch. Each URL's detected status endpoint (its JSON
+    URL, or 'html' when the page must be scraped) is kept alongside, in its
+    own LRU of the same size; 'html' expires after CAPABILITY_RECHECK.
+    """
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_DURATION, stale_ttl=CACHE_STALE_DURATION):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.entries = OrderedDict()  # url -> (data, fetched_at)
+        self.in_flight = {}           # url -> Future shared by concurrent misses
+        self.capabilities = OrderedDict()  # url -> (JSON status URL or 'html', detected_at)
+        self.lock = threading.Lock()
+        self.refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale_hits': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'errors': 0
+        }
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def peek(self, url):
+        """(data, fetched_at) regardless of age, or None - not counted in stats"""
+        with self.lock:
+            return self.entries.get(url)
+    
+    def put(self, url, data, fetched_at=None):
+        with self.lock:
+            self._store(url, data, fetched_at or time.time())
+    
+    def pop(self, url):
+        with self.lock:
+            return self.entries.pop(url, None)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.capabilities.clear()
+    
+    def forget(self, url):
+        """Drop a URL's data and detected status endpoint (miner removed)"""
+        with self.lock:
+            self.entries.pop(url, None)
+            self.capabilities.pop(url, None)
+    
+    def capability(self, url):
+        """JSON status URL, 'html', or None if the miner should be probed"""
+        with self.lock:
+            entry = self.capabilities.get(url)
+            if entry is None:
+                return None
+            capability, detected_at = entry
+            if capability == 'html' and time.time() - detected_at >= CAPABILITY_RECHECK:
+                del self.capabilities[url]
+                return None
+            self.capabilities.move_to_end(url)
+            return capability
+    
+    def set_capability(self, url, capability):
+        with self.lock:
+            self.capabilities[url] = (capability, time.time())
+            self.capabilities.move_to_end(url)
+            while len(self.capabilities) > self.max_entries:
+                self.capabilities.popitem(last=False)
+    
+    def forget_capability(self, url):
+        with self.lock:
+            self.capabilities.pop(url, None)
+    
+    def snapshot_stats(self):
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['stale_hits'] + self.stats['misses'] + self.stats['coalesced']
+            served = self.stats['hits'] + self.stats['stale_hits'] + self.stats['coalesced']
+            return dict(
+                self.stats,
+                entries=len(self.entries),
+                max_entries=self.max_entries,
+                capabilities=len(self.capabilities),
+                in_flight=len(self.in_flight),
+                hit_ratio=round(served / lookups, 3) if lookups else None
+            )
+    
+    def _store(self, url, data, fetched_at):
+        self.entries[url] = (data, fetched_at)
+        self.entries.move_to_end(url)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+    
+    def fetch(self, url, loader):
+        """Return (data, from_cache), calling loader(url) at most once at a time per URL"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(url)
+            age = now - entry[1] if entry else None
             
-            parser = NerdMinerHTMLParser()
-            parser.feed(html_content)
+            if entry and age < self.ttl:
+                self.entries.move_to_end(url)
+                self.stats['hits'] += 1
+                return entry[0], True
             
-            # Cache the result
-            miner_cache[url] = (parser.data, now)
-            return parser.data, False  # Fresh fetch
+            if entry and age < self.ttl + self.stale_ttl:
+                self.entries.move_to_end(url)
+                self.stats['stale_hits'] += 1
+                if url not in self.in_flight:
+                    self.in_flight[url] = Future()
+                    self.refresher.submit(self._load, url, loader)
+                return entry[0], True
             
+            future = self.in_flight.get(url)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                self.stats['misses'] += 1
+                future = self.in_flight[url] = Future()
+                leader = True
+        
+        if leader:
+            self._load(url, loader)
+        
+        try:
+            return future.result(), not leader
+        except Exception as e:
+            # Fall back to whatever we last had for this miner
+            entry = self.peek(url)
+            if entry is None:
+                raise
+            print(f"  ⚠ Using stale cache ({int(now - entry[1])}s old) for {urlparse(url).netloc} - Error: {str(e)[:80]}")
+            return entry[0], True
+    
+    def _load(self, url, loader):
+        with self.lock:
+            future = self.in_flight[url]
+        try:
+            data = loader(url)
+        except Exception as e:
+            with self.lock:
+                self.stats['errors'] += 1
+                del self.in_flight[url]
+            future.set_exception(e)
+            return
+        with self.lock:
+            self._store(url, data, time.time())
+            del self.in_flight[url]
+        future.set_result(data)
+
+
+miner_cache = MinerCache()
+
+
+def fetch_miner_with_cache(url):
+    """Fetch miner data with intelligent caching to reduce load"""
+    # Miners owned by the background poller are served from its snapshot only
+    polled = poller.lookup(url)
+    if polled is not None:
+        entry = miner_cache.peek(url)
+        if polled['status'] != 'online' or entry is None:
+            raise ConnectionError(polled.get('error') or 'Miner offline')
+        return entry[0], True
+    
+    try:
+        return miner_cache.fetch(url, lambda u: fetch_miner(u, timeout=PROXY_TIMEOUT))
     except Exception as e:
-        error_msg = str(e)[:80]
-        # Return stale cached data if available
-        if url in miner_cache:
-            cached_data, cached_time = miner_cache[url]
-            age = int(now - cached_time)
-            print(f"  ⚠ Using stale cache ({age}s old) for {url.split('/')[-1]} - Error: {error_msg}")
-            return cached_data, True  # Stale cache
-        print(f"  ✖ No cache available for {url.split('/')[-1]} - Error: {error_msg}")
+        print(f"  ✖ No cache available for {urlparse(url).netloc} - Error: {str(e)[:80]}")
         raise
 
 
+class EventBroker:
+    """Fan-out of live fleet updates to /events (Server-Sent Events) clients.
+    
+    Each message is encoded once and queued for every subscriber. A subscriber
+    that falls SSE_BACKLOG messages behind is disconnected; its browser
+    reconnects and starts again from a fresh snapshot.
+    """
+    def __init__(self, max_clients=SSE_MAX_CLIENTS, backlog=SSE_BACKLOG):
+        self.max_clients = max_clients
+        self.backlog = backlog
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.closed = False
+    
+    @staticmethod
+    def format(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n".encode()
+    
+    def subscribe(self):
+        """New subscriber queue, or None when the server is at its client limit"""
+        with self.lock:
+            if self.closed or len(self.subscribers) >= self.max_clients:
+                return None
+            subscriber = queue.Queue(maxsize=self.backlog)
+            self.subscribers.add(subscriber)
+            return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+    
+    def client_count(self):
+        with self.lock:
+            return len(self.subscribers)
+    
+    def publish(self, event, payload):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        if not subscribers:
+            return
+        message = self.format(event, payload)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                self.unsubscribe(subscriber)
+                self._disconnect(subscriber)
+    
+    def close(self):
+        """Disconnect every subscriber (server shutdown)"""
+        with self.lock:
+            self.closed = True
+            subscribers, self.subscribers = self.subscribers, set()
+        for subscriber in subscribers:
+            self._disconnect(subscriber)
+    
+    @staticmethod
+    def _disconnect(subscriber):
+        # Drop queued messages so the end-of-stream marker always fits
+        while True:
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                break
+        subscriber.put_nowait(None)
+
+
+events = EventBroker()
+
+
+class SampleRing:
+    """One miner's recent samples in fixed-size parallel arrays, oldest overwritten first"""
+    FIELDS = ('hashrate', 'shares', 'acceptedShares', 'bestDiff', 'temp', 'uptime')
+    
+    def __init__(self, capacity, gap_at):
+        self.name = None
+        self.timestamps = array('d', bytes(8 * capacity))  # epoch seconds
+        self.online = array('b', bytes(capacity))
+        self.values = [array('d', bytes(8 * capacity)) for _ in self.FIELDS]  # NaN = missing
+        self.start = 0
+        self.count = 0
+        self.gap_at = gap_at  # samples at or before this time may be missing
+    
+    def append(self, timestamp, data):
+        capacity = len(self.timestamps)
+        if self.count and timestamp < self.timestamps[(self.start + self.count - 1) % capacity]:
+            # Arrived out of order (a collector's backlog) - skipped, so windows reaching back to it go to SQLite
+            self.gap_at = max(self.gap_at, timestamp)
+            return
+        if self.count == capacity:
+            self.gap_at = max(self.gap_at, self.timestamps[self.start])
+            self.start = (self.start + 1) % capacity
+            self.count -= 1
+        
+        i = (self.start + self.count) % capacity
+        self.timestamps[i] = timestamp
+        self.online[i] = data.get('status') == 'online'
+        for column, field in zip(self.values, self.FIELDS):
+            value = data.get(field, 0)  # defaults as database.write_samples stores them
+            # Callers pass samples checked by parse_sample; anything else still must not raise after the DB write
+            column[i] = value if isinstance(value, (int, float)) and not isinstance(value, bool) else math.nan
+        self.count += 1
+    
+    def points(self, since, limit=None):
+        """History points (as get_miner_history returns raw rows) at or after since, oldest first"""
+        end = self.start + self.count
+        overflow = max(0, end - len(self.timestamps))
+        
+        def ordered(column, first=0):
+            return (column[self.start:end] + column[:overflow])[first:]
+        
+        timestamps = ordered(self.timestamps)
+        first = bisect.bisect_left(timestamps, since)
+        if limit is not None:
+            first = max(first, self.count - limit)
+        
+        return [{
+            'timestamp': _history_timestamp(timestamp),
+            'status': 'online' if online else 'offline',
+            'hashrate': None if hashrate != hashrate else hashrate,
+            'shares': None if shares != shares else int(shares),
+            'accepted_shares': None if accepted != accepted else int(accepted),
+            'best_difficulty': None if best != best else best,
+            'temperature': None if temp != temp else temp,
+            'uptime': None if uptime != uptime else int(uptime)
+        } for timestamp, online, hashrate, shares, accepted, best, temp, uptime in zip(
+            timestamps[first:], ordered(self.online, first), *(ordered(column, first) for column in self.values))]
+
+
+@functools.lru_cache(maxsize=4 * RECENT_HISTORY_POINTS)
+def _history_timestamp(epoch):
+    """Epoch seconds as a database timestamp - the same few thousand recur on every read"""
+    return time.strftime(database.TIMESTAMP_FORMAT, time.gmtime(epoch))
+
+
+class RecentHistory:
+    """The last RECENT_HISTORY_HOURS of every miner's samples, kept in memory.
+    
+    Every write path (poller, /save, /save/batch, /ingest) adds to it, so short
+    raw-resolution windows and the live charts' first page load are answered
+    without touching SQLite. load() fills it from the database at startup;
+    until then, and for any window a miner's ring can't fully cover (it
+    wrapped, or samples arrived out of order), callers fall back to SQLite.
+    """
+    def __init__(self, hours=RECENT_HISTORY_HOURS, capacity=RECENT_HISTORY_POINTS):
+        self.hours = hours
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.rings = {}  # miner_ip -> SampleRing
+        self.loaded_from = None  # epoch the rings are complete from, None until load()
+    
+    def load(self):
+        """Rebuild every ring from the last hours of stored history"""
+        started = time.time()
+        with self.lock:
+            self.rings = {}
+            self.loaded_from = int(started - self.hours * 3600)
+            samples = 0
+            for miner_ip, miner_name, history in database.iter_all_miners_history(self.hours, 'raw', sys.maxsize):
+                ring = self.rings[miner_ip] = SampleRing(self.capacity, self.loaded_from - 1)
+                ring.name = miner_name
+                for point in history:
+                    ring.append(calendar.timegm(time.strptime(point['timestamp'], database.TIMESTAMP_FORMAT)), {
+                        'status': point['status'],
+                        'hashrate': point['hashrate'],
+                        'shares': point['shares'],
+                        'acceptedShares': point['accepted_shares'],
+                        'bestDiff': point['best_difficulty'],
+                        'temp': point['temperature'],
+                        'uptime': point['uptime']
+                    })
+                samples += len(history)
+        print(f"🧠 Loaded {samples} recent samples for {len(self.rings)} miner(s) into memory "
+              f"in {time.time() - started:.2f}s")
+    
+    def add(self, miner_ip, miner_name, timestamp, data):
+        with self.lock:
+            ring = self.rings.get(miner_ip)
+            if ring is None:
+                # A miner new to this server - nothing older can be in SQLite either
+                ring = self.rings[miner_ip] = SampleRing(self.capacity, (self.loaded_from or 1) - 1)
+            ring.name = miner_name or ring.name
+            ring.append(int(timestamp), data)
+    
+    def add_samples(self, samples):
+        """Add (miner_ip, miner_name, timestamp string, data) samples as written by database.save_samples"""
+        for miner_ip, miner_name, timestamp, data in sorted(samples, key=lambda sample: sample[2]):
+            self.add(miner_ip, miner_name, calendar.timegm(time.strptime(timestamp, database.TIMESTAMP_FORMAT)), data)
+    
+    def forget(self, miner_ip):
+        with self.lock:
+            self.rings.pop(miner_ip, None)
+    
+    def sample_count(self):
+        with self.lock:
+            return sum(ring.count for ring in self.rings.values())
+    
+    def _window(self, hours, since):
+        """Start of a window the rings can answer, or None"""
+        if self.loaded_from is None or hours > self.hours:
+            return None
+        start = int(time.time() - hours * 3600)
+        return max(start, int(since)) if since else start
+    
+    def miner_history(self, miner_ip, hours, since=None):
+        """Raw points for one miner, or None when the window needs SQLite"""
+        start = self._window(hours, since)
+        if start is None:
+            return None
+        with self.lock:
+            ring = self.rings.get(miner_ip)
+            if ring is None:
+                return []
+            if ring.gap_at >= start:
+                return None
+            return ring.points(start)
+    
+    def all_history(self, hours, since=None):
+        """[(miner_ip, miner_name, points)] for every miner, or None when any of them needs SQLite"""
+        start = self._window(hours, since)
+        if start is None:
+            return None
+        with self.lock:
+            if any(ring.gap_at >= start for ring in self.rings.values()):
+                return None
+            history = [(miner_ip, ring.name, ring.points(start)) for miner_ip, ring in sorted(self.rings.items())]
+        return [(miner_ip, miner_name, points) for miner_ip, miner_name, points in history if points]
+    
+    def latest(self, points):
+        """{miner_ip: {'name', 'history'}} with each miner's last few points, for the live charts"""
+        with self.lock:
+            return {miner_ip: {'name': ring.name, 'history': ring.points(0, points)}
+                    for miner_ip, ring in self.rings.items() if ring.count}
+
+
+recent_history = RecentHistory()
+
+
+def _stats_moved(old, new):
+    """True when a poll found new shares, a new best difficulty or a real hashrate move"""
+    if old.get('acceptedShares') != new.get('acceptedShares') or old.get('bestDiff') != new.get('bestDiff'):
+        return True
+    old_rate, new_rate = old.get('hashrate') or 0, new.get('hashrate') or 0
+    return abs(new_rate - old_rate) > POLL_HASHRATE_CHANGE * max(old_rate, 1)
+
+
+class MinerPoller:
+    """Scrape every miner in the database concurrently on an adaptive schedule.
+    
+    Results land in miner_cache and miner history, so browser tabs only read
+    the latest snapshot instead of each driving their own scrape loop. Each
+    miner is polled on its own interval: faster while its stats keep
+    changing, slower once they settle and backed off exponentially (with
+    jitter) while it is unreachable.
+    """
+    def __init__(self, interval=POLL_INTERVAL, workers=POLL_WORKERS, timeout=POLL_TIMEOUT):
+        self.interval = interval
+        self.workers = workers
+        self.timeout = timeout
+        self.executor = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.in_flight = set()
+        self.cancelled = set()
+        self.snapshot = {}  # url -> {ip, name, status, updated, error}
+        self.schedule = {}  # ip -> {interval, next_poll, latency, failures, change_rate, polls}
+        self.miners = []
+        self.miners_loaded = 0
+    
+    def start(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='poller')
+        self.thread = threading.Thread(target=self._run, name='miner-poller', daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+        if self.thread:
+            self.thread.join()
+        if self.executor:
+            self.executor.shutdown(wait=False)
+    
+    def poll_now(self):
+        """Re-read the miner list and poll new miners immediately (e.g. after one is added)"""
+        self.miners_loaded = 0
+        self.wake.set()
+    
+    def forget(self, miner_ip):
+        SCRAPE_SECONDS.forget(miner_ip, 'ok')
+        SCRAPE_SECONDS.forget(miner_ip, 'error')
+        with self.lock:
+            self.snapshot.pop(miner_url(miner_ip), None)
+            self.schedule.pop(miner_ip, None)
+            # A scrape still in flight must not write the removed miner back
+            if miner_ip in self.in_flight:
+                self.cancelled.add(miner_ip)
+        miner_cache.forget(miner_url(miner_ip))
+    
+    def lookup(self, url):
+        """Latest poll result for a miner URL, or None if it is not polled"""
+        with self.lock:
+            entry = self.snapshot.get(url)
+            return dict(entry) if entry else None
+    
+    def entries(self):
+        """Latest poll result for every polled miner"""
+        with self.lock:
+            return [dict(entry) for entry in self.snapshot.values()]
+    
+    def schedule_state(self):
+        """Per-miner schedule for /schedule, soonest poll first"""
+        now = time.time()
+        with self.lock:
+            state = []
+            for miner_ip, sched in self.schedule.items():
+                entry = self.snapshot.get(miner_url(miner_ip), {})
+                state.append({
+                    'ip': miner_ip,
+                    'name': entry.get('name'),
+                    'status': entry.get('status'),
+                    'interval': round(sched['interval'], 1),
+                    'next_poll_in': round(max(0.0, sched['next_poll'] - now), 1),
+                    'in_flight': miner_ip in self.in_flight,
+                    'latency_ms': round(sched['latency'] * 1000) if sched['latency'] is not None else None,
+                    'failures': sched['failures'],
+                    'change_rate': round(sched['change_rate'], 2),
+                    'polls': sched['polls']
+                })
+        return sorted(state, key=lambda s: s['next_poll_in'])
+    
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                wait = self.sweep()
+            except Exception as e:
+                print(f"⚠️  Poller sweep error: {e}")
+                wait = self.interval
+            self.wake.wait(wait)
+            self.wake.clear()
+    
+    def sweep(self):
+        """Queue a scrape for every registered miner that is due; return seconds until the next one"""
+        now = time.time()
+        if now - self.miners_loaded >= self.interval:
+            self.miners = database.get_miners()
+            self.miners_loaded = now
+            
+            # Drop miners removed or pruned from the database
+            registered = {miner_ip for miner_ip, _ in self.miners}
+            with self.lock:
+                for url in [url for url, e in self.snapshot.items() if e['ip'] not in registered]:
+                    del self.snapshot[url]
+                for miner_ip in [ip for ip in self.schedule if ip not in registered]:
+                    del self.schedule[miner_ip]
+                    SCRAPE_SECONDS.forget(miner_ip, 'ok')
+                    SCRAPE_SECONDS.forget(miner_ip, 'error')
+        
+        next_due = self.miners_loaded + self.interval
+        for miner_ip, miner_name in self.miners:
+            with self.lock:
+                if miner_ip in self.in_flight:
+                    continue
+                sched = self.schedule.get(miner_ip)
+                if sched and sched['next_poll'] > now:
+                    next_due = min(next_due, sched['next_poll'])
+                    continue
+                self.in_flight.add(miner_ip)
+            self.executor.submit(self._poll_miner, miner_ip, miner_name)
+        
+        # Short floor so a burst of nearly-due miners is batched into one pass
+        return max(0.2, next_due - time.time())
+    
+    def reschedule(self, miner_ip, latency, online, changed):
+        """Fold one poll result into a miner's schedule and pick its next poll time"""
+        sched = self.schedule.setdefault(miner_ip, {
+            'interval': self.interval,
+            'next_poll': 0,
+            'latency': None,
+            'failures': 0,
+            'change_rate': 1.0,
+            'polls': 0
+        })
+        sched['polls'] += 1
+        
+        if not online:
+            sched['failures'] += 1
+            # Jitter keeps miners that dropped together (e.g. a power cut) from retrying in lockstep
+            backoff = self.interval * 2 ** min(sched['failures'] - 1, 16)
+            interval = min(POLL_BACKOFF_MAX, backoff * random.uniform(0.75, 1.25))
+        else:
+            sched['failures'] = 0
+            if sched['latency'] is None:
+                sched['latency'] = latency
+            else:
+                sched['latency'] += POLL_EWMA_ALPHA * (latency - sched['latency'])
+            sched['change_rate'] += POLL_EWMA_ALPHA * ((1.0 if changed else 0.0) - sched['change_rate'])
+            
+            # Volatile miners approach POLL_MIN_INTERVAL, settled ones POLL_STEADY_INTERVAL
+            interval = POLL_STEADY_INTERVAL - (POLL_STEADY_INTERVAL - POLL_MIN_INTERVAL) * sched['change_rate']
+            interval = max(interval, sched['latency'] * POLL_LATENCY_FACTOR)
+        
+        sched['interval'] = interval
+        sched['next_poll'] = time.time() + interval
+    
+    def _poll_miner(self, miner_ip, miner_name):
+        url = miner_url(miner_ip)
+        error = None
+        previous_data = miner_cache.peek(url)
+        started = time.time()
+        try:
+            data = fetch_miner(url, timeout=self.timeout)
+            miner_cache.put(url, data)
+            sample = dict(data, status='online')
+        except Exception as e:
+            error = str(e)[:80]
+            sample = {'status': 'offline'}
+        latency = time.time() - started
+        SCRAPE_SECONDS.observe(latency, miner_ip, 'error' if error else 'ok')
+        stats_changed = error is None and (previous_data is None or previous_data[0] != data)
+        volatile = error is None and (previous_data is None or _stats_moved(previous_data[0], data))
+        
+        with self.lock:
+            self.in_flight.discard(miner_ip)
+            if miner_ip in self.cancelled:
+                self.cancelled.discard(miner_ip)
+                return
+            self.reschedule(miner_ip, latency, error is None, volatile)
+            last = self.snapshot.get(url, {})
+            previous = last.get('status')
+            entry = self.snapshot[url] = {
+                'ip': miner_ip,
+                'name': miner_name,
+                'status': sample['status'],
+                'updated': time.time(),
+                'error': error
+            }
+        self.wake.set()  # Let the loop plan around this miner's new due time
+        
+        if previous != sample['status']:
+            if error:
+                print(f"  ✖ {miner_name or miner_ip} offline - Error: {error}")
+            else:
+                print(f"  ✔ {miner_name or miner_ip} online")
+        
+        # History first - a failing live update must never cost the sample
+        try:
+            database.save_miner_data(miner_ip, miner_name, sample)
+        except Exception as e:
+            print(f"Save Error for {miner_ip}: {str(e)}")
+        recent_history.add(miner_ip, miner_name, time.time(), sample)
+        if forwarder:
+            forwarder.add(miner_ip, miner_name, sample)
+        
+        # Push only miners whose name, status or stats changed
+        if stats_changed or previous != sample['status'] or last.get('name') != miner_name:
+            try:
+                events.publish('miner', fleet_entry(entry))
+            except Exception as e:
+                print(f"Event Error for {miner_ip}: {str(e)}")
+
+
+poller = MinerPoller()
+
+
+class RemoteMiners:
+    """Latest state of miners reported by collectors, shown next to the poller's own.
+    
+    Keys are database.remote_miner_ip(site, ip). Stats go into miner_cache under
+    the key's miner_url, so /fleet and /events read both kinds the same way.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries_by_ip = {}  # remote key -> {ip, name, status, updated, error, site}
+        self.batches = OrderedDict()  # recent batch id -> True once stored, False while being stored
+    
+    def claim_batch(self, batch_id):
+        """Claim a batch id for storing: None if claimed, True if already stored, False if in flight.
+        
+        Checking and claiming under one lock means concurrent resends of a
+        batch cannot both store it.
+        """
+        with self.lock:
+            state = self.batches.get(batch_id)
+            if state is None:
+                self.batches[batch_id] = False
+                while len(self.batches) > INGEST_RECENT_BATCHES:
+                    self.batches.popitem(last=False)
+            return state
+    
+    def finish_batch(self, batch_id, stored):
+        """Mark a claimed batch stored, so resends are acknowledged, or release it for a retry"""
+        with self.lock:
+            if stored:
+                self.batches[batch_id] = True
+                self.batches.move_to_end(batch_id)
+            else:
+                self.batches.pop(batch_id, None)
+    
+    def update(self, site, samples):
+        """Fold ingested (key, name, timestamp, data) samples in - the newest per miner wins"""
+        latest = {}
+        for sample in samples:
+            if sample[0] not in latest or sample[2] >= latest[sample[0]][2]:
+                latest[sample[0]] = sample
+        
+        for key, name, timestamp, data in latest.values():
+            updated = float(calendar.timegm(time.strptime(timestamp, database.TIMESTAMP_FORMAT)))
+            status = data.get('status', 'offline')
+            stats = {field: value for field, value in data.items() if field != 'status'}
+            url = miner_url(key)
+            with self.lock:
+                last = self.entries_by_ip.get(key, {})
+                if last.get('updated', 0) > updated:
+                    continue  # an older batch resent after a newer one
+                entry = self.entries_by_ip[key] = {
+                    'ip': key,
+                    'name': name,
+                    'status': status,
+                    'updated': updated,
+                    'error': None if status == 'online' else 'offline at collector',
+                    'site': site
+                }
+            previous = miner_cache.peek(url)
+            if status == 'online':
+                miner_cache.put(url, stats, updated)
+            if last.get('status') != status or last.get('name') != name or \
+                    (status == 'online' and (previous is None or previous[0] != stats)):
+                events.publish('miner', fleet_entry(entry))
+    
+    def entries(self):
+        with self.lock:
+            return [dict(entry) for entry in self.entries_by_ip.values()]
+    
+    def forget(self, key):
+        with self.lock:
+            self.entries_by_ip.pop(key, None)
+        miner_cache.pop(miner_url(key))
+
+
+remote_miners = RemoteMiners()
+
+
+class SampleForwarder:
+    """Collector side of federation: buffers polled samples and posts them to a central /ingest.
+    
+    Batches are gzipped NDJSON. Each batch is taken out of the buffer with its id
+    when it is first sent and resent unchanged until the central server answers,
+    so a resend after a timeout is recognised there. While it is unreachable
+    samples stay buffered (up to FORWARD_BUFFER_MAX, oldest dropped first) and
+    sends back off exponentially with jitter.
+    """
+    def __init__(self, central_url, site, token=None, interval=FORWARD_INTERVAL, batch_max=FORWARD_BATCH_MAX,
+                 buffer_max=FORWARD_BUFFER_MAX):
+        self.url = central_url.rstrip('/') + '/ingest'
+        self.site = site
+        self.token = token
+        self.interval = interval
+        self.batch_max = batch_max
+        self.buffer = deque(maxlen=buffer_max)  # sample dicts
+        self.outgoing = None  # (batch id, samples) being sent, until the central server answers
+        self.batch_count = 0
+        self.run_id = uuid.uuid4().hex[:12]  # batch ids stay unique across collector restarts
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.stats = {'sent': 0, 'batches': 0, 'dropped': 0, 'rejected': 0, 'failures': 0,
+                      'last_success': None, 'last_error': None}
+    
+    def add(self, miner_ip, miner_name, data, timestamp=None):
+        with self.lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.stats['dropped'] += 1
+            self.buffer.append({'ip': miner_ip, 'name': miner_name, 'data': data,
+                                'timestamp': timestamp or time.time()})
+            full = len(self.buffer) >= self.batch_max
+        if full:
+            self.wake.set()
+    
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='forwarder', daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Stop the loop and make one last attempt to send what is buffered"""
+        self.stopping.set()
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=FORWARD_TIMEOUT + 5)
+    
+    def snapshot_stats(self):
+        with self.lock:
+            buffered = len(self.buffer) + (len(self.outgoing[1]) if self.outgoing else 0)
+            return dict(self.stats, buffered=buffered, central=self.url, site=self.site)
+    
+    def _run(self):
+        failures = 0
+        while True:
+            delay = self.interval
+            if failures:
+                # Collectors that lost the central server together should not all reconnect at once
+                delay = min(FORWARD_BACKOFF_MAX, self.interval * 2 ** min(failures, 16)) * random.uniform(0.75, 1.25)
+            self.wake.wait(delay)
+            self.wake.clear()
+            stopping = self.stopping.is_set()
+            
+            while True:
+                with self.lock:
+                    if self.outgoing is None and self.buffer:
+                        self.batch_count += 1
+                        self.outgoing = (f'{self.run_id}-{self.batch_count}',
+                                         [self.buffer.popleft() for _ in range(min(self.batch_max, len(self.buffer)))])
+                    outgoing = self.outgoing
+                if outgoing is None:
+                    break
+                batch_id, batch = outgoing
+                try:
+                    rejected = self._send(batch_id, batch)
+                except Exception as e:
+                    failures += 1
+                    with self.lock:
+                        self.stats['failures'] += 1
+                        self.stats['last_error'] = str(e)[:200]
+                    if failures == 1:
+                        print(f"⚠️  Forwarding to {self.url} failed ({str(e)[:80]}) - buffering samples")
+                    break
+                
+                if failures:
+                    print(f"✔ Forwarding to {self.url} resumed")
+                failures = 0
+                with self.lock:
+                    self.outgoing = None
+                    if rejected is None:
+                        self.stats['rejected'] += len(batch)
+                    else:
+                        self.stats['sent'] += len(batch) - rejected
+                        self.stats['rejected'] += rejected
+                        self.stats['batches'] += 1
+                        self.stats['last_success'] = time.time()
+                if len(batch) < self.batch_max:
+                    break
+            
+            if stopping:
+                return
+    
+    def _send(self, batch_id, batch):
+        """POST one batch; the number of samples the central server skipped, or None if it refused the batch"""
+        body = gzip.compress('\n'.join(json.dumps(sample) for sample in batch).encode(), COMPRESS_LEVEL)
+        headers = {
+            'Content-Type': 'application/x-ndjson',
+            'Content-Encoding': 'gzip',
+            'X-Site': self.site,
+            'X-Batch-Id': batch_id,
+            'User-Agent': 'NerdMiner-Dashboard'
+        }
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        request = urllib.request.Request(self.url, data=body, headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=FORWARD_TIMEOUT) as response:
+                reply = response.read()
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500 and e.code not in (401, 403, 408, 429):
+                # The central server will never accept this batch - don't block everything behind it
+                print(f"✖ Central server rejected a batch of {len(batch)} samples: HTTP {e.code} {e.reason}")
+                return None
+            raise
+        
+        try:
+            rejected = json.loads(reply).get('rejected') or []
+        except (ValueError, AttributeError):
+            rejected = []
+        if rejected:
+            print(f"⚠️  Central server skipped {len(rejected)} of {len(batch)} samples: {rejected[0].get('error')}")
+        return len(rejected)
+
+
+# Set in collector mode (--forward-to)
+forwarder = None
+
+# Shared secret collectors must send to /ingest (--ingest-token), None = open like /save
+INGEST_TOKEN = None
+
+
+def _capability_source(url):
+    """'json', 'html' or None (not probed yet) for a miner URL"""
+    capability = miner_cache.capability(url)
+    if capability is None:
+        return None
+    return 'html' if capability == 'html' else 'json'
+
+
+def fingerprint_miner(content):
+    """Stats if a page (bytes) is a NerdMiner status page, else None"""
+    parser = NerdMinerHTMLParser()
+    parser.feed(content.decode('utf-8', errors='ignore'))
+    # A hashrate alone could be any miner's page - NerdMiner pages also carry shares or best diff
+    if 'hashrate' in parser.data and len(parser.data) >= 2:
+        return parser.data
+    return None
+
+
+class DiscoveryJob:
+    """Runs LAN sweeps one at a time in a background thread and registers what they find.
+    
+    Found miners are upserted into the miners table (existing names are kept)
+    and the poller is woken so they are scraped straight away.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopping = threading.Event()
+        self.state = {'running': False, 'network': None, 'ports': None, 'started': None, 'finished': None,
+                      'scanned': 0, 'total': 0, 'found': [], 'error': None}
+    
+    def status(self):
+        with self.lock:
+            return dict(self.state, found=list(self.state['found']))
+    
+    def start(self, network, ports=(80,)):
+        """Begin a sweep of network; False if one is already running"""
+        network = discovery.parse_network(network) if isinstance(network, str) else network
+        with self.lock:
+            if self.state['running']:
+                return False
+            self.state = {'running': True, 'network': str(network), 'ports': list(ports), 'started': time.time(),
+                          'finished': None, 'scanned': 0, 'total': len(discovery.hosts(network)) * len(ports),
+                          'found': [], 'error': None}
+        self.thread = threading.Thread(target=self._run, args=(network, ports), name='discovery', daemon=True)
+        self.thread.start()
+        return True
+    
+    def repeat(self, network, ports=(80,), interval=DISCOVERY_INTERVAL):
+        """Sweep network now and then every interval seconds until stop()"""
+        network = discovery.parse_network(network)
+        
+        def loop():
+            while not self.stopping.is_set():
+                if self.start(network, ports):
+                    self.thread.join()
+                self.stopping.wait(interval)
+        
+        threading.Thread(target=loop, name='discovery-schedule', daemon=True).start()
+    
+    def stop(self):
+        self.stopping.set()
+    
+    def _progress(self, address, port, data):
+        with self.lock:
+            self.state['scanned'] += 1
+    
+    def _run(self, network, ports):
+        try:
+            hits = discovery.discover(network, fingerprint_miner, ports, progress=self._progress)
+            known = {ip for ip, _ in database.get_miners()}
+            names = dict(database.get_miners(include_remote=True))  # pushed-only miners keep their names
+            found = []
+            for miner_ip, data in hits:
+                new = miner_ip not in known
+                if new:
+                    database.register_miner(miner_ip, names.get(miner_ip) or f'NerdMiner {miner_ip}')
+                    print(f"⛏️  Discovered miner at {miner_ip}")
+                found.append({'ip': miner_ip, 'new': new, 'data': data})
+            if any(hit['new'] for hit in found):
+                poller.poll_now()
+            with self.lock:
+                self.state['found'] = found
+        except Exception as e:
+            print(f"Discovery Error: {str(e)}")
+            with self.lock:
+                self.state['error'] = str(e)
+        finally:
+            with self.lock:
+                self.state['running'] = False
+                self.state['finished'] = time.time()
+
+
+discovery_job = DiscoveryJob()
+
+
+def fleet_entry(entry, now=None):
+    """One miner as /fleet and /events report it, from its poller snapshot entry"""
+    now = now or time.time()
+    url = miner_url(entry['ip'])
+    cached = miner_cache.peek(url)
+    data, fetched = cached if cached else ({}, None)
+    return {
+        'ip': entry['ip'],
+        'name': entry['name'],
+        'status': entry['status'],
+        'data': data,
+        'updated': entry['updated'],
+        'age': round(now - fetched, 1) if fetched else None,
+        'cached': entry['status'] != 'online' and cached is not None,
+        'error': entry['error'],
+        'source': 'collector' if entry.get('site') else _capability_source(url),
+        'site': entry.get('site')
+    }
+
+
+def fleet_snapshot():
+    """Build the /fleet payload and its ETag from the poller snapshot.
+    
+    The ETag covers names, status and stats only, so a fleet whose data has not
+    changed since the client's last read costs a 304 even though ages move on.
+    """
+    now = time.time()
+    miners = {}
+    for entry in sorted(poller.entries() + remote_miners.entries(), key=lambda e: e['ip']):
+        miners[entry['ip']] = fleet_entry(entry, now)
+        del miners[entry['ip']]['ip']
+    
+    fingerprint = json.dumps(
+        [(ip, m['name'], m['status'], m['data']) for ip, m in miners.items()],
+        sort_keys=True
+    )
+    etag = '"' + hashlib.sha1(fingerprint.encode()).hexdigest()[:16] + '"'
+    return {'generated': now, 'miners': miners}, etag
+
+
+def pool_api_url(pool, wallet):
+    """Stats URL for a wallet on a pool; an explicit http(s):// pool is used as-is"""
+    wallet = quote(wallet, safe='')
+    if pool.startswith(('http://', 'https://')):
+        # Self-hosted or local stand-in pool running public-pool's API
+        return f"{pool.rstrip('/')}/api/client/{wallet}"
+    if 'public-pool.io' in pool:
+        # public-pool.io format
+        return f'https://{pool}/api/client/{wallet}'
+    if 'nerdminer' in pool.lower():
+        # pool.nerdminers.org format (might use different API path)
+        if ':' not in pool:
+            pool = pool + ':3333'  # Default stratum port
+        return f'http://{pool}/api/stats/{wallet}'
+    # Generic format
+    return f'https://{pool}/api/client/{wallet}'
+
+
+class PoolClient:
+    """Fetches pool API responses over keep-alive connections.
+    
+    Idle connections are kept per (scheme, host) so repeated lookups skip the
+    TCP and TLS handshakes. Responses are cached per URL (one per pool and
+    wallet) in a MinerCache, which also serves the last good response when
+    the pool is down.
+    """
+    def __init__(self, ttl=POOL_CACHE_TTL, stale_ttl=POOL_STALE_DURATION, timeout=POOL_TIMEOUT,
+                 max_idle=POOL_IDLE_CONNECTIONS):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.cache = MinerCache(max_entries=256, ttl=ttl, stale_ttl=stale_ttl)
+        self.idle = {}  # (scheme, netloc) -> [HTTPConnection, ...]
+        self.lock = threading.Lock()
+        self.connections_opened = 0
+    
+    def fetch(self, pool_url):
+        """Return (body bytes, from_cache)"""
+        return self.cache.fetch(pool_url, self._request)
+    
+    def _acquire(self, key):
+        with self.lock:
+            idle = self.idle.get(key)
+            if idle:
+                return idle.pop(), True
+            self.connections_opened += 1
+        scheme, netloc = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout), False
+        return http.client.HTTPConnection(netloc, timeout=self.timeout), False
+    
+    def _release(self, key, conn):
+        with self.lock:
+            idle = self.idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+    
+    def _request(self, pool_url):
+        parsed = urlparse(pool_url)
+        key = (parsed.scheme, parsed.netloc)
+        path = parsed.path + ('?' + parsed.query if parsed.query else '')
+        
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                conn.request('GET', path, headers={'User-Agent': 'NerdMinerStatus/1.0'})
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, ConnectionError) as e:
+                conn.close()
+                if reused:
+                    # The pool closed an idle keep-alive connection - retry on a fresh one
+                    continue
+                raise urllib.error.URLError(e)
+            except Exception:
+                conn.close()
+                raise
+            
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            
+            if response.status != 200:
+                raise urllib.error.HTTPError(pool_url, response.status, response.reason,
+                                             response.headers, None)
+            return body
+    
+    def stats(self):
+        with self.lock:
+            idle = sum(len(conns) for conns in self.idle.values())
+            opened = self.connections_opened
+        return dict(self.cache.snapshot_stats(), connections_opened=opened, idle_connections=idle)
+    
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+pool_client = PoolClient()
+analytics_cache = MinerCache(max_entries=32, ttl=ANALYTICS_CACHE_TTL, stale_ttl=ANALYTICS_STALE_DURATION)
+
+
+def _cache_metric(field):
+    return lambda: [((name,), cache.snapshot_stats()[field])
+                    for name, cache in (('miners', miner_cache), ('pool', pool_client.cache),
+                                        ('analytics', analytics_cache))]
+
+
+def _cache_lookups():
+    lookups = []
+    for name, cache in (('miners', miner_cache), ('pool', pool_client.cache), ('analytics', analytics_cache)):
+        stats = cache.snapshot_stats()
+        for result in ('hits', 'stale_hits', 'misses', 'coalesced'):
+            lookups.append(((name, result), stats[result]))
+    return lookups
+
+
+def _fleet_hashrate():
+    total = 0.0
+    for entry in poller.entries() + remote_miners.entries():
+        cached = miner_cache.peek(miner_url(entry['ip']))
+        if entry['status'] == 'online' and cached:
+            total += cached[0].get('hashrate') or 0
+    return total
+
+
+def _fleet_miners():
+    counts = {'online': 0, 'offline': 0}
+    for entry in poller.entries() + remote_miners.entries():
+        counts[entry['status']] = counts.get(entry['status'], 0) + 1
+    return [((status,), count) for status, count in counts.items()]
+
+
+# Read when /metrics is scraped, so they cost nothing between scrapes
+metrics.gauge('nerdminer_fleet_hashrate', 'Current fleet hashrate in H/s', _fleet_hashrate)
+metrics.gauge('nerdminer_fleet_miners', 'Polled miners by status', _fleet_miners, ('status',))
+metrics.gauge('nerdminer_cache_lookups_total', 'Cache lookups by result', _cache_lookups,
+              ('cache', 'result'), kind='counter')
+metrics.gauge('nerdminer_cache_hit_ratio', 'Share of lookups served without waiting on upstream',
+              _cache_metric('hit_ratio'), ('cache',))
+metrics.gauge('nerdminer_cache_entries', 'Entries held in each cache', _cache_metric('entries'), ('cache',))
+metrics.gauge('nerdminer_sse_clients', 'Open /events streams', lambda: events.client_count())
+metrics.gauge('nerdminer_recent_samples', 'Samples held in the in-memory recent history',
+              lambda: recent_history.sample_count())
+metrics.gauge('nerdminer_remote_miners', 'Miners reported by collectors', lambda: len(remote_miners.entries()))
+metrics.gauge('nerdminer_forward_buffered', 'Samples waiting to be sent to the central server',
+              lambda: forwarder.snapshot_stats()['buffered'] if forwarder else None)
+metrics.gauge('nerdminer_forward_samples_total', 'Samples sent to the central server, by result',
+              lambda: [((result,), forwarder.snapshot_stats()[result]) for result in ('sent', 'dropped', 'rejected')]
+              if forwarder else [], ('result',), kind='counter')
+
+# Routes reported by /metrics - anything else counts as a static file
+METRIC_ROUTES = ('/fleet', '/events', '/schedule', '/pool-api', '/proxy', '/history/miner', '/history/total', '/history/recent',
+                 '/history/all', '/export', '/analytics', '/discover', '/forward/stats', '/ingest', '/db/stats', '/cache/stats', '/metrics', '/save', '/save/batch',
+                 '/miners', '/miners/remove')
+
+
+def metric_route(path):
+    path = urlparse(path).path
+    return path if path in METRIC_ROUTES else 'static'
+
+
+def parse_history_params(params):
+    """hours, resolution, max_points and since query parameters shared by /history/*"""
+    hours = int(params.get('hours', [24])[0])
+    resolution = params.get('resolution', [None])[0]
+    max_points = params.get('max_points', [None])[0]
+    max_points = int(max_points) if max_points else None
+    if hours <= 0 or (max_points is not None and max_points <= 0):
+        raise ValueError("'hours' and 'max_points' must be positive")
+    
+    # Cursor for incremental sync: epoch seconds or the timestamp of the last point the client has
+    since = parse_time_param(params, 'since')
+    if since is not None and since > time.time() + SAMPLE_MAX_SKEW:
+        raise ValueError("'since' must not be in the future")
+    return hours, resolution, max_points, since
+
+
+def parse_time_param(params, name):
+    """Epoch seconds or a UTC time in one of EXPORT_TIME_FORMATS -> epoch seconds (None if absent)"""
+    value = params.get(name, [None])[0]
+    if not value:
+        return None
+    try:
+        epoch = float(value)
+    except ValueError:
+        for time_format in EXPORT_TIME_FORMATS:
+            try:
+                epoch = calendar.timegm(time.strptime(value, time_format))
+                break
+            except ValueError:
+                pass
+        else:
+            raise ValueError(f"'{name}' must be epoch seconds or a UTC time like '2024-01-31 18:00:00'")
+    if not 0 < epoch < float('inf'):
+        raise ValueError(f"'{name}' is out of range")
+    return epoch
+
+
+def parse_sample(sample, now):
+    """Validate one /save/batch sample -> (ip, name, timestamp, data); raises ValueError"""
+    if not isinstance(sample, dict):
+        raise ValueError('sample must be an object')
+    ip = sample.get('ip')
+    name = sample.get('name')
+    data = sample.get('data', {})
+    if not isinstance(ip, str) or not ip.strip() or len(ip) > 255:
+        raise ValueError("'ip' must be a non-empty string")
+    if name is not None and (not isinstance(name, str) or len(name) > 255):
+        raise ValueError("'name' must be a string")
+    if not isinstance(data, dict):
+        raise ValueError("'data' must be an object")
+    if data.get('status', 'offline') not in ('online', 'offline'):
+        raise ValueError("'data.status' must be 'online' or 'offline'")
+    for field in SAMPLE_NUMERIC_FIELDS:
+        value = data.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                  or value != value or value in (float('inf'), float('-inf'))):
+            raise ValueError(f"'data.{field}' must be a number")
+    
+    # Optional sample time (epoch seconds) for clients that buffer before sending
+    timestamp = sample.get('timestamp')
+    if timestamp is None:
+        timestamp = now
+    elif isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)) or \
+            not 0 < timestamp <= now + SAMPLE_MAX_SKEW:
+        raise ValueError("'timestamp' must be epoch seconds, not in the future")
+    return ip.strip(), name, time.strftime(database.TIMESTAMP_FORMAT, time.gmtime(timestamp)), data
+
+
+def parse_sample_batch(body, content_type, skip_invalid=False):
+    """A JSON array or NDJSON (one object per line) body -> validated samples.
+    
+    The first invalid sample raises ValueError, unless skip_invalid: then
+    (samples, rejected) is returned, rejected being [{'index', 'error'}, ...].
+    """
+    text = body.decode('utf-8')
+    invalid = object()
+    if 'ndjson' in content_type or not text.lstrip().startswith('['):
+        lines = [line for line in text.splitlines() if line.strip()]
+        items = []
+        for index, line in enumerate(lines):
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                if not skip_invalid:
+                    raise ValueError(f'sample {index}: invalid JSON')
+                items.append(invalid)
+    else:
+        items = json.loads(text)
+    
+    if not items:
+        raise ValueError('no samples')
+    if len(items) > SAVE_BATCH_MAX:
+        raise ValueError(f'at most {SAVE_BATCH_MAX} samples per batch')
+    
+    now = time.time()
+    samples = []
+    rejected = []
+    for index, item in enumerate(items):
+        try:
+            if item is invalid:
+                raise ValueError('invalid JSON')
+            samples.append(parse_sample(item, now))
+        except ValueError as e:
+            if not skip_invalid:
+                raise ValueError(f'sample {index}: {e}')
+            rejected.append({'index': index, 'error': str(e)})
+    return (samples, rejected) if skip_invalid else samples
+
+
+def negotiate_encoding(accept_encoding, offered=None):
+    """Best of the offered encodings (default 'br', 'gzip') allowed by an Accept-Encoding header, or None"""
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    if offered is None:
+        offered = ('br', 'gzip') if brotli else ('gzip',)
+    for encoding in offered:
+        if weights.get(encoding, weights.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding, level=COMPRESS_LEVEL):
+    """body encoded with 'br' or 'gzip' (level 1-9)"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(11, level + 2))
+    return gzip.compress(body, level, mtime=0)
+
+
+class StaticFiles:
+    """Dashboard files held in memory with validators and pre-compressed copies.
+
+    A file is re-read when its size or mtime changes. HTML pages get their local
+    script, stylesheet and icon references fingerprinted (?v=<hash>) so browsers
+    can keep those assets for a year and still pick up a new version at once.
+    """
+    REFERENCE = re.compile(rb'\b(src|href)="([\w./-]+\.(?:js|css|svg|png|ico))"')
+    
+    def __init__(self, max_bytes=STATIC_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = {}
+        self.lock = threading.Lock()
+    
+    def get(self, path):
+        """Cached entry for a file, or None if it is missing or too large to cache"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if stat.st_size > self.max_bytes:
+            return None
+        
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry and entry['key'] == key and all(
+                (self.get(dependency) or {}).get('etag') == etag for dependency, etag in entry['dependencies']):
+            return entry
+        
+        entry = self._load(path, key, stat.st_mtime)
+        with self.lock:
+            self.entries[path] = entry
+        return entry
+    
+    def _load(self, path, key, mtime):
+        with open(path, 'rb') as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        dependencies = []
+        if content_type == 'text/html':
+            body = self._fingerprint(path, body, dependencies)
+        
+        digest = hashlib.sha1(body).hexdigest()[:16]
+        bodies = {None: body}
+        if len(body) >= COMPRESS_MIN_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+            for encoding in (('br', 'gzip') if brotli else ('gzip',)):
+                encoded = compress(body, encoding, level=9)
+                if len(encoded) < len(body):
+                    bodies[encoding] = encoded
+        
+        return {
+            'key': key,
+            'type': content_type,
+            'digest': digest,
+            'etag': f'"{digest}"',
+            'version': digest[:10],
+            'last_modified': email.utils.formatdate(mtime, usegmt=True),
+            'mtime': int(mtime),
+            'bodies': bodies,
+            'dependencies': dependencies
+        }
+    
+    def _fingerprint(self, path, body, dependencies):
+        directory = os.path.dirname(path)
+        
+        def versioned(match):
+            reference = match.group(2).decode()
+            target = os.path.normpath(os.path.join(directory, reference))
+            entry = self.get(target) if os.path.dirname(target).startswith(directory) else None
+            if entry is None:
+                return match.group(0)
+            dependencies.append((target, entry['etag']))
+            return b'%s="%s?v=%s"' % (match.group(1), match.group(2), entry['version'].encode())
+        
+        return self.REFERENCE.sub(versioned, body)
+
+
+static_files = StaticFiles()
+
+
+class PooledHTTPServer(http.server.HTTPServer):
+    """HTTP server that handles each connection on a bounded pool of worker threads.
+    
+    At most `backlog` accepted connections wait for a free worker; beyond
+    that a connection is answered 503 straight away and closed, so a flood
+    cannot pile up sockets and memory behind slow handlers.
+    """
+    request_queue_size = 128
+    
+    def __init__(self, server_address, handler_class, workers=HTTP_WORKERS, backlog=HTTP_BACKLOG):
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http')
+        self.slots = threading.BoundedSemaphore(workers + backlog)
+    
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            self._reject(request)
+            return
+        try:
+            self.executor.submit(self._process_request_worker, request, client_address)
+        except RuntimeError:
+            # Executor already shut down
+            self.slots.release()
+            self.shutdown_request(request)
+    
+    def _reject(self, request):
+        HTTP_REJECTED.inc()
+        try:
+            # Never let a client that doesn't read stall the accept loop
+            request.setblocking(False)
+            request.send(b'HTTP/1.1 503 Service Unavailable\r\nRetry-After: 1\r\n'
+                         b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+        except OSError:
+            pass
+        self.shutdown_request(request)
+    
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+    
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
 class CORSRequestHandler(http.server.SimpleHTTPRequestHandler):
+    def handle_one_request(self):
+        self.command = None
+        self.cache_control = None  # set by handlers whose responses browsers may keep
+        self.compressor = None
+        started = time.perf_counter()
+        super().handle_one_request()
+        # Streams stay open for as long as the tab does - only their count is interesting
+        if self.command and self.path != '/events':
+            HTTP_SECONDS.observe(time.perf_counter() - started, metric_route(self.path))
+    
+    def log_request(self, code='-', size='-'):
+        if isinstance(code, int):
+            HTTP_REQUESTS.inc(metric_route(getattr(self, 'path', '')), str(int(code)))
+        super().log_request(code, size)
+    
     def end_headers(self):
         # Enable CORS
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
+        self.send_header('Access-Control-Expose-Headers', 'ETag, X-Cache, X-Window-Start')
+        # Live data is never cached; static files set their own policy in send_head
+        self.send_header('Cache-Control', self.cache_control or 'no-store, no-cache, must-revalidate')
         super().end_headers()
 
     def do_OPTIONS(self):
         self.send_response(200)
         self.end_headers()
     
+    def _send_json(self, payload, status=200, headers=None, etag=None):
+        """Send a JSON response, ignoring clients that already hung up.
+        
+        etag (strong, quoted) is suffixed with the content encoding like static
+        files', so gzip and identity bodies never share a validator; a matching
+        If-None-Match gets a 304.
+        """
+        body = json.dumps(payload).encode()
+        encoding = self._accepted_encoding() if len(body) >= COMPRESS_MIN_BYTES else None
+        if etag:
+            etag = f'{etag[:-1]}-{encoding}"' if encoding else etag
+            headers = dict(headers or {}, ETag=etag)
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Vary', 'Accept-Encoding')
+                self.end_headers()
+                return
+        if encoding:
+            body = compress(body, encoding)
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Vary', 'Accept-Encoding')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+        except (ConnectionAbortedError, BrokenPipeError):
+            pass
+    
+    def _read_body(self, limit):
+        """Request body, gunzipped when sent with Content-Encoding: gzip.
+        
+        Raises OverflowError past limit bytes (before or after decompression).
+        """
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > limit:
+            raise OverflowError(f'Body larger than {limit} bytes')
+        body = self.rfile.read(length)
+        if self.headers.get('Content-Encoding', '').lower() == 'gzip':
+            decompressor = zlib.decompressobj(31)
+            body = decompressor.decompress(body, limit)
+            if decompressor.unconsumed_tail:
+                raise OverflowError(f'Body larger than {limit} bytes')
+        return body
+    
+    def _accepted_encoding(self):
+        return negotiate_encoding(self.headers.get('Accept-Encoding'))
+    
+    def _start_chunked(self, content_type, headers=None):
+        """Begin a chunked HTTP/1.1 response (gzipped if accepted); the connection closes when it ends"""
+        self.protocol_version = 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.send_header('Vary', 'Accept-Encoding')
+        if negotiate_encoding(self.headers.get('Accept-Encoding'), ('gzip',)):
+            self.compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+    
+    def _write_chunk(self, data):
+        if self.compressor and data:
+            data = self.compressor.compress(data)
+        if data:
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+    
+    def _end_chunked(self):
+        if self.compressor:
+            data = self.compressor.flush()
+            self.compressor = None
+            self._write_chunk(data)
+        self.wfile.write(b'0\r\n\r\n')
+    
+    def send_head(self):
+        """Serve dashboard files from memory with ETag/Last-Modified revalidation and compression"""
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and urlparse(self.path).path.endswith('/'):
+            path = os.path.join(path, 'index.html')
+        entry = static_files.get(path) if os.path.isfile(path) else None
+        if entry is None:
+            return super().send_head()  # directory redirects, listings, 404s and very large files
+        
+        version = parse_qs(urlparse(self.path).query).get('v', [None])[0]
+        if version == entry['version']:
+            self.cache_control = f'public, max-age={STATIC_IMMUTABLE_AGE}, immutable'
+        else:
+            self.cache_control = 'no-cache'  # revalidate every time - a 304 costs a few bytes
+        
+        encoding = negotiate_encoding(self.headers.get('Accept-Encoding'),
+                                      [name for name in entry['bodies'] if name])
+        etag = entry['etag'] if encoding is None else f'"{entry["digest"]}-{encoding}"'
+        
+        if self._not_modified(entry):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', entry['last_modified'])
+            self.end_headers()
+            return None
+        
+        body = entry['bodies'][encoding]
+        self.send_response(200)
+        self.send_header('Content-Type', entry['type'])
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', entry['last_modified'])
+        if len(entry['bodies']) > 1:
+            self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        return io.BytesIO(body)
+    
+    def _not_modified(self, entry):
+        """True if the request's If-None-Match / If-Modified-Since validators still hold"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            for tag in if_none_match.split(','):
+                tag = tag.strip()
+                if tag.startswith('W/'):
+                    tag = tag[2:]
+                if tag == '*' or tag.strip('"').split('-')[0] == entry['digest']:
+                    return True
+            return False
+        
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return email.utils.parsedate_to_datetime(if_modified_since).timestamp() >= entry['mtime']
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+        return False
+    
+    def _stream_events(self):
+        """Serve /events: a fleet snapshot, then a 'miner' event per changed miner"""
+        subscriber = events.subscribe()
+        if subscriber is None:
+            # Streams hold worker threads - past the limit browsers fall back to /fleet polling
+            self.send_response(503)
+            self.send_header('Retry-After', str(SSE_RETRY_MS // 1000))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('X-Accel-Buffering', 'no')
+            self.end_headers()
+            
+            # Subscribed first, so no update between the snapshot and the stream is lost
+            payload, _ = fleet_snapshot()
+            self.wfile.write(b'retry: %d\n\n' % SSE_RETRY_MS + events.format('fleet', payload))
+            
+            while True:
+                try:
+                    message = subscriber.get(timeout=SSE_KEEPALIVE)
+                except queue.Empty:
+                    message = b': keepalive\n\n'
+                if message is None:
+                    break  # Dropped as too slow, or the server is stopping
+                self.wfile.write(message)
+        except (ConnectionAbortedError, BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            events.unsubscribe(subscriber)
+    
     def do_GET(self):
+        # Live updates pushed as Server-Sent Events
+        if self.path == '/events':
+            self._stream_events()
+            return
+        
+        # Fleet snapshot - every polled miner's latest stats in one response
+        if self.path == '/fleet' or self.path.startswith('/fleet?'):
+            try:
+                payload, etag = fleet_snapshot()
+                self._send_json(payload, etag=etag)
+            except Exception as e:
+                print(f"Fleet Error: {str(e)}")
+                self.send_error(500, str(e))
+            return
+        
         # Pool API proxy endpoint
         if self.path.startswith('/pool-api?'):
             parsed = urlparse(self.path)
@@ -171,34 +2097,18 @@ class CORSRequestHandler(http.server.SimpleHTTPRequestHandler):
                 return
             
             wallet = params['wallet'][0]
-            pool = params.get('pool', ['public-pool.io:40557'])[0]
-            
-            try:
-                # Construct pool API URL based on pool type
-                if 'public-pool.io' in pool:
-                    # public-pool.io format
-                    pool_url = f'https://{pool}/api/client/{wallet}'
-                elif 'nerdminer' in pool.lower():
-                    # pool.nerdminers.org format (might use different API path)
-                    # Try common endpoints
-                    if ':' not in pool:
-                        pool = pool + ':3333'  # Default stratum port
-                    pool_url = f'http://{pool}/api/stats/{wallet}'
-                else:
-                    # Generic format
-                    pool_url = f'https://{pool}/api/client/{wallet}'
-                    
-                print(f"Fetching pool data from: {pool_url}")
-                
-                req = urllib.request.Request(pool_url)
-                req.add_header('User-Agent', 'NerdMinerStatus/1.0')
+            pool = params.get('pool', [DEFAULT_POOL])[0]
+            
+            try:
+                pool_url = pool_api_url(pool, wallet)
+                data, from_cache = pool_client.fetch(pool_url)
+                if not from_cache:
+                    print(f"Fetched pool data from: {pool_url}")
                 
-                with urllib.request.urlopen(req, timeout=18) as response:
-                    data = response.read()
-                    
                 try:
                     self.send_response(200)
                     self.send_header('Content-type', 'application/json')
+                    self.send_header('X-Cache', 'HIT' if from_cache else 'MISS')
                     self.end_headers()
                     self.wfile.write(data)
                 except (ConnectionAbortedError, BrokenPipeError):
@@ -277,24 +2187,49 @@ class CORSRequestHandler(http.server.SimpleHTTPRequestHandler):
                     pass
             return
         
+        # Each miner's last few samples from memory, so live charts start populated after a reload
+        if self.path == '/history/recent' or self.path.startswith('/history/recent?'):
+            params = parse_qs(urlparse(self.path).query)
+            
+            try:
+                points = int(params.get('points', [RECENT_POINTS_DEFAULT])[0])
+                if not 0 < points <= RECENT_HISTORY_POINTS:
+                    raise ValueError(f"'points' must be between 1 and {RECENT_HISTORY_POINTS}")
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            
+            self._send_json(recent_history.latest(points))
+            return
+        
         # History endpoint - get miner history
         if self.path.startswith('/history/miner?'):
             parsed = urlparse(self.path)
             params = parse_qs(parsed.query)
             
             miner_ip = params.get('ip', [None])[0]
-            hours = int(params.get('hours', [24])[0])
             
             if not miner_ip:
                 self.send_error(400, "Missing 'ip' parameter")
                 return
             
             try:
-                history = database.get_miner_history(miner_ip, hours)
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(history).encode())
+                hours, resolution, max_points, since = parse_history_params(params)
+                picked = database.pick_resolution(hours, resolution, max_points)
+                # Clients trimming cached points to the window use the same start the query does
+                window = {'X-Window-Start': database.history_window_start(hours, picked)}
+                
+                # Raw-resolution windows the in-memory rings cover are served from them
+                history = None
+                if picked == 'raw':
+                    history = recent_history.miner_history(miner_ip, hours, since)
+                if history is None:
+                    history = database.get_miner_history(miner_ip, hours, resolution, max_points, since)
+                else:
+                    history = database.downsample(history, max_points or database.DEFAULT_MAX_POINTS)
+                self._send_json(history, headers=window)
+            except ValueError as e:
+                self.send_error(400, str(e))
             except Exception as e:
                 print(f"History Error: {str(e)}")
                 self.send_error(500, str(e))
@@ -304,49 +2239,180 @@ class CORSRequestHandler(http.server.SimpleHTTPRequestHandler):
         if self.path.startswith('/history/all'):
             parsed = urlparse(self.path)
             params = parse_qs(parsed.query)
-            hours = int(params.get('hours', [24])[0])
             
             try:
-                history = database.get_all_miners_history(hours)
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(history).encode())
+                hours, resolution, max_points, since = parse_history_params(params)
+                picked = database.pick_resolution(hours, resolution, max_points)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            
+            miners_history = None
+            if picked == 'raw':
+                recent = recent_history.all_history(hours, since)
+                if recent is not None:
+                    limit = max_points or database.DEFAULT_MAX_POINTS
+                    miners_history = ((miner_ip, miner_name, database.downsample(points, limit))
+                                      for miner_ip, miner_name, points in recent)
+            
+            # Stream one miner at a time instead of building the whole dict
+            try:
+                self._start_chunked('application/json')
+                separator = b'{'
+                if miners_history is None:
+                    miners_history = database.iter_all_miners_history(hours, resolution, max_points, since)
+                for miner_ip, miner_name, history in miners_history:
+                    entry = json.dumps({'name': miner_name, 'history': history})
+                    self._write_chunk(separator + json.dumps(miner_ip).encode() + b': ' + entry.encode())
+                    separator = b', '
+                self._write_chunk(b'{}' if separator == b'{' else b'}')
+                self._end_chunked()
+            except (ConnectionAbortedError, BrokenPipeError, ConnectionResetError):
+                pass
             except Exception as e:
+                # Headers are already sent; a truncated body tells the client it failed
                 print(f"History Error: {str(e)}")
-                self.send_error(500, str(e))
+            return
+        
+        # Raw history as CSV or NDJSON for offline analysis, streamed straight off a database cursor
+        if self.path == '/export' or self.path.startswith('/export?'):
+            params = parse_qs(urlparse(self.path).query)
+            
+            try:
+                export_format = params.get('format', ['csv'])[0]
+                if export_format not in ('csv', 'ndjson'):
+                    raise ValueError("'format' must be 'csv' or 'ndjson'")
+                fields = [field for value in params.get('fields', []) for field in value.split(',') if field]
+                unknown = [field for field in fields if field not in database.HISTORY_FIELDS]
+                if unknown:
+                    raise ValueError(f"Unknown field(s) {', '.join(unknown)} - "
+                                     f"choose from {', '.join(database.HISTORY_FIELDS)}")
+                fields = fields or list(database.HISTORY_FIELDS)
+                miners = [miner_ip for value in params.get('miner', []) for miner_ip in value.split(',') if miner_ip]
+                start = parse_time_param(params, 'from')
+                end = parse_time_param(params, 'to')
+                if start is not None and end is not None and start >= end:
+                    raise ValueError("'from' must be before 'to'")
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            
+            columns = [database.HISTORY_FIELDS.index(field) for field in fields]
+            filename = f"nerdminer-history-{time.strftime('%Y%m%d-%H%M%S')}.{export_format}"
+            content_type = 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson'
+            
+            try:
+                self._start_chunked(content_type, {'Content-Disposition': f'attachment; filename="{filename}"'})
+                buffer = io.StringIO()
+                writer = csv.writer(buffer, lineterminator='\n')
+                if export_format == 'csv':
+                    writer.writerow(fields)
+                    self._write_chunk(buffer.getvalue().encode())  # first bytes go out before the query runs
+                    buffer.seek(0)
+                    buffer.truncate()
+                
+                for row in database.iter_history_rows(miners or None, start, end):
+                    values = [row[i] for i in columns]
+                    if export_format == 'csv':
+                        writer.writerow(values)
+                    else:
+                        buffer.write(json.dumps(dict(zip(fields, values))) + '\n')
+                    if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                        self._write_chunk(buffer.getvalue().encode())
+                        buffer.seek(0)
+                        buffer.truncate()
+                
+                self._write_chunk(buffer.getvalue().encode())
+                self._end_chunked()
+            except (ConnectionAbortedError, BrokenPipeError, ConnectionResetError):
+                pass
+            except Exception as e:
+                # Headers are already sent; a truncated body tells the client it failed
+                print(f"Export Error: {str(e)}")
             return
         
         # History endpoint - get total stats history
         if self.path.startswith('/history/total'):
             parsed = urlparse(self.path)
             params = parse_qs(parsed.query)
-            hours = int(params.get('hours', [24])[0])
             
             try:
-                history = database.get_total_stats_history(hours)
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(history).encode())
+                hours, resolution, max_points, since = parse_history_params(params)
+                window = {'X-Window-Start': database.history_window_start(
+                    hours, database.pick_resolution(hours, resolution, max_points), totals=True)}
+                history = database.get_total_stats_history(hours, resolution, max_points, since)
+                self._send_json(history, headers=window)
+            except ValueError as e:
+                self.send_error(400, str(e))
             except Exception as e:
                 print(f"History Error: {str(e)}")
                 self.send_error(500, str(e))
             return
         
+        # Per-miner availability, share rate, hashrate percentiles and anomaly flags
+        if self.path == '/analytics' or self.path.startswith('/analytics?'):
+            params = parse_qs(urlparse(self.path).query)
+            
+            try:
+                hours = int(params.get('hours', [24])[0])
+                if not 0 < hours <= database.RETENTION_DAYS * 24:
+                    raise ValueError(f"'hours' must be between 1 and {database.RETENTION_DAYS * 24}")
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            
+            try:
+                summary, from_cache = analytics_cache.fetch(f'analytics:{hours}',
+                                                            lambda key: database.get_miner_analytics(hours))
+                self._send_json(summary, headers={'X-Cache': 'HIT' if from_cache else 'MISS'})
+            except Exception as e:
+                print(f"Analytics Error: {str(e)}")
+                self.send_error(500, str(e))
+            return
+        
+        # Collector mode: buffered samples, resends and the last error
+        if self.path == '/forward/stats':
+            self._send_json(forwarder.snapshot_stats() if forwarder else {'enabled': False})
+            return
+        
+        # Progress and results of the last LAN discovery sweep
+        if self.path == '/discover':
+            self._send_json(discovery_job.status())
+            return
+        
         # Database stats endpoint
         if self.path == '/db/stats':
             try:
-                stats = database.get_database_stats()
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(stats).encode())
+                self._send_json(database.get_database_stats())
             except Exception as e:
                 print(f"DB Stats Error: {str(e)}")
                 self.send_error(500, str(e))
             return
+
+        # Adaptive poll schedule - interval, latency and failure streak per miner
+        if self.path == '/schedule':
+            self._send_json({'generated': time.time(), 'miners': poller.schedule_state()})
+            return
+        
+        # Prometheus metrics - scrape, parse, database and request latencies
+        if self.path == '/metrics':
+            body = metrics.render().encode()
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', metrics.CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (ConnectionAbortedError, BrokenPipeError):
+                pass
+            return
         
+        # Miner and pool cache counters (hits, misses, coalesced fetches, evictions)
+        if self.path == '/cache/stats':
+            self._send_json({'miners': miner_cache.snapshot_stats(), 'pool': pool_client.stats(),
+                             'analytics': analytics_cache.snapshot_stats()})
+            return
+
         # Serve static files normally
         super().do_GET()
     
@@ -356,45 +2422,296 @@ class CORSRequestHandler(http.server.SimpleHTTPRequestHandler):
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
             
+            # Validate before queueing - a bad sample would otherwise fail the writer's whole batch
+            try:
+                miner_ip, miner_name, timestamp, miner_data = parse_sample(json.loads(post_data.decode('utf-8')),
+                                                                           time.time())
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            
+            try:
+                # Save to database
+                database.save_miner_data(miner_ip, miner_name, miner_data, timestamp)
+                recent_history.add_samples([(miner_ip, miner_name, timestamp, miner_data)])
+                
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({'success': True}).encode())
+            except Exception as e:
+                print(f"Save Error: {str(e)}")
+                self.send_error(500, str(e))
+            return
+        
+        # Save many samples in one transaction (JSON array or NDJSON)
+        if self.path == '/save/batch':
+            content_length = int(self.headers.get('Content-Length') or 0)
+            if content_length > SAVE_BODY_MAX:
+                self.send_error(413, f'Batch larger than {SAVE_BODY_MAX} bytes')
+                return
+            post_data = self.rfile.read(content_length)
+            
+            try:
+                samples = parse_sample_batch(post_data, self.headers.get('Content-Type', ''))
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            
+            try:
+                saved = database.save_samples(samples)
+                recent_history.add_samples(samples)
+                self._send_json({'success': True, 'saved': saved})
+            except Exception as e:
+                print(f"Batch Save Error: {str(e)}")
+                self.send_error(500, str(e))
+            return
+        
+        # Samples pushed by a collector (SampleForwarder), stored under site/ip
+        if self.path == '/ingest':
+            authorization = self.headers.get('Authorization') or ''
+            if INGEST_TOKEN and not hmac.compare_digest(authorization.encode(), f'Bearer {INGEST_TOKEN}'.encode()):
+                self.send_error(401, 'Missing or wrong ingest token')
+                return
+            site = self.headers.get('X-Site') or ''
+            if not SITE_PATTERN.match(site):
+                self.send_error(400, "Missing or invalid 'X-Site' header")
+                return
+            
+            try:
+                body = self._read_body(INGEST_BODY_MAX)
+                # One bad sample (a collector's clock running ahead, say) must not cost the rest
+                parsed, rejected = parse_sample_batch(body, self.headers.get('Content-Type', ''), skip_invalid=True)
+                samples = []
+                skipped = {item['index'] for item in rejected}
+                for index, sample in zip((i for i in itertools.count() if i not in skipped), parsed):
+                    if '/' in sample[0]:
+                        rejected.append({'index': index, 'error': "'ip' must not contain '/'"})
+                    else:
+                        samples.append(sample)
+                rejected.sort(key=lambda item: item['index'])
+            except OverflowError as e:
+                self.send_error(413, str(e))
+                return
+            except (ValueError, zlib.error) as e:
+                self.send_error(400, str(e))
+                return
+            
+            # A resend of a batch that was stored but not acknowledged, or is still being stored
+            batch_id = f"{site}:{self.headers.get('X-Batch-Id')}" if self.headers.get('X-Batch-Id') else None
+            state = remote_miners.claim_batch(batch_id) if batch_id else None
+            if state:
+                self._send_json({'success': True, 'saved': 0, 'duplicate': True})
+                return
+            if state is False:
+                # The collector retries with backoff and is acknowledged once the first copy is stored
+                self.send_error(503, 'Batch is still being stored')
+                return
+            
+            stored = False
+            try:
+                samples = [(database.remote_miner_ip(site, miner_ip), name, timestamp, data)
+                           for miner_ip, name, timestamp, data in samples]
+                saved = database.save_samples(samples) if samples else 0
+                stored = True
+                recent_history.add_samples(samples)
+                remote_miners.update(site, samples)
+                if rejected:
+                    print(f"⚠️  Skipped {len(rejected)} invalid sample(s) from {site}: {rejected[0]['error']}")
+                self._send_json({'success': True, 'saved': saved, 'rejected': rejected})
+            except Exception as e:
+                print(f"Ingest Error ({site}): {str(e)}")
+                self.send_error(500, str(e))
+            finally:
+                if batch_id:
+                    remote_miners.finish_batch(batch_id, stored)
+            return
+        
+        # Sweep a CIDR range for NerdMiners and register the ones found
+        if self.path == '/discover':
+            content_length = int(self.headers.get('Content-Length') or 0)
+            post_data = self.rfile.read(content_length)
+            
+            try:
+                data = json.loads(post_data.decode('utf-8') or '{}')
+                network = data.get('network')
+                ports = tuple(int(port) for port in data.get('ports') or DISCOVERY_PORTS)
+                if not network:
+                    self.send_error(400, "Missing 'network' field")
+                    return
+                if not set(ports) <= set(DISCOVERY_PORTS):
+                    raise ValueError(f"Ports must be among {', '.join(map(str, DISCOVERY_PORTS))} "
+                                     f"(start the server with --discover-port to allow others)")
+                if not discovery_job.start(network, ports):
+                    self._send_json({'error': 'A discovery sweep is already running', **discovery_job.status()}, 409)
+                    return
+                self._send_json(discovery_job.status(), 202)
+            except (ValueError, TypeError) as e:
+                self.send_error(400, str(e))
+            except Exception as e:
+                print(f"Discover Error: {str(e)}")
+                self.send_error(500, str(e))
+            return
+        
+        # Register a miner with the background poller
+        if self.path == '/miners':
+            content_length = int(self.headers['Content-Length'])
+            post_data = self.rfile.read(content_length)
+            
             try:
                 data = json.loads(post_data.decode('utf-8'))
                 miner_ip = data.get('ip')
-                miner_name = data.get('name')
-                miner_data = data.get('data', {})
                 
                 if not miner_ip:
                     self.send_error(400, "Missing 'ip' field")
                     return
                 
-                # Save to database
-                database.save_miner_data(miner_ip, miner_name, miner_data)
+                database.register_miner(miner_ip, data.get('name'))
+                poller.poll_now()
                 
                 self.send_response(200)
                 self.send_header('Content-Type', 'application/json')
                 self.end_headers()
                 self.wfile.write(json.dumps({'success': True}).encode())
             except Exception as e:
-                print(f"Save Error: {str(e)}")
+                print(f"Register Error: {str(e)}")
+                self.send_error(500, str(e))
+            return
+        
+        # Stop polling a miner
+        if self.path == '/miners/remove':
+            content_length = int(self.headers['Content-Length'])
+            post_data = self.rfile.read(content_length)
+            
+            try:
+                data = json.loads(post_data.decode('utf-8'))
+                miner_ip = data.get('ip')
+                
+                if not miner_ip:
+                    self.send_error(400, "Missing 'ip' field")
+                    return
+                
+                removed = database.remove_miner(miner_ip)
+                poller.forget(miner_ip)
+                recent_history.forget(miner_ip)
+                remote_miners.forget(miner_ip)
+                
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({'success': removed}).encode())
+            except Exception as e:
+                print(f"Remove Error: {str(e)}")
                 self.send_error(500, str(e))
             return
         
         self.send_error(404)
 
-if __name__ == '__main__':
-    # Cleanup old data on startup (keep 30 days)
+def parse_args(argv=None):
+    """Parse command-line options (port stays positional for START.bat)"""
+    parser = argparse.ArgumentParser(description='NerdMiner Status Dashboard Server')
+    parser.add_argument('port', nargs='?', default=str(PORT),
+                        help=f'port to listen on (default: {PORT})')
+    parser.add_argument('--workers', type=int, default=HTTP_WORKERS,
+                        help=f'HTTP worker threads (default: {HTTP_WORKERS})')
+    parser.add_argument('--poll-workers', type=int, default=POLL_WORKERS,
+                        help=f'miners scraped in parallel (default: {POLL_WORKERS})')
+    parser.add_argument('--byte-scan', action='store_true',
+                        help='parse miner pages with the byte-level scanner instead of HTMLParser')
+    parser.add_argument('--vacuum', action='store_true',
+                        help='convert an older database to incremental auto-vacuum on the first maintenance run '
+                             '(one-time VACUUM, blocks history writes while it runs)')
+    parser.add_argument('--storage', choices=('rows', 'compact'),
+                        help='history layout for a new database (existing files keep theirs; see migrate_storage.py)')
+    parser.add_argument('--pool-cache-ttl', type=float, default=POOL_CACHE_TTL,
+                        help=f'seconds pool API responses are reused (default: {POOL_CACHE_TTL})')
+    parser.add_argument('--forward-to', metavar='URL',
+                        help='collector mode: also send every polled sample to this central server (http://host:port)')
+    parser.add_argument('--site', default=socket.gethostname(),
+                        help='collector mode: site name the central server files this collector\'s miners under '
+                             '(default: host name)')
+    parser.add_argument('--forward-token', help='collector mode: token the central server expects')
+    parser.add_argument('--ingest-token', help='central server: require this token on /ingest')
+    parser.add_argument('--discover', metavar='CIDR',
+                        help=f'find miners in this range (e.g. 192.168.1.0/24) at startup and every '
+                             f'{DISCOVERY_INTERVAL // 60} minutes')
+    parser.add_argument('--discover-port', type=int, action='append', metavar='PORT',
+                        help='port miners serve their status page on, the only ones sweeps probe '
+                             '(repeatable, default 80)')
+    args = parser.parse_args(argv)
+    
     try:
-        database.cleanup_old_data(days=30)
-    except Exception as e:
-        print(f"⚠️  Cleanup error: {e}")
+        port = int(args.port)
+        if port < 1 or port > 65535:
+            print(f"⚠️  Invalid port number: {port}")
+            print(f"   Port must be between 1 and 65535")
+            print(f"   Using default port {PORT} instead")
+            port = PORT
+    except ValueError:
+        print(f"⚠️  Invalid port argument: {args.port}")
+        print(f"   Usage: python server.py [port] [--workers N] [--poll-workers N] [--byte-scan] [--pool-cache-ttl S] [--discover CIDR]")
+        print(f"   Using default port {PORT} instead")
+        port = PORT
+    args.port = port
     
-    with socketserver.TCPServer(("", PORT), CORSRequestHandler) as httpd:
-        print(f"🚀 NerdMiner Dashboard Server running on http://localhost:{PORT}")
+    args.workers = max(1, args.workers)
+    args.poll_workers = max(1, args.poll_workers)
+    args.pool_cache_ttl = max(0.0, args.pool_cache_ttl)
+    args.discover_port = tuple(port for port in args.discover_port or DISCOVERY_PORTS if 0 < port < 65536) \
+        or DISCOVERY_PORTS
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    
+    # Initialize database on startup
+    database.init_database(args.storage)
+    
+    # Retention, pruning and compaction run in the background (keep 30 days)
+    database.start_maintenance(vacuum=args.vacuum)
+    
+    # Last hour of history into memory, so charts are populated right after a restart
+    recent_history.load()
+    
+    BYTE_SCAN = args.byte_scan
+    poller.workers = args.poll_workers
+    poller.start()
+    pool_client.cache.ttl = args.pool_cache_ttl
+    events.max_clients = max(1, args.workers // 2)
+    INGEST_TOKEN = args.ingest_token
+    if args.forward_to:
+        if not SITE_PATTERN.match(args.site):
+            print(f"✖ Invalid --site '{args.site}' (letters, digits, '.', '-', '_', at most 64)")
+            raise SystemExit(1)
+        forwarder = SampleForwarder(args.forward_to, args.site, args.forward_token)
+        forwarder.start()
+    DISCOVERY_PORTS = args.discover_port
+    if args.discover:
+        try:
+            discovery_job.repeat(args.discover, DISCOVERY_PORTS)
+        except ValueError as e:
+            print(f"⚠️  Invalid --discover range: {e}")
+    
+    with PooledHTTPServer(("", args.port), CORSRequestHandler, workers=args.workers) as httpd:
+        print(f"🚀 NerdMiner Dashboard Server running on http://localhost:{args.port}")
+        print(f"🧵 Serving with {args.workers} worker threads")
         print(f"📊 Miner data cached for {CACHE_DURATION}s to reduce ESP32 load")
+        print(f"🏊 Pool API responses cached for {args.pool_cache_ttl:g}s")
         print(f"💾 SQLite history tracking enabled")
-        print(f"⏱️  Update interval: 5s (most requests served from cache)")
+        print(f"⏱️  Poll interval: {POLL_MIN_INTERVAL}-{POLL_STEADY_INTERVAL}s per miner, "
+              f"backing off to {POLL_BACKOFF_MAX}s when unreachable ({args.poll_workers} miners scraped in parallel)")
+        if forwarder:
+            print(f"📡 Collector '{forwarder.site}' forwarding samples to {forwarder.url}")
         print(f"Press Ctrl+C to stop\n")
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\n👋 Server stopped")
-
+        finally:
+            events.close()
+            discovery_job.stop()
+            poller.stop()
+            if forwarder:
+                forwarder.stop()
+            pool_client.close()